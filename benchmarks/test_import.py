@@ -0,0 +1,30 @@
+"""
+Benchmarks of the start-up cost, each in a fresh interpreter.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from typing import Any
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        pytest.param("pass", id="interpreter"),
+        pytest.param("import itksn", id="import"),
+        pytest.param("import itksn.cli.main", id="import-cli"),
+        pytest.param("import itksn; itksn.parse(b'20UPGFC1048575')", id="first-parse"),
+    ],
+)
+def test_import(benchmark: Any, code: str) -> None:
+    benchmark.group = "import"
+    benchmark.pedantic(
+        subprocess.run,
+        args=([sys.executable, "-c", code],),
+        kwargs={"check": True},
+        rounds=5,
+    )
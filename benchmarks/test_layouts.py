@@ -0,0 +1,108 @@
+"""
+Benchmarks of parsing, building and validating a serial number of each layout.
+
+Run with ``hatch run bench:run``, see ``benchmarks/README.md``.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from construct import ConstructError
+
+import itksn
+from itksn.core import SerialNumberStruct
+
+#: a valid serial number for each layout of ``itksn.pixels.identifiers``, plus strips
+SERIALNUMBERS = {
+    "modules.fe_chip": b"20UPGFC1048575",
+    "modules.sensor": b"20UPGHU3200001",
+    "modules.bare_module": b"20UPGB10000001",
+    "modules.pcb": b"20UPGPC2210002",
+    "modules.pcb_triplets": b"20UPIP00000001",
+    "modules.module": b"20UPGM20012019",
+    "modules.triplet_module": b"20UPIM00000016",
+    "modules.module_carrier": b"20UPGMC2291234",
+    "modules.Pass": b"20UPBSR",
+    "local_supports.local_supports": b"20UPBBB0000001",
+    "local_supports.local_supports_is": b"20UPICA0000001",
+    "local_supports.local_supports_ihr": b"20UPBFR0010000",
+    "local_supports.local_supports_longeron": b"20UPBFL0000000",
+    "local_supports.loaded_local_supports_ob_module": b"20UPBLC2110482",
+    "local_supports.local_supports_frame_box": b"20UPBLB1000001",
+    "services.optoboard": b"20UPGOB2152401",
+    "services.termination_board": b"20UPGOT0000000",
+    "services.optobox": b"20UPGOX0000000",
+    "services.optobox_powerboard_connector": b"20UPGOC3100028",
+    "services.mops_chip": b"20UPGQF0000002",
+    "services.canbus": b"20UPGOD0699909",
+    "services.is_type0_cable": b"20UPIPG0000000",
+    "services.is_type1_cable": b"20UPIP19000001",
+    "services.pi_type0_pp0": b"20UPI0P0000000",
+    "services.pp1": b"20UPI1P0000000",
+    "services.pb_type0_cable": b"20UPBPG0010001",
+    "services.pb_type0_pp0": b"20UPBQK0000001",
+    "services.pb_type1_data": b"20UPBD10000000",
+    "services.pb_type1_power": b"20UPBQR0200001",
+    "services.pe_type0_data": b"20UPEDP2000000",
+    "services.pe_type0_power": b"20UPEPP2000000",
+    "services.pe_type1": b"20UPEQR0000002",
+    "services.type2": b"20UPE200000001",
+    "services.type3": b"20UPIP30000000",
+    "services.type4": b"20UPG3P0",
+    "strips": b"20USBSL0000001",
+}
+
+#: the same serial numbers with a character too few (or the prefix cut short)
+INVALID = {name: data[:-1] for name, data in SERIALNUMBERS.items()}
+
+layouts = pytest.mark.parametrize("name", list(SERIALNUMBERS))
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _warm_up() -> None:
+    # the lookup tables and the compiled parser are built on first use
+    for data in SERIALNUMBERS.values():
+        itksn.build(itksn.parse(data))
+        itksn.validate(data)
+
+
+def _parse_error(data: bytes) -> Exception | None:
+    try:
+        itksn.parse(data)
+    except (ConstructError, ValueError, KeyError) as exc:
+        return exc
+    return None
+
+
+@layouts
+def test_parse(benchmark: Any, name: str) -> None:
+    benchmark.group = "parse"
+    data = SERIALNUMBERS[name]
+    assert benchmark(itksn.parse, data) == SerialNumberStruct.parse(data)
+
+
+@layouts
+def test_build(benchmark: Any, name: str) -> None:
+    benchmark.group = "build"
+    data = SERIALNUMBERS[name]
+    assert benchmark(itksn.build, itksn.parse(data)) == data
+
+
+@layouts
+def test_validate(benchmark: Any, name: str) -> None:
+    benchmark.group = "validate"
+    assert benchmark(itksn.validate, SERIALNUMBERS[name]).ok
+
+
+@layouts
+def test_parse_error(benchmark: Any, name: str) -> None:
+    benchmark.group = "parse error"
+    assert benchmark(_parse_error, INVALID[name]) is not None
+
+
+@layouts
+def test_validate_error(benchmark: Any, name: str) -> None:
+    benchmark.group = "validate error"
+    assert not benchmark(itksn.validate, INVALID[name]).ok
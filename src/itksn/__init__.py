@@ -1,10 +1,84 @@
 from __future__ import annotations
 
-from itksn import core
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from itksn._version import __version__
 
-parse = core.SerialNumberStruct.parse
-build = core.SerialNumberStruct.build
+if TYPE_CHECKING:
+    from construct import Container
+
+    from itksn.batch import ParseResult, build_many, iter_parse, parse_many
+    from itksn.cache import ParseCache, PersistentCache
+    from itksn.errors import ErrorCode, FieldError
+    from itksn.index import FieldIndex
+    from itksn.validation import (
+        ParseOutcome,
+        is_valid,
+        try_parse,
+        validate,
+        validate_many,
+    )
+
+    # at runtime, these are the methods of itksn.core.CompiledSerialNumberStruct
+    def parse(data: bytes, **contextkw: Any) -> Container[Any]: ...
+    def build(obj: dict[str, Any], **contextkw: Any) -> bytes: ...
+
+
+# Building the component tables and compiling the parser is expensive, so it
+# is deferred until one of these is first used (e.g. not for ``itksn --version``).
+_lazy = {
+    "ErrorCode": ("itksn.errors", "ErrorCode"),
+    "FieldError": ("itksn.errors", "FieldError"),
+    "FieldIndex": ("itksn.index", "FieldIndex"),
+    "ParseCache": ("itksn.cache", "ParseCache"),
+    "ParseOutcome": ("itksn.validation", "ParseOutcome"),
+    "ParseResult": ("itksn.batch", "ParseResult"),
+    "PersistentCache": ("itksn.cache", "PersistentCache"),
+    "build_many": ("itksn.batch", "build_many"),
+    "iter_parse": ("itksn.batch", "iter_parse"),
+    "parse_many": ("itksn.batch", "parse_many"),
+    "is_valid": ("itksn.validation", "is_valid"),
+    "try_parse": ("itksn.validation", "try_parse"),
+    "validate": ("itksn.validation", "validate"),
+    "validate_many": ("itksn.validation", "validate_many"),
+    "parse": ("itksn.core", "CompiledSerialNumberStruct.parse"),
+    "build": ("itksn.core", "CompiledSerialNumberStruct.build"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    module, attributes = _lazy[name]
+    value: Any = importlib.import_module(module)
+    for attribute in attributes.split("."):
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_lazy])
+
 
-__all__ = ["__version__", "build", "parse"]
-del core
+__all__ = [
+    "ErrorCode",
+    "FieldError",
+    "FieldIndex",
+    "ParseCache",
+    "ParseOutcome",
+    "ParseResult",
+    "PersistentCache",
+    "__version__",
+    "build",
+    "build_many",
+    "is_valid",
+    "iter_parse",
+    "parse",
+    "parse_many",
+    "try_parse",
+    "validate",
+    "validate_many",
+]
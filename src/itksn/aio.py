@@ -0,0 +1,144 @@
+"""
+Parse and validate serial numbers without blocking an event loop.
+
+Parsing a large batch in a coroutine would keep the event loop busy until the
+whole batch is done, stalling every other request a service is handling. The
+functions here work through the batch in small chunks and let the loop run
+other tasks between them, or hand the chunks to an executor (e.g. a
+:class:`~concurrent.futures.ProcessPoolExecutor` shared by all requests), and
+stream the results as an async iterator.
+
+>>> import asyncio
+>>> from itksn import aio
+>>> async def check(serialnumbers):
+...     return [result.ok async for result in aio.iter_validate(serialnumbers)]
+>>> asyncio.run(check(["20UPGFC1048575", "20UPGR9X101041"]))
+[True, False]
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable
+from concurrent.futures import Executor
+from itertools import islice
+from typing import TypeVar
+
+from itksn.batch import ParseResult, parse_chunk
+from itksn.common import as_bytes
+from itksn.validation import Validation
+from itksn.validation import validate_many as _validate_chunk
+
+#: number of serial numbers handled between two chances for other tasks to run,
+#: a few milliseconds of work when not using an executor
+CHUNK_SIZE = 256
+
+_Result = TypeVar("_Result")
+
+SerialNumbers = Iterable[bytes | str] | AsyncIterable[bytes | str]
+
+
+async def _chunks(
+    serialnumbers: SerialNumbers, chunksize: int
+) -> AsyncIterator[list[bytes]]:
+    if isinstance(serialnumbers, AsyncIterable):
+        chunk: list[bytes] = []
+        async for serialnumber in serialnumbers:
+            chunk.append(as_bytes(serialnumber))
+            if len(chunk) >= chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+
+    items = iter(serialnumbers)
+    while chunk := [as_bytes(item) for item in islice(items, chunksize)]:
+        yield chunk
+
+
+async def _run(
+    func: Callable[[list[bytes]], list[_Result]],
+    serialnumbers: SerialNumbers,
+    chunksize: int,
+    executor: Executor | None,
+) -> AsyncIterator[_Result]:
+    loop = asyncio.get_running_loop()
+    async for chunk in _chunks(serialnumbers, chunksize):
+        if executor is None:
+            results = func(chunk)
+            # let other tasks run before the next chunk
+            await asyncio.sleep(0)
+        else:
+            results = await loop.run_in_executor(executor, func, chunk)
+        for result in results:
+            yield result
+
+
+def iter_parse(
+    serialnumbers: SerialNumbers,
+    chunksize: int = CHUNK_SIZE,
+    executor: Executor | None = None,
+) -> AsyncIterator[ParseResult]:
+    """
+    Parse serial numbers, yielding a :class:`~itksn.batch.ParseResult` per item.
+
+    The async counterpart of :func:`itksn.iter_parse`. Between chunks of
+    ``chunksize`` serial numbers, other tasks get to run. With ``executor``,
+    the chunks are parsed there instead, one at a time. ``serialnumbers`` can
+    also be an async iterable, e.g. the lines of an upload as they arrive.
+    """
+    return _run(parse_chunk, serialnumbers, chunksize, executor)
+
+
+async def parse_many(
+    serialnumbers: SerialNumbers,
+    chunksize: int = CHUNK_SIZE,
+    executor: Executor | None = None,
+) -> list[ParseResult]:
+    """
+    Parse many serial numbers, see :func:`iter_parse`.
+
+    Returns:
+        one :class:`~itksn.batch.ParseResult` per input, in input order
+    """
+    return [result async for result in iter_parse(serialnumbers, chunksize, executor)]
+
+
+def iter_validate(
+    serialnumbers: SerialNumbers,
+    chunksize: int = CHUNK_SIZE,
+    executor: Executor | None = None,
+) -> AsyncIterator[Validation]:
+    """
+    Validate serial numbers, yielding a :class:`~itksn.validation.Validation` per item.
+
+    The async counterpart of :func:`itksn.validate_many`, see :func:`iter_parse`.
+    """
+    return _run(_validate_chunk, serialnumbers, chunksize, executor)
+
+
+async def validate_many(
+    serialnumbers: SerialNumbers,
+    chunksize: int = CHUNK_SIZE,
+    executor: Executor | None = None,
+) -> list[Validation]:
+    """
+    Validate many serial numbers, see :func:`iter_validate`.
+
+    Returns:
+        one :class:`~itksn.validation.Validation` per input, in input order
+    """
+    return [
+        result async for result in iter_validate(serialnumbers, chunksize, executor)
+    ]
+
+
+__all__ = (
+    "CHUNK_SIZE",
+    "SerialNumbers",
+    "iter_parse",
+    "iter_validate",
+    "parse_many",
+    "validate_many",
+)
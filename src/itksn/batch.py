@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from itertools import islice
+from typing import Any, NamedTuple
+
+from construct import ConstructError, Container, StreamError
+
+from itksn.common import as_bytes
+from itksn.core import CompiledSerialNumberStruct
+from itksn.flat import layouts
+
+#: exceptions that indicate a malformed serial number rather than a bug
+#: (``Computed`` fields can raise plain ``ValueError``/``KeyError``)
+ParseErrors = (ConstructError, ValueError, KeyError)
+
+#: number of serial numbers sent to a worker process at once
+CHUNK_SIZE = 4096
+
+
+class ParseResult(NamedTuple):
+    """
+    Outcome of parsing a single serial number in a batch.
+
+    Exactly one of ``value`` and ``error`` is set.
+    """
+
+    serialnumber: bytes
+    value: Container[Any] | None
+    error: Exception | None
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the serial number was parsed successfully.
+        """
+        return self.error is None
+
+
+def _iter_parse(serialnumbers: Iterable[bytes]) -> Iterator[ParseResult]:
+    parsereport = CompiledSerialNumberStruct._parsereport  # pylint: disable=protected-access
+    # Struct nests its own context per item, so the outer one is read-only
+    context: Container[Any] = Container(_parsing=True, _building=False, _sizing=False)
+    context["_params"] = context
+    path = "(parsing)"
+
+    for data in serialnumbers:
+        try:
+            value = parsereport(BytesIO(data), context, path)  # type: ignore[arg-type]
+        except ParseErrors as exc:
+            yield ParseResult(data, None, exc)
+        else:
+            yield ParseResult(data, value, None)
+
+
+def parse_chunk(chunk: list[bytes]) -> list[ParseResult]:
+    """
+    Parse a chunk of serial numbers in this process.
+
+    This is what is sent to the workers of an executor, e.g. by
+    :func:`iter_parse` or :mod:`itksn.aio`: a module-level function that can
+    be pickled, taking and returning plain lists.
+    """
+    return list(_iter_parse(chunk))
+
+
+def _iter_parse_parallel(
+    first: list[bytes], chunks: Iterator[list[bytes]], workers: int
+) -> Iterator[ParseResult]:
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # keep a bounded number of chunks in flight so a huge input is not
+        # read into memory at once, and yield them back in submission order
+        window = 2 * workers
+        pending: deque[Future[list[ParseResult]]] = deque(
+            [executor.submit(parse_chunk, first)]
+        )
+        for chunk in chunks:
+            pending.append(executor.submit(parse_chunk, chunk))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def iter_parse(
+    serialnumbers: Iterable[bytes | str],
+    workers: int | None = 1,
+    chunksize: int = CHUNK_SIZE,
+) -> Iterator[ParseResult]:
+    """
+    Lazily parse serial numbers, yielding a :class:`ParseResult` per item.
+
+    Malformed serial numbers do not raise, the exception is stored on the
+    result instead. The parsing context is set up once and shared by all
+    items, so this is cheaper than calling :func:`itksn.parse` in a loop.
+
+    With ``workers`` other than 1, the input is split into chunks of
+    ``chunksize`` serial numbers that are parsed in a pool of that many
+    processes (``None`` for one per CPU). Results are still yielded in input
+    order. Inputs that fit in a single chunk are parsed in-process, as
+    starting the pool would take longer than parsing them.
+    """
+    data = (as_bytes(serialnumber) for serialnumber in serialnumbers)
+    if workers == 1:
+        yield from _iter_parse(data)
+        return
+
+    chunks = iter(lambda: list(islice(data, chunksize)), [])
+    first = next(chunks, [])
+    if len(first) < chunksize:
+        yield from _iter_parse(first)
+        return
+    yield from _iter_parse_parallel(first, chunks, workers or os.cpu_count() or 1)
+
+
+def parse_many(
+    serialnumbers: Iterable[bytes | str],
+    workers: int | None = 1,
+    chunksize: int = CHUNK_SIZE,
+) -> list[ParseResult]:
+    """
+    Parse many serial numbers at once.
+
+    Args:
+        serialnumbers: serial numbers as ``bytes`` or ``str``
+        workers: number of worker processes, ``None`` for one per CPU
+        chunksize: number of serial numbers sent to a worker at once
+
+    Returns:
+        one :class:`ParseResult` per input, in input order
+    """
+    return list(iter_parse(serialnumbers, workers, chunksize))
+
+
+def _number_format(number: int | bytes | str, width: int) -> bytes:
+    if isinstance(number, str):
+        number = number.encode("utf-8")
+    elif not isinstance(number, bytes):
+        if number < 0:
+            msg = f"number must not be negative, got {number}"
+            raise ValueError(msg)
+        number = b"%0*d" % (width, number)
+    if len(number) != width:
+        msg = f"bytes object of wrong length, expected {width}, found {len(number)}"
+        raise StreamError(msg)
+    return number
+
+
+def build_many(
+    template: dict[str, Any],
+    numbers: Iterable[int | bytes | str],
+    field: str = "number",
+) -> list[bytes]:
+    """
+    Build a serial number for each of ``numbers``, with all other fields from ``template``.
+
+    ``template`` is an object as for :func:`itksn.build`, its ``identifier``
+    without ``field``. Integers are zero-filled to the width of ``field``.
+
+    The template is encoded once, and each number is spliced into it, which
+    makes minting a range of serial numbers much faster than calling
+    :func:`itksn.build` for each one. The serial numbers are identical.
+
+    >>> template = {
+    ...     "atlas_project": "atlas_detector",
+    ...     "system_code": "phaseII_upgrade",
+    ...     "project_code": "pixel",
+    ...     "subproject_code": "pixel_general",
+    ...     "component_code": "Digital_quad_module",
+    ...     "identifier": {"FE_chip_version": "RD53A", "PCB_manufacturer": "Dummy"},
+    ... }
+    >>> build_many(template, range(12345, 12348))
+    [b'20UPGR90012345', b'20UPGR90012346', b'20UPGR90012347']
+
+    Raises:
+        KeyError: if the layout of ``template`` has no such field
+        ValueError: for templates without identifier layouts (e.g. strips),
+            or negative numbers
+        construct.StreamError: for numbers that do not fit in the field
+    """
+    identifier = template.get("identifier", {})
+    layout = next(
+        (
+            layout
+            for layout in layouts().values()
+            if all(template.get(key) == value for key, value in layout.header.items())
+        ),
+        None,
+    )
+    if layout is None or not isinstance(identifier, dict):
+        msg = f"no identifier layout for {template.get('component_code')!r}"
+        raise ValueError(msg)
+
+    offset, width = layout.locate(f"identifier.{field}", template)
+    # encode (and check) the template once, with a placeholder number
+    head = CompiledSerialNumberStruct.build(
+        {**template, "identifier": {**identifier, field: b"0" * width}}
+    )
+    head, tail = head[:offset], head[offset + width :]
+    return [head + _number_format(number, width) + tail for number in numbers]
+
+
+__all__ = (
+    "CHUNK_SIZE",
+    "ParseErrors",
+    "ParseResult",
+    "build_many",
+    "iter_parse",
+    "parse_chunk",
+    "parse_many",
+)
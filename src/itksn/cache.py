@@ -0,0 +1,568 @@
+"""
+Caches in front of :func:`itksn.parse`.
+
+Services that look up the same serial numbers over and over can keep a
+:class:`ParseCache` around instead of parsing each time. The results are
+:class:`FrozenContainer` objects, so a cached entry can be handed out to many
+callers without one of them changing it for everyone else.
+
+:class:`PersistentCache` keeps the outcomes of parsing serial numbers (the
+parsed values and the errors) in an SQLite database instead, so that they
+survive restarts, and reuses them until an ``itksn`` upgrade changes how they
+are parsed.
+"""
+
+from __future__ import annotations
+
+import builtins
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple, NoReturn
+
+import construct
+from construct import Container
+
+from itksn.common import EnumByteString, as_bytes, open_sqlite
+from itksn.errors import ErrorCode, FieldError
+
+if TYPE_CHECKING:
+    from itksn.validation import ParseOutcome, Validation
+
+#: supported eviction policies
+POLICIES = ("lru", "fifo")
+
+#: version of the way :class:`PersistentCache` stores outcomes, databases
+#: written with another version are emptied when opened
+STORAGE_VERSION = 3
+
+#: number of serial numbers looked up in the database at once
+_LOOKUP_SIZE = 500
+
+
+def _text(data: bytes) -> str:
+    # every byte is a character, the bytes can be restored exactly
+    return data.decode("latin-1")
+
+
+def _exception_type(name: str) -> type[Exception]:
+    found = getattr(construct, name, None) or getattr(builtins, name, None)
+    if isinstance(found, type) and issubclass(found, Exception):
+        return found
+    return ValueError
+
+
+def _dump_error(error: FieldError) -> str:
+    """
+    Encode an error as JSON, the inverse of :func:`_load_error`.
+    """
+    return json.dumps(
+        [
+            error.code.value,
+            error.field,
+            error.offset,
+            _text(error.value),
+            [
+                [_text(value.bytevalue), str(value)]
+                if isinstance(value, EnumByteString)
+                else [_text(value), None]
+                for value in error.allowed
+            ],
+            error.message,
+            error.exception_type.__name__,
+        ]
+    )
+
+
+def _load_error(text: str) -> FieldError:
+    code, field, offset, value, allowed, message, exception_type = json.loads(text)
+    return FieldError(
+        ErrorCode(code),
+        field,
+        offset,
+        value.encode("latin-1"),
+        tuple(
+            value.encode("latin-1")
+            if name is None
+            else EnumByteString.new(value.encode("latin-1"), name)
+            for value, name in allowed
+        ),
+        message,
+        _exception_type(exception_type),
+    )
+
+
+def _encode_value(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {key: _encode_value(value) for key, value in obj.items()}
+    # tagged as lists, which parsed values do not otherwise hold
+    if isinstance(obj, EnumByteString):
+        return ["e", _text(obj.bytevalue), str(obj)]
+    if isinstance(obj, bytes):
+        return ["b", _text(obj)]
+    if obj is None or isinstance(obj, (str, int)):
+        return obj
+    msg = f"cannot store {type(obj).__name__} values"
+    raise TypeError(msg)
+
+
+def _dump_value(value: Container[Any]) -> str:
+    """
+    Encode a parsed serial number as JSON, the inverse of :func:`_load_value`.
+    """
+    return json.dumps(_encode_value(value), separators=(",", ":"))
+
+
+def _container(fields: dict[str, Any]) -> Container[Any]:
+    for key, value in fields.items():
+        if value.__class__ is list:
+            data = value[1].encode("latin-1")
+            fields[key] = (
+                data if value[0] == "b" else EnumByteString.new(data, value[2])
+            )
+    return Container(fields)
+
+
+_value_decoder = json.JSONDecoder(object_hook=_container)
+
+
+def _load_value(text: str) -> Container[Any]:
+    return _value_decoder.decode(text)  # type: ignore[no-any-return]
+
+
+def _immutable(obj: Any, *_args: Any, **_kwargs: Any) -> NoReturn:
+    msg = f"{type(obj).__name__!r} object is immutable"
+    raise TypeError(msg)
+
+
+class FrozenContainer(Container[Any]):
+    """
+    A read-only :class:`construct.Container`, nested containers included.
+
+    Use :meth:`copy` to get a mutable (shallow) copy.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__()
+        for key, value in dict(*args, **kwargs).items():
+            dict.__setitem__(self, key, freeze(value))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # the recursion lock used by __repr__ and __str__ is a slot
+        if name == "__recursion_lock__":
+            object.__setattr__(self, name, value)
+            return
+        _immutable(self)
+
+    def __delattr__(self, name: str) -> None:
+        if name == "__recursion_lock__":
+            object.__delattr__(self, name)
+            return
+        _immutable(self)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (type(self), (dict(self),))
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+def freeze(obj: Any) -> Any:
+    """
+    Return ``obj`` with every (nested) ``dict`` turned into a :class:`FrozenContainer`.
+    """
+    if isinstance(obj, FrozenContainer):
+        return obj
+    if isinstance(obj, dict):
+        return FrozenContainer(obj)
+    return obj
+
+
+class CacheInfo(NamedTuple):
+    """
+    Statistics of a :class:`ParseCache`, see :meth:`ParseCache.cache_info`.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class ParseCache:
+    """
+    Parse serial numbers, remembering up to ``maxsize`` results.
+
+    Args:
+        maxsize: number of results to keep
+        policy: which result to evict when full, the least recently used
+            (``"lru"``) or the oldest (``"fifo"``)
+        parse: the parser to cache, :func:`itksn.parse` by default
+
+    Serial numbers that fail to parse raise as usual and are not cached. The
+    cache can be shared between threads.
+
+    >>> cache = ParseCache(maxsize=128)
+    >>> cache(b"20UPGFC1048575").identifier.wafer
+    255
+    >>> cache("20UPGFC1048575") is cache(b"20UPGFC1048575")
+    True
+    >>> cache.cache_info()
+    CacheInfo(hits=2, misses=1, evictions=0, maxsize=128, currsize=1)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        policy: Literal["lru", "fifo"] = "lru",
+        parse: Callable[[bytes], Any] | None = None,
+    ) -> None:
+        if maxsize < 1:
+            msg = f"maxsize must be positive, got {maxsize}"
+            raise ValueError(msg)
+        if policy not in POLICIES:
+            msg = f"policy must be one of {POLICIES}, got {policy!r}"
+            raise ValueError(msg)
+        if parse is None:
+            from itksn import parse as default_parse  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+
+            parse = default_parse
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self._parse = parse
+        self._cache: OrderedDict[bytes, FrozenContainer] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def __call__(self, serialnumber: bytes | str) -> FrozenContainer:
+        """
+        Parse ``serialnumber``, or return the cached result.
+        """
+        key = as_bytes(serialnumber)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._hits += 1
+                if self.policy == "lru":
+                    self._cache.move_to_end(key)
+                return cached
+            self._misses += 1
+
+        # parse outside of the lock, concurrent misses on the same key agree
+        # on the result anyway
+        value: FrozenContainer = freeze(self._parse(key))
+        with self._lock:
+            if key not in self._cache and len(self._cache) >= self.maxsize:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+            self._cache[key] = value
+        return value
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Report the hits, misses and evictions so far, and the size of the cache.
+        """
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self.maxsize,
+                len(self._cache),
+            )
+
+    def cache_clear(self) -> None:
+        """
+        Empty the cache and reset the statistics.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._hits = self._misses = self._evictions = 0
+
+
+class PersistentCacheInfo(NamedTuple):
+    """
+    Statistics of a :class:`PersistentCache`, see :meth:`PersistentCache.cache_info`.
+
+    ``stale`` counts the misses for outcomes that were stored, but by a
+    version of ``itksn`` that parses them differently.
+    """
+
+    hits: int
+    misses: int
+    stale: int
+    currsize: int
+
+
+class PersistentCache:
+    """
+    Parse or validate serial numbers, storing the outcomes in an SQLite database.
+
+    Args:
+        path: the database file, created if needed, or ``":memory:"``
+
+    Each outcome is stored along with the :func:`~itksn.schema.fingerprint`
+    of the definitions that produced it, and only reused while the
+    fingerprint for its prefix is the same. After upgrading ``itksn``,
+    :meth:`refresh` re-validates exactly the serial numbers whose layout
+    changed, and :meth:`failures` lists the invalid ones without parsing
+    anything.
+
+    Parsed values and errors are stored as JSON, and :meth:`try_parse_many`
+    returns the stored values without parsing again. Reading a value back
+    takes about as long as parsing a simple layout, but less than front-end
+    chips (whose fields are computed) or serial numbers without a flat layout
+    (e.g. strips). :meth:`validate_many` and :meth:`failures` only read the
+    errors. The cache can be shared between threads.
+
+    >>> with PersistentCache(":memory:") as cache:
+    ...     _ = cache.validate_many(["20UPGFC1048575", "20UPGR9X101041"])
+    ...     results = cache.validate_many(["20UPGFC1048575", "20UPGR9X101041"])
+    ...     wafer = cache.try_parse("20UPGFC1048575").value.identifier.wafer
+    ...     failures = [result.serialnumber for result in cache.failures()]
+    ...     info = cache.cache_info()
+    >>> [result.ok for result in results], wafer, failures
+    ([True, False], 255, [b'20UPGR9X101041'])
+    >>> info
+    PersistentCacheInfo(hits=3, misses=2, stale=0, currsize=2)
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        from itksn.schema import fingerprint  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+        from itksn.validation import (  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+            ParseOutcome,
+            Validation,
+            try_parse,
+        )
+
+        self._fingerprint = fingerprint
+        self._try_parse = try_parse
+        self._outcome = ParseOutcome
+        self._validation = Validation
+        self._connection = open_sqlite(path, STORAGE_VERSION, ["outcomes"])
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._stale = 0
+        with self._connection as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS outcomes (serialnumber BLOB PRIMARY KEY,"
+                " fingerprint TEXT NOT NULL, value TEXT, error TEXT)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS outcomes_prefix"
+                " ON outcomes (substr(serialnumber, 1, 7), fingerprint)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS outcomes_failures"
+                " ON outcomes (serialnumber) WHERE error IS NOT NULL"
+            )
+
+    def __enter__(self) -> PersistentCache:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _lookup(
+        self, keys: list[bytes], values: bool
+    ) -> dict[bytes, tuple[str, str | None, str | None]]:
+        found: dict[bytes, tuple[str, str | None, str | None]] = {}
+        column = "value" if values else "NULL"
+        for start in range(0, len(keys), _LOOKUP_SIZE):
+            chunk = keys[start : start + _LOOKUP_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._connection.execute(
+                f"SELECT serialnumber, fingerprint, {column}, error FROM outcomes"
+                f" WHERE serialnumber IN ({placeholders})",
+                chunk,
+            )
+            found.update(
+                (key, (fingerprint, value, error))
+                for key, fingerprint, value, error in rows
+            )
+        return found
+
+    def _store(self, outcomes: list[ParseOutcome]) -> None:
+        with self._connection as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        outcome.serialnumber,
+                        self._fingerprint(outcome.serialnumber),
+                        None if outcome.value is None else _dump_value(outcome.value),
+                        None if outcome.error is None else _dump_error(outcome.error),
+                    )
+                    for outcome in outcomes
+                ],
+            )
+
+    def _outcomes(
+        self, serialnumbers: Iterable[bytes | str], values: bool
+    ) -> list[ParseOutcome]:
+        """
+        The stored outcomes, or new ones for the serial numbers not stored yet.
+
+        Unless ``values`` is set, the stored values are not read back and the
+        outcomes of hits have none.
+        """
+        keys = [as_bytes(serialnumber) for serialnumber in serialnumbers]
+        results: dict[bytes, ParseOutcome] = {}
+        new: list[ParseOutcome] = []
+        with self._lock:
+            found = self._lookup(list(dict.fromkeys(keys)), values)
+            for key in keys:
+                if key in results:
+                    continue
+                stored = found.get(key)
+                if stored is not None and stored[0] == self._fingerprint(key):
+                    self._hits += 1
+                    _, value, error = stored
+                    results[key] = self._outcome(
+                        key,
+                        None if value is None else _load_value(value),
+                        None if error is None else _load_error(error),
+                    )
+                    continue
+                self._misses += 1
+                self._stale += stored is not None
+                results[key] = self._try_parse(key)
+                new.append(results[key])
+            if new:
+                self._store(new)
+        return [results[key] for key in keys]
+
+    def try_parse_many(
+        self, serialnumbers: Iterable[bytes | str]
+    ) -> list[ParseOutcome]:
+        """
+        Parse many serial numbers as :func:`itksn.try_parse`, or return the stored outcomes.
+
+        Stored values are read back instead of parsing the serial numbers
+        again. The stored outcomes are looked up together, and the new ones
+        are stored in a single transaction.
+
+        Returns:
+            one :class:`~itksn.validation.ParseOutcome` per input, in input order
+        """
+        return self._outcomes(serialnumbers, values=True)
+
+    def try_parse(self, serialnumber: bytes | str) -> ParseOutcome:
+        """
+        Parse ``serialnumber`` as :func:`itksn.try_parse`, or return the stored outcome.
+        """
+        return self.try_parse_many([serialnumber])[0]
+
+    def validate_many(self, serialnumbers: Iterable[bytes | str]) -> list[Validation]:
+        """
+        Validate many serial numbers as :func:`itksn.validate_many`.
+
+        Only the stored errors are read back. New serial numbers are parsed,
+        and their values stored too.
+
+        Returns:
+            one :class:`~itksn.validation.Validation` per input, in input order
+        """
+        return [
+            self._validation(outcome.serialnumber, outcome.error)
+            for outcome in self._outcomes(serialnumbers, values=False)
+        ]
+
+    def validate(self, serialnumber: bytes | str) -> Validation:
+        """
+        Validate ``serialnumber`` as :func:`itksn.validate`, or return the stored outcome.
+        """
+        return self.validate_many([serialnumber])[0]
+
+    def failures(self) -> Iterator[Validation]:
+        """
+        The stored outcomes of the serial numbers that are not valid.
+
+        Outcomes that are out of date are included, call :meth:`refresh`
+        first after upgrading ``itksn``.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT serialnumber, error FROM outcomes"
+                " WHERE error IS NOT NULL ORDER BY serialnumber"
+            ).fetchall()
+        for serialnumber, error in rows:
+            yield self._validation(serialnumber, _load_error(error))
+
+    def refresh(self) -> int:
+        """
+        Parse the serial numbers again whose stored outcome is out of date.
+
+        Only the serial numbers with a prefix whose fingerprint changed (e.g.
+        after an upgrade) are parsed again.
+
+        Returns:
+            the number of serial numbers parsed again
+        """
+        with self._lock:
+            prefixes = self._connection.execute(
+                "SELECT DISTINCT substr(serialnumber, 1, 7), fingerprint FROM outcomes"
+            ).fetchall()
+            outcomes: list[ParseOutcome] = []
+            for prefix, fingerprint in prefixes:
+                if self._fingerprint(prefix) == fingerprint:
+                    continue
+                rows = self._connection.execute(
+                    "SELECT serialnumber FROM outcomes"
+                    " WHERE substr(serialnumber, 1, 7) = ? AND fingerprint = ?",
+                    (prefix, fingerprint),
+                )
+                outcomes.extend(
+                    self._try_parse(serialnumber) for (serialnumber,) in rows
+                )
+            if outcomes:
+                self._store(outcomes)
+            return len(outcomes)
+
+    def cache_info(self) -> PersistentCacheInfo:
+        """
+        Report the hits and misses so far, and the number of stored outcomes.
+        """
+        with self._lock:
+            (currsize,) = self._connection.execute(
+                "SELECT count(*) FROM outcomes"
+            ).fetchone()
+            return PersistentCacheInfo(self._hits, self._misses, self._stale, currsize)
+
+    def cache_clear(self) -> None:
+        """
+        Delete all stored outcomes and reset the statistics.
+        """
+        with self._lock, self._connection as connection:
+            connection.execute("DELETE FROM outcomes")
+            self._hits = self._misses = self._stale = 0
+
+
+__all__ = (
+    "POLICIES",
+    "STORAGE_VERSION",
+    "CacheInfo",
+    "FrozenContainer",
+    "ParseCache",
+    "PersistentCache",
+    "PersistentCacheInfo",
+    "freeze",
+)
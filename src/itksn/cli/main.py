@@ -1,13 +1,42 @@
+# pylint: disable=import-outside-toplevel
 from __future__ import annotations
 
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 import typer
 
 from itksn import __version__
-from itksn.core import SerialNumberStruct
+
+if TYPE_CHECKING:
+    from socketserver import BaseServer
+
+    from itksn.batch import ParseResult
+    from itksn.formats import Row
+    from itksn.registry import Entry
+
+# The parser is imported by the commands that need it, so that start-up (e.g.
+# ``itksn --version``) does not pay for building the component tables.
 
 app = typer.Typer(context_settings={"help_option_names": ["-h", "--help"]})
 
 
+class OutputFormat(str, Enum):
+    """
+    Output formats of the parse command.
+    """
+
+    text = "text"
+    json = "json"
+    jsonl = "jsonl"
+    csv = "csv"
+    parquet = "parquet"
+
+
 @app.callback(invoke_without_command=True)
 def main(
     version: bool = typer.Option(False, "--version", help="Print the current version."),
@@ -20,12 +49,517 @@ def main(
         raise typer.Exit()
 
 
+def read_serialnumbers(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the non-empty, whitespace-stripped lines one at a time.
+    """
+    for line in lines:
+        serialnumber = line.strip()
+        if serialnumber:
+            yield serialnumber
+
+
+def format_error(result: ParseResult) -> str:
+    """
+    Format the error of a failed result on a single line.
+    """
+    message = " ".join(str(result.error).split())
+    return f"{result.serialnumber.decode('utf-8', errors='replace')}: {type(result.error).__name__}: {message}"
+
+
+def iter_rows(
+    results: Iterable[ParseResult], failures: list[ParseResult]
+) -> Iterator[Row]:
+    """
+    Yield a flattened row per successful result, collecting failures on the side.
+    """
+    from itksn.formats import flatten
+
+    for result in results:
+        if result.ok:
+            yield {
+                "serialnumber": result.serialnumber.decode("utf-8"),
+                **flatten(result.value),  # type: ignore[arg-type]
+            }
+        else:
+            failures.append(result)
+            typer.echo(format_error(result), err=True)
+
+
+def write_rows(
+    rows: Iterable[Row],
+    output_format: OutputFormat,
+    output: Path | None,
+    batch_size: int | None,
+    progress: Callable[[int], None] | None = None,
+) -> None:
+    """
+    Write the rows in the requested machine-readable format.
+
+    ``progress`` is called with the number of rows of each batch once written.
+    """
+    from itksn import formats
+
+    batch_size = batch_size or formats.BATCH_SIZE
+    if output_format is OutputFormat.parquet:
+        if output is None:
+            msg = "--format parquet requires --output."
+            raise typer.BadParameter(msg)
+        formats.write_parquet(rows, str(output), batch_size, progress)
+        return
+
+    writer = {
+        OutputFormat.json: formats.write_json,
+        OutputFormat.jsonl: formats.write_jsonl,
+        OutputFormat.csv: formats.write_csv,
+    }[output_format]
+    if output is None:
+        writer(rows, sys.stdout, batch_size, progress)
+        return
+    with output.open("w", encoding="utf-8", newline="") as stream:
+        writer(rows, stream, batch_size, progress)
+
+
 @app.command()
-def parse(serialnumber: str) -> None:
+def parse(
+    serialnumber: str | None = typer.Argument(None, help="The serial number to parse."),
+    file: typer.FileText | None = typer.Option(
+        None,
+        "--file",
+        "-f",
+        help="Parse serial numbers from this file (one per line) instead, or '-' for stdin.",
+    ),
+    output_format: OutputFormat = typer.Option(
+        OutputFormat.text,
+        "--format",
+        case_sensitive=False,
+        help="Output format. All formats but text flatten each result into one column per field.",
+    ),
+    output: Path | None = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Write the output to this file instead of stdout (required for parquet).",
+    ),
+    batch_size: int | None = typer.Option(
+        None,
+        "--batch-size",
+        min=1,
+        help="Number of rows written at once for the machine-readable formats [default: 1024].",
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=0,
+        help="Number of processes parsing a --file in parallel, or 0 for one per CPU.",
+    ),
+) -> None:
     """
     Parse the provided serial number.
+
+    With --file, serial numbers are streamed and written one result per line
+    as they are parsed. Failures are reported on stderr without stopping.
+    """
+    if (serialnumber is None) == (file is None):
+        msg = "Provide exactly one of SERIALNUMBER or --file."
+        raise typer.BadParameter(msg)
+
+    from itksn.batch import iter_parse
+
+    if output_format is not OutputFormat.text:
+        serialnumbers: Iterable[str] = (
+            [serialnumber] if serialnumber is not None else read_serialnumbers(file)  # type: ignore[arg-type]
+        )
+        failures: list[ParseResult] = []
+        write_rows(
+            iter_rows(iter_parse(serialnumbers, workers=jobs or None), failures),
+            output_format,
+            output,
+            batch_size,
+        )
+        if failures:
+            raise typer.Exit(code=1)
+        return
+
+    if serialnumber is not None:
+        from itksn.core import SerialNumberStruct
+
+        typer.echo(SerialNumberStruct.parse(serialnumber.encode("utf-8")))
+        return
+
+    failed = False
+    for result in iter_parse(read_serialnumbers(file), workers=jobs or None):  # type: ignore[arg-type]
+        if result.ok:
+            typer.echo(repr(result.value))
+        else:
+            failed = True
+            typer.echo(format_error(result), err=True)
+
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def scan(
+    file: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="The file of serial numbers to scan."
+    ),
+    packed: bool = typer.Option(
+        False,
+        "--packed",
+        help="The serial numbers are packed back to back without newlines.",
+    ),
+    offset: int = typer.Option(
+        0,
+        "--offset",
+        min=0,
+        help="Start at this byte offset, e.g. to resume an interrupted scan.",
+    ),
+    output_format: OutputFormat = typer.Option(
+        OutputFormat.text,
+        "--format",
+        case_sensitive=False,
+        help="Output format of the parsed serial numbers, text only reports failures.",
+    ),
+    output: Path | None = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Write the output to this file instead of stdout (required for parquet).",
+    ),
+    batch_size: int | None = typer.Option(
+        None,
+        "--batch-size",
+        min=1,
+        help="Number of rows written at once for the machine-readable formats [default: 1024].",
+    ),
+) -> None:
+    """
+    Scan a (large) file of serial numbers, one per line or packed.
+
+    The file is memory-mapped rather than read line by line. Failures are
+    reported on stderr with their byte offset, followed by a summary with
+    the offset to resume from.
+    """
+    from itksn import scan as scanner
+    from itksn.formats import flatten
+
+    counts = {"scanned": 0, "failed": 0}
+    scanned = offset
+    # the offsets of the rows handed to the writer but not written yet, an
+    # interrupted scan resumes from the first of them
+    pending: deque[int] = deque()
+
+    def written(count: int) -> None:
+        for _ in range(count):
+            pending.popleft()
+
+    def resume() -> int:
+        return pending[0] if pending else scanned
+
+    def rows() -> Iterator[Row]:
+        nonlocal scanned
+        for result in scanner.scan(file, packed=packed, offset=offset):
+            counts["scanned"] += 1
+            scanned = result.end
+            serialnumber = result.serialnumber.decode("utf-8", errors="replace")
+            if result.error is not None:
+                counts["failed"] += 1
+                reason = (
+                    f"{result.error.exception_type.__name__}: {result.error.message}"
+                )
+                typer.echo(f"{result.offset}: {serialnumber}: {reason}", err=True)
+            elif output_format is not OutputFormat.text:
+                pending.append(result.offset)
+                yield {"serialnumber": serialnumber, **flatten(result.value)}  # type: ignore[arg-type]
+
+    try:
+        if output_format is OutputFormat.text:
+            for _ in rows():
+                pass
+        else:
+            write_rows(rows(), output_format, output, batch_size, written)
+    except KeyboardInterrupt:
+        typer.echo(f"interrupted, resume with --offset {resume()}", err=True)
+        raise typer.Exit(code=130) from None
+
+    typer.echo(
+        f"scanned {counts['scanned']} serial numbers, {counts['failed']} failed,"
+        f" resume with --offset {resume()}",
+        err=True,
+    )
+    if counts["failed"]:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Address to listen on."),
+    port: int = typer.Option(
+        8765, "--port", "-p", min=0, help="HTTP port to listen on, 0 for any free one."
+    ),
+    socket: Path | None = typer.Option(
+        None, "--socket", help="Also listen on this Unix domain socket."
+    ),
+    no_http: bool = typer.Option(
+        False, "--no-http", help="Only listen on the Unix domain socket."
+    ),
+) -> None:
+    """
+    Answer parse, validate and build requests until interrupted.
+
+    The parser is built once, so that tools calling itksn for every serial
+    number do not pay for starting it each time. Over HTTP, GET
+    /parse/SERIALNUMBER or POST a JSON serial number (or list of them) to
+    /parse, /validate or /build. Over the socket, send one JSON request
+    {"op": ..., "data": ...} per line.
+    """
+    from itksn import server
+
+    if no_http and socket is None:
+        msg = "--no-http requires --socket."
+        raise typer.BadParameter(msg)
+
+    server.warm_up()
+    servers: list[BaseServer] = []
+    if not no_http:
+        http_server = server.make_http_server(host, port)
+        servers.append(http_server)
+        address, bound = http_server.server_address[:2]
+        typer.echo(f"serving on http://{address!s}:{bound}", err=True)
+    if socket is not None:
+        servers.append(server.UnixServer(socket))
+        typer.echo(f"serving on unix:{socket}", err=True)
+
+    try:
+        server.serve(servers)
+    except KeyboardInterrupt:
+        typer.echo("stopped", err=True)
+
+
+@app.command()
+def fingerprints(
+    old: Path | None = typer.Option(
+        None,
+        "--diff",
+        exists=True,
+        dir_okay=False,
+        help="Compare with the fingerprints saved (as JSON) from another version.",
+    ),
+) -> None:
+    """
+    Print a fingerprint of the layout of each pixel component, as JSON.
+
+    Save them before upgrading itksn, and compare them afterwards with --diff
+    to find the components whose serial numbers are parsed differently.
+    """
+    import json
+
+    from itksn import schema
+
+    if old is None:
+        typer.echo(
+            json.dumps(
+                {"version": __version__, "components": schema.component_fingerprints()},
+                indent=2,
+            )
+        )
+        return
+
+    saved = json.loads(old.read_text(encoding="utf-8"))
+    changes = schema.diff(saved.get("components", saved))
+    for symbol, names in zip("+-~", changes):
+        for name in names:
+            typer.echo(f"{symbol} {name}")
+
+
+@app.command()
+def index(
+    database: Path = typer.Argument(
+        ..., dir_okay=False, help="The index database, created if needed."
+    ),
+    file: typer.FileText | None = typer.Argument(
+        None,
+        help="Add the serial numbers in this file (one per line), or '-' for stdin.",
+    ),
+    refresh: bool = typer.Option(
+        False, "--refresh", help="Index again the serial numbers whose layout changed."
+    ),
+) -> None:
     """
-    typer.echo(SerialNumberStruct.parse(serialnumber.encode("utf-8")))
+    Parse serial numbers once and index them by the values of their fields.
+
+    Serial numbers already in the index are skipped. After upgrading itksn,
+    use --refresh. Query the index with the query command.
+    """
+    from itksn.index import FieldIndex
+
+    with FieldIndex(database) as field_index:
+        if refresh:
+            typer.echo(
+                f"indexed {field_index.refresh()} serial numbers again", err=True
+            )
+        if file is not None:
+            added = field_index.add(read_serialnumbers(file))
+            typer.echo(f"added {added} serial numbers", err=True)
+        typer.echo(
+            f"{len(field_index)} valid serial numbers,"
+            f" {len(field_index.failures())} invalid",
+            err=True,
+        )
+
+
+@app.command()
+def query(
+    database: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="The index built by the index command."
+    ),
+    conditions: list[str] | None = typer.Argument(
+        None,
+        help="FIELD=VALUE conditions, all of which must match. VALUE can list several values as A,B.",
+    ),
+    count: bool = typer.Option(
+        False, "--count", help="Only print the number of matches."
+    ),
+    values: str | None = typer.Option(
+        None,
+        "--values",
+        help="Print the values of this field and their counts instead.",
+    ),
+) -> None:
+    """
+    Find the serial numbers with the given field values in an index.
+
+    Fields are named as in the flattened output of parse (identifier.wafer),
+    or by their last part (wafer) if no other field has it. For example,
+    query inventory.db component_code=FE_chip wafer=12 batch=ITkpix_v2
+    """
+    from itksn.index import FieldIndex
+
+    parsed: dict[str, list[str]] = {}
+    for condition in conditions or []:
+        name, separator, value = condition.partition("=")
+        if not separator:
+            msg = f"Conditions are FIELD=VALUE, got {condition!r}."
+            raise typer.BadParameter(msg)
+        parsed[name] = value.split(",")
+
+    with FieldIndex(database) as field_index:
+        try:
+            if values is not None:
+                for value, number in field_index.values(values).items():
+                    typer.echo(f"{value}\t{number}")
+            elif count:
+                typer.echo(field_index.count(parsed))
+            else:
+                for serialnumber in field_index.query(parsed):
+                    typer.echo(serialnumber.decode("utf-8", errors="replace"))
+        except KeyError as exc:
+            typer.echo(exc.args[0], err=True)
+            raise typer.Exit(code=1) from None
+
+
+@app.command("export-ksy")
+def export_ksy(
+    output: Path | None = typer.Option(
+        None, "--output", "-o", help="Write the schema to this file instead of stdout."
+    ),
+    schema_id: str = typer.Option(
+        "itk_serial_number", "--id", help="The meta/id of the schema."
+    ),
+) -> None:
+    """
+    Export the serial number layouts as a Kaitai Struct schema (.ksy).
+
+    Compile it with kaitai-struct-compiler to decode serial numbers in other
+    languages. Requires ruamel.yaml (pip install 'itksn[ksy]') and the .py
+    source files of itksn, from which the computed fields are translated.
+    """
+    from itksn import ksy
+    from itksn.core import SerialNumberStruct
+
+    try:
+        text = ksy.export_ksy(
+            SerialNumberStruct, schema_id, None if output is None else str(output)
+        )
+    except ImportError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(code=1) from None
+    except NotImplementedError as exc:
+        typer.echo(f"cannot export the schema: {exc}", err=True)
+        raise typer.Exit(code=1) from None
+    if output is None:
+        typer.echo(text, nl=False)
+
+
+def format_entry(entry: Entry) -> list[str]:
+    """
+    Describe a registry entry and its fields, one line each.
+    """
+    subprojects = ", ".join(entry.allowed_subprojects)
+    if not entry.allowed:
+        status = "not allowed"
+    else:
+        status = "length " + " or ".join(str(length) for length in entry.lengths)
+    lines = [
+        f"{entry.prefix.decode('utf-8')}: {entry.component} [{subprojects}] ({status})"
+    ]
+    for field in entry.fields:
+        offset = "varies" if field.offset is None else field.offset
+        width = "varies" if field.width is None else field.width
+        lines.append(f"  {field.name}: offset {offset}, width {width}")
+    return lines
+
+
+@app.command()
+def prefix(
+    serialnumber: str = typer.Argument(
+        ..., help="The (partial) serial number, only its first 7 characters are used."
+    ),
+    as_json: bool = typer.Option(False, "--json", help="Print the entries as JSON."),
+) -> None:
+    """
+    Show the component and identifier layout of a serial number prefix.
+
+    For prefixes shorter than 7 characters, all components starting with it
+    are listed.
+    """
+    import json
+
+    from itksn import registry
+
+    entries = registry.candidates(serialnumber)
+    if not entries:
+        typer.echo(f"{serialnumber}: no pixel component with this prefix", err=True)
+        raise typer.Exit(code=1)
+
+    if as_json:
+        typer.echo(
+            json.dumps(
+                [
+                    {
+                        "prefix": entry.prefix.decode("utf-8"),
+                        "component": entry.component,
+                        "subproject_code": entry.subproject_code,
+                        "allowed_subprojects": entry.allowed_subprojects,
+                        "allowed": entry.allowed,
+                        "lengths": entry.lengths,
+                        "fields": [field._asdict() for field in entry.fields],
+                    }
+                    for entry in entries
+                ],
+                indent=2,
+            )
+        )
+        return
+
+    if len(entries) > 1:
+        for entry in entries:
+            typer.echo(f"{entry.prefix.decode('utf-8')}: {entry.component}")
+        return
+    for line in format_entry(entries[0]):
+        typer.echo(line)
 
 
 # for generating documentation using mkdocs-click
@@ -1,31 +1,173 @@
 from __future__ import annotations
 
+import os
+import re
 import sys
-from typing import TYPE_CHECKING
+from collections.abc import Iterable
+from types import FunctionType
+from typing import TYPE_CHECKING, Any
 
 if sys.version_info >= (3, 11):
     from typing import Self
 else:
     from typing_extensions import Self
 
+import construct
 from construct import (
     Adapter,
     Construct,
+    Container,
     MappingError,
+    Switch,
 )
+from construct.core import evaluate
 
 if TYPE_CHECKING:
+    import sqlite3
+
     from construct import Context
 
     TheAdapter = Adapter[bytes, bytes, "EnumByteString", str]
+    TheComputed = construct.Computed[Any]
 else:
     Context = "Context"  # pylint: disable=invalid-name
     TheAdapter = Adapter
+    TheComputed = construct.Computed
+
+
+def kaitai_identifier(name: str) -> str:
+    """
+    A Kaitai Struct identifier for ``name``: lowercase, digits and underscores.
+    """
+    identifier = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+    if not identifier[:1].isalpha():
+        identifier = f"v_{identifier}"
+    return identifier
+
+
+def as_bytes(serialnumber: bytes | str) -> bytes:
+    """
+    A serial number as ``bytes``, encoding ``str`` as UTF-8.
+
+    Other bytes-like objects (e.g. ``memoryview``) are copied into ``bytes``.
+    """
+    if isinstance(serialnumber, str):
+        return serialnumber.encode("utf-8")
+    return bytes(serialnumber)
+
+
+def resolve_switch(
+    field: Construct[Any, Any], context: Container[Any]
+) -> Construct[Any, Any]:
+    """
+    The construct parsing ``field`` given the earlier fields in ``context``.
+
+    Switches are followed as long as their key can be evaluated, the first
+    one whose key looks up a field missing from ``context`` is returned.
+    """
+    while isinstance(field, Switch):
+        try:
+            key = evaluate(field.keyfunc, context)  # type: ignore[arg-type]
+        except (KeyError, AttributeError):
+            break
+        field = field.cases.get(key, field.default)
+    return field
+
+
+def open_sqlite(
+    path: str | os.PathLike[str], version: int, tables: Iterable[str]
+) -> sqlite3.Connection:
+    """
+    Connect to an SQLite database whose layout is ``version``, creating it if needed.
+
+    The version is kept in a ``meta`` table, and ``tables`` are dropped if the
+    database was written with another version, to be created again by the
+    caller. The connection can be shared between threads (with a lock).
+    """
+    import sqlite3  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+
+    connection = sqlite3.connect(path, check_same_thread=False)
+    with connection:
+        # losing the last writes in a crash only means parsing them again
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = 'storage_version'"
+        ).fetchone()
+        if row is None or row[0] != str(version):
+            for table in tables:
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('storage_version', ?)",
+                (str(version),),
+            )
+    return connection
+
+
+class Bytes(construct.Bytes):
+    """
+    Like construct.Bytes, but the compiled parser and builder check the length.
+
+    The stock compiled code reads and writes without checking, so a truncated
+    serial number would parse successfully.
+    """
+
+    def _emitparse(self, code):  # type: ignore[no-untyped-def]
+        code.append("""
+            def parse_bytes(io, length):
+                data = io.read(length)
+                if len(data) != length:
+                    raise StreamError(f"stream read less than specified amount, expected {length}, found {len(data)}")
+                return data
+        """)
+        return f"parse_bytes(io, {self.length})"
+
+    def _emitbuild(self, code):  # type: ignore[no-untyped-def]
+        code.append("""
+            def build_bytes(obj, io, length):
+                if len(obj) != length:
+                    raise StreamError(f"bytes object of wrong length, expected {length}, found {len(obj)}")
+                io.write(obj)
+                return obj
+        """)
+        return f"build_bytes(obj, io, {self.length})"
+
+
+class Computed(TheComputed):
+    """
+    Like construct.Computed, but compilable when given a plain function.
+
+    Functions cannot be emitted as source code, so the compiled parser calls
+    back into this instance instead.
+
+    ``result_type`` is what the function returns (``str`` unless given), for
+    output formats with typed columns, see :func:`itksn.formats.column_types`.
+    """
+
+    def __init__(self, func: Any, result_type: type[Any] = str) -> None:
+        super().__init__(func)
+        self.result_type = result_type
+
+    def _emitparse(self, code):  # type: ignore[no-untyped-def]
+        if isinstance(self.func, FunctionType):
+            raise NotImplementedError
+        return super()._emitparse(code)  # type: ignore[misc]
+
+    def _emitbuild(self, code):  # type: ignore[no-untyped-def]
+        if isinstance(self.func, FunctionType):
+            raise NotImplementedError
+        return super()._emitbuild(code)  # type: ignore[misc]
 
 
 class EnumByteString(str):
     """
     Like EnumIntegerString but for Bytes.
+
+    Instances are interned: there is exactly one per (bytevalue, name) pair,
+    so enum values can be compared and grouped by identity.
     """
 
     bytevalue: bytes
@@ -36,14 +178,27 @@ class EnumByteString(str):
     def __int__(self: Self) -> bytes:
         return self.bytevalue
 
+    def __reduce__(self: Self) -> tuple[Any, ...]:
+        # unpickle (and copy) to the interned instance
+        return (EnumByteString.new, (self.bytevalue, str(self)))
+
     @staticmethod
     def new(bytevalue: bytes, stringvalue: str) -> EnumByteString:
         """
         Create EnumByteString object as a class constructor
+
+        Returns the existing instance if there is one for this pair.
         """
-        ret = EnumByteString(stringvalue)
-        ret.bytevalue = bytevalue
-        return ret
+        key = (bytevalue, stringvalue)
+        try:
+            return _interned[key]
+        except KeyError:
+            ret = EnumByteString(stringvalue)
+            ret.bytevalue = bytevalue
+            return _interned.setdefault(key, ret)
+
+
+_interned: dict[tuple[bytes, str], EnumByteString] = {}
 
 
 class EnumStr(TheAdapter):
@@ -53,18 +208,23 @@ class EnumStr(TheAdapter):
 
     def __init__(self: Self, subcon: Construct[bytes, bytes], **mapping: bytes) -> None:
         super().__init__(subcon)
+        self.namemapping: dict[str, EnumByteString] = {
+            k: EnumByteString.new(v, k) for k, v in mapping.items()
+        }
         self.encmapping: dict[str, bytes] = {
-            EnumByteString.new(v, k): v for k, v in mapping.items()
+            self.namemapping[k]: v for k, v in mapping.items()
         }
         self.decmapping: dict[bytes, EnumByteString] = {
-            v: EnumByteString.new(v, k) for k, v in mapping.items()
+            v: self.namemapping[k] for k, v in mapping.items()
         }
         self.ksymapping: dict[bytes, str] = {v: k for k, v in mapping.items()}
 
     def __getattr__(self, name: str) -> EnumByteString:
-        if name in self.encmapping:
-            return self.decmapping[self.encmapping[name]]
-        raise AttributeError
+        # looked up in __dict__, as this is also called before __init__ ran
+        try:
+            return self.__dict__["namemapping"][name]  # type: ignore[no-any-return]
+        except KeyError:
+            raise AttributeError(name) from None
 
     def _decode(self, obj: bytes, _: Context, path: str):  # type: ignore[no-untyped-def]
         try:
@@ -81,22 +241,45 @@ class EnumStr(TheAdapter):
             raise MappingError(msg, path=path) from exc
 
     def _emitparse(self, code):  # type: ignore[no-untyped-def]
+        code.append("""
+            from itksn.common import EnumByteString
+
+            def parse_enumstr(obj, mapping):
+                try:
+                    return mapping[obj]
+                except KeyError:
+                    raise MappingError(f"parsing failed, no mapping for {obj!r}") from None
+        """)
         fname = f"factory_{code.allocateId()}"
         code.append(f"{fname} = {self.decmapping!r}")
-        return f"reuse(({self.subcon._compileparse(code)}), lambda x: {fname}.get(x, EnumInteger(x)))"  # type: ignore[attr-defined]  # pylint: disable=protected-access
+        return f"parse_enumstr({self.subcon._compileparse(code)}, {fname})"  # type: ignore[attr-defined]  # pylint: disable=protected-access
 
     def _emitbuild(self, code):  # type: ignore[no-untyped-def]
+        code.append("""
+            def build_enumstr(obj, mapping, func):
+                try:
+                    func(mapping[obj])
+                except KeyError:
+                    raise MappingError(f"building failed, no mapping for {obj!r}") from None
+                return obj
+        """)
         fname = f"factory_{code.allocateId()}"
         code.append(f"{fname} = {self.encmapping!r}")
-        return f"reuse({fname}.get(obj, obj), lambda obj: ({self.subcon._compilebuild(code)}))"  # type: ignore[attr-defined]  # pylint: disable=protected-access
+        return f"build_enumstr(obj, {fname}, lambda obj: {self.subcon._compilebuild(code)})"  # type: ignore[attr-defined]  # pylint: disable=protected-access
 
-    def _emitprimitivetype(self, ksy, _):  # type: ignore[no-untyped-def]
-        name = f"enum_{ksy.allocateId()}"
-        ksy.enums[name] = self.ksymapping
-        return name
+    def _emitprimitivetype(self, _ksy, _):  # type: ignore[no-untyped-def]
+        # Kaitai enums map integers, the bytes are read as a big-endian one
+        width = self.subcon.length  # type: ignore[attr-defined]
+        return {1: "u1", 2: "u2be", 4: "u4be", 8: "u8be"}.get(width, f"b{8 * width}")
 
     def _emitfulltype(self, ksy, bitwise):  # type: ignore[no-untyped-def]
-        return self.subcon._compilefulltype(ksy, bitwise)  # type: ignore[attr-defined]  # pylint: disable=protected-access
+        name = f"enum_{ksy.allocateId()}"
+        ksy.enums[name] = {
+            int.from_bytes(value, "big"): kaitai_identifier(key)
+            for value, key in self.decmapping.items()
+            if len(value) == self.subcon.length  # type: ignore[attr-defined]
+        }
+        return {"type": self._emitprimitivetype(ksy, bitwise), "enum": name}  # type: ignore[no-untyped-call]
 
     def _emitseq(self, ksy, bitwise):  # type: ignore[no-untyped-def]
         return self.subcon._compileseq(ksy, bitwise)  # type: ignore[attr-defined]  # pylint: disable=protected-access
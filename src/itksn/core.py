@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from construct import (
-    Bytes,
     PaddedString,
     Struct,
     Switch,
@@ -10,7 +9,7 @@ from construct import (
 )
 
 from itksn import pixels
-from itksn.common import EnumStr
+from itksn.common import Bytes, EnumStr
 
 SerialNumberStruct = "SerialNumber" / Struct(
     "atlas_project" / EnumStr(Bytes(2), atlas_detector=b"20"),
@@ -28,7 +27,7 @@ SerialNumberStruct = "SerialNumber" / Struct(
     ),
     "subproject_code"
     / Switch(
-        lambda ctx: ctx.project_code,
+        this.project_code,
         {
             "pixel": EnumStr(
                 Bytes(1),
@@ -74,3 +73,6 @@ SerialNumberStruct = "SerialNumber" / Struct(
     ),
     Terminated,
 )
+
+#: compiled equivalent of :data:`SerialNumberStruct`, used by :func:`itksn.parse` and :func:`itksn.build`
+CompiledSerialNumberStruct = SerialNumberStruct.compile()
@@ -0,0 +1,102 @@
+"""
+Structured errors for serial numbers that fail to parse.
+
+:func:`itksn.validate` and :func:`itksn.try_parse` return a :class:`FieldError`
+instead of raising, so that invalid serial numbers cost about as much as valid
+ones when checking many at once.
+"""
+
+from __future__ import annotations
+
+from enum import Enum
+from typing import Any, NamedTuple
+
+from construct import (
+    ConstError,
+    ExplicitError,
+    MappingError,
+    SelectError,
+    StreamError,
+    TerminatedError,
+)
+
+
+class ErrorCode(str, Enum):
+    """
+    The kind of problem with a serial number.
+    """
+
+    #: the serial number ends before this field
+    too_short = "too_short"
+    #: the bytes are not one of the allowed values of an enum field
+    unknown_value = "unknown_value"
+    #: the bytes do not match the allowed constant(s)
+    bad_constant = "bad_constant"
+    #: the component does not exist for this (sub)project
+    not_allowed = "not_allowed"
+    #: there are characters after the last field
+    trailing_data = "trailing_data"
+    #: a field derived from others could not be computed
+    invalid_value = "invalid_value"
+
+
+#: exception raised by :func:`itksn.parse` for each code
+_exceptions: dict[ErrorCode, type[Exception]] = {
+    ErrorCode.too_short: StreamError,
+    ErrorCode.unknown_value: MappingError,
+    ErrorCode.bad_constant: ConstError,
+    ErrorCode.not_allowed: ExplicitError,
+    ErrorCode.trailing_data: TerminatedError,
+    ErrorCode.invalid_value: ValueError,
+}
+
+
+class FieldError(NamedTuple):
+    """
+    Why a serial number is invalid.
+
+    Attributes:
+        code: the kind of problem
+        field: dotted path of the field, e.g. ``identifier.FE_chip_version``,
+            or ``None`` if the problem is not about a single field
+        offset: position of the field in the serial number, if known
+        value: the offending bytes
+        allowed: the values the field can take, e.g. the ``EnumByteString``
+            members of an enum field, or empty if not applicable
+        message: human readable description
+        exception_type: the exception :func:`itksn.parse` raises instead
+    """
+
+    code: ErrorCode
+    field: str | None
+    offset: int | None
+    value: bytes
+    allowed: tuple[Any, ...]
+    message: str
+    exception_type: type[Exception]
+
+    def exception(self) -> Exception:
+        """
+        The exception :func:`itksn.parse` raises for this serial number.
+        """
+        return self.exception_type(self.message)
+
+    @classmethod
+    def from_exception(cls, exc: Exception) -> FieldError:
+        """
+        Describe an exception raised by :func:`itksn.parse`, as far as possible.
+        """
+        code = next(
+            (
+                code
+                for code, exc_type in _exceptions.items()
+                if isinstance(exc, exc_type)
+            ),
+            ErrorCode.bad_constant
+            if isinstance(exc, SelectError)
+            else ErrorCode.invalid_value,
+        )
+        return cls(code, None, None, b"", (), " ".join(str(exc).split()), type(exc))
+
+
+__all__ = ("ErrorCode", "FieldError")
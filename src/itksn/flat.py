@@ -0,0 +1,669 @@
+"""
+Flat lookup-table decoder.
+
+Every pixel serial number starts with a 7-byte prefix (``20UPGFC``) that fully
+determines the layout of the remaining bytes, up to a handful of switches on
+identifier fields. Instead of walking the nested ``Switch`` tree of
+:data:`itksn.core.SerialNumberStruct` for every serial number, this module
+resolves that tree once per prefix into a flat sequence of steps that slice the
+input directly.
+
+:data:`itksn.core.SerialNumberStruct` remains the reference implementation:
+results and exception types are identical to those of :func:`itksn.parse`, and
+prefixes that cannot be flattened (e.g. strips, or malformed prefixes) are
+handed to the compiled reference parser. Like the compiled parser (and unlike
+the interpreted ``SerialNumberStruct``), a truncated constant raises
+``ConstError``/``SelectError`` rather than ``StreamError``.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import Any
+
+from construct import (
+    Bytes,
+    Const,
+    ConstError,
+    Construct,
+    ConstructError,
+    Container,
+    Error,
+    ExplicitError,
+    MappingError,
+    Pass,
+    Pointer,
+    Select,
+    SelectError,
+    StreamError,
+    Struct,
+    Switch,
+    Terminated,
+    TerminatedError,
+)
+from construct import Computed as _Computed
+from construct.core import Renamed, evaluate
+
+from itksn.common import EnumByteString, EnumStr
+from itksn.core import CompiledSerialNumberStruct, SerialNumberStruct
+from itksn.errors import ErrorCode, FieldError
+
+#: length of the prefix that selects a layout
+PREFIX_LENGTH = 7
+
+#: exceptions that ``Computed`` fields raise for malformed serial numbers
+ComputedErrors = (ValueError, KeyError)
+
+#: what :meth:`Step.check` returns, the position after the field or the error
+CheckResult = int | FieldError
+
+
+class Step:
+    """
+    A single field of a flattened layout.
+
+    ``parse`` reads the field starting at ``pos``, stores it in ``obj`` under
+    ``name`` (unless anonymous), and returns the position after the field.
+    ``outer`` is the container enclosing ``obj``, for computed fields.
+
+    ``check`` validates the field the same way, but returns a
+    :class:`~itksn.errors.FieldError` instead of raising. If ``obj`` is
+    ``None``, nothing is stored.
+    """
+
+    __slots__ = ("name", "path")
+
+    def __init__(self, name: str | None, path: str) -> None:
+        self.name = name
+        self.path = path
+
+    def parse(self, data: bytes, pos: int, obj: Container[Any], outer: Any) -> int:
+        """
+        Parse this field into ``obj``.
+        """
+        raise NotImplementedError
+
+    def check(
+        self, data: bytes, pos: int, obj: Container[Any] | None, outer: Any
+    ) -> CheckResult:
+        """
+        Validate this field, see :meth:`Layout.check`.
+        """
+        raise NotImplementedError
+
+    def _error(
+        self,
+        code: ErrorCode,
+        offset: int,
+        value: bytes,
+        message: str,
+        exception_type: type[Exception],
+        allowed: tuple[Any, ...] = (),
+    ) -> FieldError:
+        field = ".".join(self.path.split(" -> ")[1:]) or None
+        return FieldError(code, field, offset, value, allowed, message, exception_type)
+
+    def _short(
+        self, data: bytes, pos: int, width: int, allowed: tuple[Any, ...] = ()
+    ) -> FieldError:
+        msg = f"stream read less than specified amount, expected {width}, found {max(len(data) - pos, 0)}"
+        return self._error(
+            ErrorCode.too_short, pos, data[pos:], msg, StreamError, allowed
+        )
+
+    def _read(self, data: bytes, pos: int, width: int) -> bytes:
+        end = pos + width
+        if end > len(data):
+            msg = f"stream read less than specified amount, expected {width}, found {max(len(data) - pos, 0)}"
+            raise StreamError(msg, path=self.path)
+        return data[pos:end]
+
+
+class RawStep(Step):
+    """
+    Fixed-width bytes.
+    """
+
+    __slots__ = ("width",)
+
+    def __init__(self, name: str | None, path: str, width: int) -> None:
+        super().__init__(name, path)
+        self.width = width
+
+    def parse(self, data: bytes, pos: int, obj: Container[Any], _outer: Any) -> int:
+        end = pos + self.width
+        if end > len(data):
+            self._read(data, pos, self.width)
+        if self.name:
+            obj[self.name] = data[pos:end]
+        return end
+
+    def check(
+        self, data: bytes, pos: int, obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        end = pos + self.width
+        if end > len(data):
+            return self._short(data, pos, self.width)
+        if obj is not None and self.name:
+            obj[self.name] = data[pos:end]
+        return end
+
+
+class EnumStep(Step):
+    """
+    Fixed-width bytes mapped through an :class:`~itksn.common.EnumStr`.
+    """
+
+    __slots__ = ("allowed", "enum", "mapping", "width")
+
+    def __init__(self, name: str | None, path: str, enum: EnumStr) -> None:
+        super().__init__(name, path)
+        self.enum = enum
+        self.mapping = enum.decmapping
+        self.allowed = tuple(enum.decmapping.values())
+        self.width: int = enum.subcon.length  # type: ignore[attr-defined]
+
+    def parse(self, data: bytes, pos: int, obj: Container[Any], _outer: Any) -> int:
+        end = pos + self.width
+        value = self.mapping.get(data[pos:end])
+        if value is None:
+            raw = self._read(data, pos, self.width)
+            msg = f"parsing failed, no mapping for {raw!r}"
+            raise MappingError(msg, path=self.path)
+        if self.name:
+            obj[self.name] = value
+        return end
+
+    def check(
+        self, data: bytes, pos: int, obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        end = pos + self.width
+        value = self.mapping.get(data[pos:end])
+        if value is None:
+            if end > len(data):
+                return self._short(data, pos, self.width, self.allowed)
+            raw = data[pos:end]
+            msg = f"parsing failed, no mapping for {raw!r}"
+            return self._error(
+                ErrorCode.unknown_value, pos, raw, msg, MappingError, self.allowed
+            )
+        if obj is not None and self.name:
+            obj[self.name] = value
+        return end
+
+
+class ConstStep(Step):
+    """
+    Fixed bytes that must match one of the allowed values (``Const``, or a
+    ``Select`` of ``Const``).
+    """
+
+    __slots__ = ("values", "width")
+
+    def __init__(self, name: str | None, path: str, values: tuple[bytes, ...]) -> None:
+        super().__init__(name, path)
+        self.values = values
+        self.width = len(values[0])
+
+    def parse(self, data: bytes, pos: int, obj: Container[Any], _outer: Any) -> int:
+        # like the compiled parser, compare what is there without checking the
+        # length first, so a truncated constant is a mismatch, not a short read
+        value = data[pos : pos + self.width]
+        if value not in self.values:
+            raise self._mismatch()(self._message(value), path=self.path)
+        if self.name:
+            obj[self.name] = value
+        return pos + self.width
+
+    def check(
+        self, data: bytes, pos: int, obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        end = pos + self.width
+        value = data[pos:end]
+        if value not in self.values:
+            code = ErrorCode.bad_constant
+            if end > len(data) and any(v.startswith(value) for v in self.values):
+                # the input may still be completed to a valid constant
+                code = ErrorCode.too_short
+            return self._error(
+                code,
+                pos,
+                value,
+                self._message(value),
+                self._mismatch(),
+                self.values,
+            )
+        if obj is not None and self.name:
+            obj[self.name] = value
+        return end
+
+    def _mismatch(self) -> type[ConstructError]:
+        return SelectError if len(self.values) > 1 else ConstError
+
+    def _message(self, value: bytes) -> str:
+        if len(self.values) > 1:
+            return "no subconstruct matched"
+        return f"parsing expected {self.values[0]!r} but parsed {value!r}"
+
+
+class PointerStep(Step):
+    """
+    Fixed-width bytes at an absolute offset, without advancing.
+    """
+
+    __slots__ = ("offset", "width")
+
+    def __init__(self, name: str | None, path: str, offset: int, width: int) -> None:
+        super().__init__(name, path)
+        self.offset = offset
+        self.width = width
+
+    def parse(self, data: bytes, pos: int, obj: Container[Any], _outer: Any) -> int:
+        value = self._read(data, self.offset, self.width)
+        if self.name:
+            obj[self.name] = value
+        return pos
+
+    def check(
+        self, data: bytes, pos: int, obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        end = self.offset + self.width
+        if end > len(data):
+            return self._short(data, self.offset, self.width)
+        if obj is not None and self.name:
+            obj[self.name] = data[self.offset : end]
+        return pos
+
+
+class ComputedStep(Step):
+    """
+    A value computed from the fields parsed so far.
+    """
+
+    __slots__ = ("func",)
+
+    def __init__(self, name: str | None, path: str, func: Any) -> None:
+        super().__init__(name, path)
+        self.func = func
+
+    def parse(self, _data: bytes, pos: int, obj: Container[Any], outer: Any) -> int:
+        value = evaluate(self.func, Container(obj, _=outer))  # type: ignore[arg-type]
+        if self.name:
+            obj[self.name] = value
+        return pos
+
+    def check(
+        self, _data: bytes, pos: int, obj: Container[Any] | None, outer: Any
+    ) -> CheckResult:
+        # computed fields only occur in dependent layouts, where obj is set
+        try:
+            value = evaluate(self.func, Container(obj, _=outer))  # type: ignore[arg-type]
+        except ComputedErrors as exc:
+            return self._error(ErrorCode.invalid_value, pos, b"", str(exc), type(exc))
+        if obj is not None and self.name:
+            obj[self.name] = value
+        return pos
+
+
+class PassStep(Step):
+    """
+    An empty field, parsed as ``None``.
+    """
+
+    __slots__ = ()
+
+    def parse(self, _data: bytes, pos: int, obj: Container[Any], _outer: Any) -> int:
+        if self.name:
+            obj[self.name] = None
+        return pos
+
+    def check(
+        self, _data: bytes, pos: int, obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        if obj is not None and self.name:
+            obj[self.name] = None
+        return pos
+
+
+class ErrorStep(Step):
+    """
+    A field that always fails (``Error``).
+    """
+
+    __slots__ = ()
+
+    def parse(self, _data: bytes, _pos: int, _obj: Container[Any], _outer: Any) -> int:
+        msg = "Error field was activated during parsing"
+        raise ExplicitError(msg, path=self.path)
+
+    def check(
+        self, _data: bytes, pos: int, _obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        msg = "Error field was activated during parsing"
+        return self._error(ErrorCode.not_allowed, pos, b"", msg, ExplicitError)
+
+
+class TerminatedStep(Step):
+    """
+    Checks that all of the input was consumed.
+    """
+
+    __slots__ = ()
+
+    def parse(self, data: bytes, pos: int, _obj: Container[Any], _outer: Any) -> int:
+        if pos != len(data):
+            msg = "expected end of stream"
+            raise TerminatedError(msg, path=self.path)
+        return pos
+
+    def check(
+        self, data: bytes, pos: int, _obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        if pos != len(data):
+            msg = "expected end of stream"
+            return self._error(
+                ErrorCode.trailing_data, pos, data[pos:], msg, TerminatedError
+            )
+        return pos
+
+
+class StructStep(Step):
+    """
+    A nested struct, parsed into its own container.
+    """
+
+    __slots__ = ("steps",)
+
+    def __init__(self, name: str | None, path: str, steps: tuple[Step, ...]) -> None:
+        super().__init__(name, path)
+        self.steps = steps
+
+    def parse(self, data: bytes, pos: int, obj: Container[Any], _outer: Any) -> int:
+        sub: Container[Any] = Container()
+        for step in self.steps:
+            pos = step.parse(data, pos, sub, obj)
+        if self.name:
+            obj[self.name] = sub
+        return pos
+
+    def check(
+        self, data: bytes, pos: int, obj: Container[Any] | None, _outer: Any
+    ) -> CheckResult:
+        sub: Container[Any] | None = None if obj is None else Container()
+        result: CheckResult = pos
+        for step in self.steps:
+            result = step.check(data, result, sub, obj)  # type: ignore[arg-type]
+            if type(result) is not int:
+                return result
+        if obj is not None and self.name:
+            obj[self.name] = sub
+        return result
+
+
+class SwitchStep(Step):
+    """
+    A switch on a field parsed earlier in the same struct.
+    """
+
+    __slots__ = ("cases", "default", "keyfunc")
+
+    def __init__(
+        self,
+        name: str | None,
+        path: str,
+        keyfunc: Any,
+        cases: dict[Any, Step],
+        default: Step,
+    ) -> None:
+        super().__init__(name, path)
+        self.keyfunc = keyfunc
+        self.cases = cases
+        self.default = default
+
+    def parse(self, data: bytes, pos: int, obj: Container[Any], outer: Any) -> int:
+        step = self.cases.get(evaluate(self.keyfunc, obj), self.default)  # type: ignore[arg-type]
+        return step.parse(data, pos, obj, outer)
+
+    def check(
+        self, data: bytes, pos: int, obj: Container[Any] | None, outer: Any
+    ) -> CheckResult:
+        step = self.cases.get(evaluate(self.keyfunc, obj), self.default)  # type: ignore[arg-type]
+        return step.check(data, pos, obj, outer)
+
+
+def _compile(
+    subcon: Construct[Any, Any], name: str | None, path: str, context: Container[Any]
+) -> Step:
+    """
+    Flatten ``subcon`` given the values known at plan time in ``context``.
+
+    Raises:
+        NotImplementedError: if ``subcon`` has no flat equivalent
+    """
+    while isinstance(subcon, Renamed):
+        name = subcon.name
+        path = f"{path} -> {name}"
+        subcon = subcon.subcon
+
+    if isinstance(subcon, Switch):
+        try:
+            key = evaluate(subcon.keyfunc, context)  # type: ignore[arg-type]
+        except (KeyError, AttributeError):
+            cases = {
+                key: _compile(case, name, path, context)
+                for key, case in subcon.cases.items()
+            }
+            default = _compile(subcon.default, name, path, context)
+            return SwitchStep(name, path, subcon.keyfunc, cases, default)
+        return _compile(subcon.cases.get(key, subcon.default), name, path, context)
+
+    if isinstance(subcon, EnumStr) and isinstance(subcon.subcon, Bytes):
+        return EnumStep(name, path, subcon)
+    if isinstance(subcon, Bytes) and isinstance(subcon.length, int):
+        return RawStep(name, path, subcon.length)
+    if isinstance(subcon, Const) and isinstance(subcon.value, bytes):
+        return ConstStep(name, path, (subcon.value,))
+    if isinstance(subcon, Select) and all(
+        isinstance(sc, Const) and isinstance(sc.value, bytes) for sc in subcon.subcons
+    ):
+        values = tuple(sc.value for sc in subcon.subcons)  # type: ignore[attr-defined]
+        if len({len(value) for value in values}) == 1:
+            return ConstStep(name, path, values)
+    if isinstance(subcon, Pointer) and isinstance(subcon.offset, int):
+        inner = _compile(subcon.subcon, name, path, context)
+        if isinstance(inner, RawStep) and subcon.offset >= 0:
+            return PointerStep(name, path, subcon.offset, inner.width)
+    if isinstance(subcon, _Computed):
+        return ComputedStep(name, path, subcon.func)
+    if isinstance(subcon, Struct):
+        inner_context: Container[Any] = Container(_=context)
+        steps = tuple(
+            _compile(sc, sc.name, path, inner_context) for sc in subcon.subcons
+        )
+        return StructStep(name, path, steps)
+    if subcon is Pass:
+        return PassStep(name, path)
+    if subcon is Error:
+        return ErrorStep(name, path)
+    if subcon is Terminated:
+        return TerminatedStep(name, path)
+
+    msg = f"cannot flatten {subcon!r} at {path}"
+    raise NotImplementedError(msg)
+
+
+class Layout:
+    """
+    The flattened layout of all serial numbers sharing a 7-byte prefix.
+    """
+
+    __slots__ = ("dependent", "header", "prefix", "steps")
+
+    def __init__(
+        self, prefix: bytes, header: dict[str, EnumByteString], steps: tuple[Step, ...]
+    ) -> None:
+        #: the 7-byte prefix, e.g. ``b"20UPGFC"``
+        self.prefix = prefix
+        #: the decoded prefix fields, ``atlas_project`` to ``component_code``
+        self.header = header
+        #: the steps parsing everything after the prefix
+        self.steps = steps
+        #: whether some fields depend on others, see :meth:`check`
+        self.dependent = any(_dependent(step) for step in steps)
+
+    def parse(self, data: bytes) -> Container[Any]:
+        """
+        Parse a serial number starting with :attr:`prefix`.
+        """
+        obj: Container[Any] = Container(self.header)
+        pos = PREFIX_LENGTH
+        for step in self.steps:
+            pos = step.parse(data, pos, obj, obj)
+        return obj
+
+    def check(
+        self, data: bytes, obj: Container[Any] | None = None
+    ) -> FieldError | None:
+        """
+        Validate a serial number starting with :attr:`prefix`.
+
+        Checks the same as :meth:`parse` and stops at the first failing field,
+        returning its error instead of raising.
+
+        Without ``obj``, no result is built: the fields are only kept around if
+        the layout has computed fields or switches that need them. Pass a copy
+        of :attr:`header` as ``obj`` to parse into it at the same time.
+        """
+        if obj is None and self.dependent:
+            obj = Container(self.header)
+        result: CheckResult = PREFIX_LENGTH
+        for step in self.steps:
+            result = step.check(data, result, obj, obj)  # type: ignore[arg-type]
+            if type(result) is not int:
+                return result  # type: ignore[return-value]
+        return None
+
+    def locate(self, field: str, obj: dict[str, Any]) -> tuple[int, int]:
+        """
+        The offset and width of ``field`` in serial numbers with this layout.
+
+        Args:
+            field: dotted path of the field, e.g. ``identifier.number``
+            obj: the values of the fields that the layout switches on, in
+                the same form as for :func:`itksn.build`
+
+        Raises:
+            KeyError: if the layout has no such field
+            ValueError: if the field is not stored at a fixed position
+        """
+        offset, width = _locate(self.steps, field.split("."), PREFIX_LENGTH, obj)
+        if width is None:
+            msg = f"no field {field!r}"
+            raise KeyError(msg)
+        return offset, width
+
+
+def _locate(
+    steps: tuple[Step, ...], names: list[str], pos: int, obj: dict[str, Any]
+) -> tuple[int, int | None]:
+    """
+    Find the field ``names`` in ``steps`` starting at ``pos``.
+
+    Returns its offset and width, or the position after ``steps`` and
+    ``None`` if it is not there.
+    """
+    for candidate in steps:
+        step = candidate
+        while isinstance(step, SwitchStep):
+            step = step.cases.get(evaluate(step.keyfunc, Container(obj)), step.default)  # type: ignore[arg-type]
+        found = bool(names) and step.name == names[0]
+        if isinstance(step, StructStep):
+            inner = obj.get(step.name) or {} if step.name else obj
+            pos, width = _locate(step.steps, names[1:] if found else [], pos, inner)
+            if width is not None or found:
+                return pos, width
+        elif isinstance(step, (RawStep, EnumStep, ConstStep)):
+            if found and len(names) == 1:
+                return pos, step.width
+            pos += step.width
+        elif found:
+            msg = f"{step.path} is not stored at a fixed position"
+            raise ValueError(msg)
+    return pos, None
+
+
+def _dependent(step: Step) -> bool:
+    if isinstance(step, (ComputedStep, SwitchStep)):
+        return True
+    if isinstance(step, StructStep):
+        return any(_dependent(sub) for sub in step.steps)
+    return False
+
+
+def _expand(
+    subcons: list[Construct[Any, Any]],
+    prefix: bytes,
+    context: Container[Any],
+    header: dict[str, EnumByteString],
+    layouts: dict[bytes, Layout],
+) -> None:
+    """
+    Enumerate every value of the enum fields making up the prefix.
+    """
+    if len(prefix) == PREFIX_LENGTH:
+        try:
+            steps = tuple(_compile(sc, sc.name, "(parsing)", context) for sc in subcons)
+        except NotImplementedError:
+            return
+        layouts[prefix] = Layout(prefix, dict(header), steps)
+        return
+
+    subcon, *rest = subcons
+    name: str = subcon.name  # type: ignore[assignment]
+    field = subcon.subcon  # type: ignore[attr-defined]
+    while isinstance(field, Switch):
+        field = field.cases.get(evaluate(field.keyfunc, context), field.default)  # type: ignore[arg-type]
+    if not isinstance(field, EnumStr):
+        return
+
+    for data, value in field.decmapping.items():
+        if len(data) != field.subcon.length:  # type: ignore[attr-defined]
+            continue
+        context[name] = header[name] = value
+        _expand(rest, prefix + data, context, header, layouts)
+    context.pop(name, None)
+    header.pop(name, None)
+
+
+@functools.cache
+def layouts() -> dict[bytes, Layout]:
+    """
+    All flattened layouts, keyed by their 7-byte prefix.
+
+    Built on first use.
+    """
+    table: dict[bytes, Layout] = {}
+    _expand(
+        list(SerialNumberStruct.subcon.subcons),  # type: ignore[attr-defined]
+        b"",
+        Container(),
+        {},
+        table,
+    )
+    return table
+
+
+def parse(data: bytes) -> Container[Any]:
+    """
+    Parse a serial number using the flat lookup table.
+
+    Equivalent to :func:`itksn.parse`, falling back to it for prefixes that
+    are not in the table.
+    """
+    layout = layouts().get(data[:PREFIX_LENGTH])
+    if layout is None:
+        return CompiledSerialNumberStruct.parse(data)
+    return layout.parse(data)
+
+
+__all__ = ("PREFIX_LENGTH", "Layout", "Step", "layouts", "parse")
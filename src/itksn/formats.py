@@ -0,0 +1,229 @@
+"""
+Machine-readable output formats for parsed serial numbers.
+
+Parsed serial numbers are flattened into rows with one column per field, using
+dotted paths for nested fields (``identifier.FE_chip_version``). Enum fields
+produce two columns, the name and its ``bytevalue``
+(``identifier.FE_chip_version.bytevalue``). The set of columns is fixed, it
+covers every field of every layout, so rows of different component types can
+be written to the same CSV or Parquet file. So are the types of the columns,
+see :func:`column_types`.
+"""
+
+from __future__ import annotations
+
+import csv
+import functools
+import json
+from collections.abc import Callable, Iterable, Iterator
+from itertools import islice
+from typing import IO, Any
+
+from construct import Construct, Pass, Struct, Switch
+from construct.core import Renamed
+
+from itksn.common import Computed, EnumByteString, EnumStr
+from itksn.core import SerialNumberStruct
+
+#: supported output formats
+FORMATS = ("json", "jsonl", "csv", "parquet")
+
+#: number of rows written at once by default
+BATCH_SIZE = 1024
+
+Row = dict[str, Any]
+
+#: called with the number of rows of each batch once it is written
+Progress = Callable[[int], None]
+
+
+def _decode(value: bytes) -> str:
+    return value.decode("utf-8", errors="backslashreplace")
+
+
+def flatten(container: dict[str, Any], prefix: str = "") -> Row:
+    """
+    Flatten a parsed serial number into a single-level dictionary.
+
+    Private fields (starting with ``_``) are skipped, ``bytes`` are decoded to
+    ``str``.
+    """
+    row: Row = {}
+    for key, value in container.items():
+        if key.startswith("_"):
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            row.update(flatten(value, f"{path}."))
+        elif isinstance(value, EnumByteString):
+            row[path] = str(value)
+            row[f"{path}.bytevalue"] = _decode(value.bytevalue)
+        elif isinstance(value, bytes):
+            row[path] = _decode(value)
+        else:
+            row[path] = value
+    return row
+
+
+def _columns(
+    subcon: Construct[Any, Any], path: str, seen: dict[str, type[Any]]
+) -> None:
+    while isinstance(subcon, Renamed):
+        subcon = subcon.subcon
+    if isinstance(subcon, Struct):
+        for sc in subcon.subcons:
+            if sc.name and not sc.name.startswith("_"):
+                _columns(sc, f"{path}.{sc.name}" if path else sc.name, seen)
+    elif isinstance(subcon, Switch):
+        for case in [*subcon.cases.values(), subcon.default]:
+            _columns(case, path, seen)
+    elif subcon is not Pass and path:
+        kind = subcon.result_type if isinstance(subcon, Computed) else str
+        # a field that is not of the same type in every layout is text
+        seen[path] = kind if seen.get(path, kind) is kind else str
+        if isinstance(subcon, EnumStr):
+            seen[f"{path}.bytevalue"] = str
+
+
+@functools.cache
+def _column_types() -> dict[str, type[Any]]:
+    seen: dict[str, type[Any]] = {"serialnumber": str}
+    _columns(SerialNumberStruct, "", seen)
+    return seen
+
+
+@functools.cache
+def columns() -> tuple[str, ...]:
+    """
+    Every column a flattened row can have, in a stable order.
+
+    The first column, ``serialnumber``, holds the serial number itself.
+    """
+    return tuple(_column_types())
+
+
+def column_types() -> dict[str, type[Any]]:
+    """
+    The type of each of :func:`columns`, ``int`` or ``str``.
+
+    Types come from the definitions (``result_type`` of ``Computed`` fields,
+    e.g. ``identifier.wafer``), not from the serial numbers being written, so
+    that every file has the same schema. Values can also be ``None``, for
+    serial numbers without the field.
+    """
+    return dict(_column_types())
+
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """
+    Split ``iterable`` into lists of at most ``size`` items.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def write_jsonl(
+    rows: Iterable[Row],
+    stream: IO[str],
+    batch_size: int = BATCH_SIZE,
+    progress: Progress | None = None,
+) -> None:
+    """
+    Write one JSON object per line.
+    """
+    for batch in batched(rows, batch_size):
+        stream.write("".join(f"{json.dumps(row)}\n" for row in batch))
+        if progress is not None:
+            progress(len(batch))
+
+
+def write_json(
+    rows: Iterable[Row],
+    stream: IO[str],
+    batch_size: int = BATCH_SIZE,
+    progress: Progress | None = None,
+) -> None:
+    """
+    Write a single JSON array of objects, without holding all rows in memory.
+    """
+    separator = "[\n"
+    for batch in batched(rows, batch_size):
+        stream.write(separator + ",\n".join(json.dumps(row) for row in batch))
+        separator = ",\n"
+        if progress is not None:
+            progress(len(batch))
+    stream.write("[]\n" if separator == "[\n" else "\n]\n")
+
+
+def write_csv(
+    rows: Iterable[Row],
+    stream: IO[str],
+    batch_size: int = BATCH_SIZE,
+    progress: Progress | None = None,
+) -> None:
+    """
+    Write CSV with a header row and one column per field of :func:`columns`.
+    """
+    writer = csv.DictWriter(stream, fieldnames=columns(), lineterminator="\n")
+    writer.writeheader()
+    for batch in batched(rows, batch_size):
+        writer.writerows(batch)
+        if progress is not None:
+            progress(len(batch))
+
+
+def write_parquet(
+    rows: Iterable[Row],
+    path: str,
+    batch_size: int = BATCH_SIZE,
+    progress: Progress | None = None,
+) -> None:
+    """
+    Write a Parquet file with one column per field of :func:`columns`.
+
+    Columns are strings, except the integer ones of :func:`column_types`
+    (e.g. ``identifier.wafer``), which are 64-bit integers.
+
+    Requires ``pyarrow``.
+    """
+    try:
+        import pyarrow as pa  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+    except ImportError as exc:
+        msg = "Writing parquet requires pyarrow: python -m pip install 'itksn[arrow]'"
+        raise ImportError(msg) from exc
+
+    types = column_types()
+    schema = pa.schema(
+        [
+            (name, pa.int64() if kind is int else pa.string())
+            for name, kind in types.items()
+        ]
+    )
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batched(rows, batch_size):
+            data = {
+                name: [
+                    value if value is None else kind(value)
+                    for value in (row.get(name) for row in batch)
+                ]
+                for name, kind in types.items()
+            }
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            if progress is not None:
+                progress(len(batch))
+
+
+__all__ = (
+    "BATCH_SIZE",
+    "FORMATS",
+    "batched",
+    "column_types",
+    "columns",
+    "flatten",
+    "write_csv",
+    "write_json",
+    "write_jsonl",
+    "write_parquet",
+)
@@ -0,0 +1,272 @@
+"""
+Parse columns of serial numbers in pandas and Arrow.
+
+Importing this module registers an ``itksn`` accessor on :class:`pandas.Series`
+that decodes a whole column of serial numbers at once, with a column per field.
+Fields that take one of a fixed set of values (``component_code``,
+``FE_chip_version``, ``PCB_manufacturer``, ...) are categorical, with all
+values the field can take as categories. Integer computed fields (``wafer``,
+...) are nullable integers, and other fields categorical text, e.g.
+``number``, which is not always digits (``01F00``).
+
+>>> import pandas as pd
+>>> import itksn.frames
+>>> frame = pd.Series(["20UPGFC1048575", "20UPGR92101041", "20UPGX"]).itksn.parse()
+>>> frame["valid"].tolist()
+[True, True, False]
+>>> frame["component_code"].tolist()
+['FE_chip', 'Digital_quad_module', nan]
+>>> frame["identifier.FE_chip_version"].dtype.name
+'category'
+>>> frame["identifier.wafer"].tolist()
+[255, <NA>, <NA>]
+
+Pixel serial numbers are decoded column-wise with :mod:`itksn.vectorize`, other
+serial numbers (e.g. strips) are parsed one at a time.
+
+Requires ``numpy`` and ``pandas`` (``python -m pip install 'itksn[pandas]'``) or
+``pyarrow`` (``python -m pip install 'itksn[numpy,arrow]'``) for
+:func:`parse_arrow`.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+
+from itksn.flat import PREFIX_LENGTH, EnumStep, Step, StructStep, SwitchStep, layouts
+from itksn.formats import Row, flatten
+from itksn.validation import try_parse
+from itksn.vectorize import Piece, as_array, decode_pieces
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+
+class Categories(NamedTuple):
+    """
+    A field stored as the index of its value in ``categories``, ``-1`` if missing.
+    """
+
+    codes: np.ndarray
+    categories: tuple[str, ...]
+
+
+class Integers(NamedTuple):
+    """
+    An integer field, with a mask of the serial numbers without a value.
+    """
+
+    values: np.ndarray
+    missing: np.ndarray
+
+
+#: a decoded field, or ``valid`` as a ``bool`` array
+Column = Categories | Integers | np.ndarray
+
+
+def _enums(
+    steps: tuple[Step, ...], path: str, found: dict[str, dict[str, None]]
+) -> None:
+    for step in steps:
+        if isinstance(step, SwitchStep):
+            _enums((*step.cases.values(), step.default), path, found)
+        elif isinstance(step, StructStep):
+            _enums(step.steps, f"{path}{step.name}." if step.name else path, found)
+        elif isinstance(step, EnumStep) and step.name:
+            names = found.setdefault(f"{path}{step.name}", {})
+            names.update(dict.fromkeys(str(value) for value in step.allowed))
+
+
+@functools.cache
+def _categories() -> dict[str, tuple[str, ...]]:
+    """
+    All values of each field with a fixed set of values, in definition order.
+    """
+    found: dict[str, dict[str, None]] = {}
+    for layout in layouts().values():
+        for name, value in layout.header.items():
+            found.setdefault(name, {})[str(value)] = None
+        _enums(layout.steps, "", found)
+    return {name: tuple(names) for name, names in found.items()}
+
+
+def _as_array(serialnumbers: Any) -> np.ndarray:
+    values = np.asarray(serialnumbers)
+    if values.dtype.kind in "SU" or (values.dtype == np.uint8 and values.ndim == 2):
+        return as_array(values)
+    # missing values (None, NaN) are empty serial numbers
+    return as_array(
+        [item if isinstance(item, (bytes, str)) else b"" for item in values.tolist()]
+    )
+
+
+def _others(array: np.ndarray, valid: np.ndarray) -> list[tuple[int, Row]]:
+    """
+    Parse the serial numbers that are not pixel serial numbers one at a time.
+    """
+    table = layouts()
+    rows = []
+    for index in np.flatnonzero(~valid).tolist():
+        data = array[index].tobytes().rstrip(b"\0")
+        if data[:PREFIX_LENGTH] in table:
+            # a pixel serial number, but not a valid one
+            continue
+        outcome = try_parse(data)
+        if outcome.value is not None:
+            rows.append((index, flatten(outcome.value)))
+    return rows
+
+
+def _categories_of(name: str, pieces: list[Piece], valid: np.ndarray) -> Categories:
+    position = {
+        category: code for code, category in enumerate(_categories().get(name, ()))
+    }
+    codes = np.full(len(valid), -1, dtype=np.int32)
+    for rows, values in pieces:
+        # most pieces hold a single value, e.g. the component code of a prefix
+        uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+        lookup = np.full(len(uniques), -1, dtype=np.int32)
+        for index, unique in enumerate(uniques.tolist()):
+            if unique:
+                lookup[index] = position.setdefault(unique, len(position))
+        codes[rows] = lookup[inverse]
+    # fields were decoded before later fields of the same rows failed
+    codes[~valid] = -1
+    return Categories(codes, tuple(position))
+
+
+def _integers(pieces: list[Piece], valid: np.ndarray) -> Integers:
+    values = np.full(len(valid), -1, dtype=np.int64)
+    for rows, piece in pieces:
+        values[rows] = piece
+    values[~valid] = -1
+    return Integers(values, values == -1)
+
+
+def decode_fields(
+    serialnumbers: np.ndarray | Iterable[bytes | str],
+) -> dict[str, Column]:
+    """
+    Decode serial numbers into a column per field, by dotted name.
+
+    Fields are integers if every value is one (e.g. ``identifier.wafer``),
+    categories otherwise, so that no text is lost (e.g. ``identifier.number``).
+    Missing values (e.g. ``None``) are not valid serial numbers.
+    """
+    array = _as_array(serialnumbers)
+    valid, decoded = decode_pieces(array)
+
+    others: dict[str, list[tuple[int, Any]]] = {}
+    for index, row in _others(array, valid):
+        valid[index] = True
+        for name, value in row.items():
+            if not name.endswith(".bytevalue") and value is not None:
+                others.setdefault(name, []).append((index, value))
+
+    fields: dict[str, Column] = {"valid": valid}
+    for name in dict.fromkeys([*decoded, *others]):
+        pieces = decoded.get(name, [])
+        rows = np.array([index for index, _ in others.get(name, [])], dtype=np.int64)
+        values = [value for _, value in others.get(name, [])]
+        if (
+            all(piece.dtype.kind in "iu" for _, piece in pieces)
+            and all(isinstance(value, int) for value in values)
+            and (pieces or values)
+        ):
+            extra = np.array(values, dtype=np.int64)
+            fields[name] = _integers([*pieces, (rows, extra)], valid)
+        else:
+            extra = np.array([str(value) for value in values], dtype=str)
+            fields[name] = _categories_of(name, [*pieces, (rows, extra)], valid)
+    return fields
+
+
+def parse_frame(
+    serialnumbers: np.ndarray | Iterable[bytes | str], index: Any = None
+) -> pd.DataFrame:
+    """
+    Decode serial numbers into a :class:`pandas.DataFrame`, a column per field.
+
+    Text fields are categorical and integer fields are ``Int64``; both are
+    missing for serial numbers that are not valid or do not have the field.
+    """
+    import pandas as pd  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+
+    data: dict[str, Any] = {}
+    for name, field in decode_fields(serialnumbers).items():
+        if isinstance(field, Categories):
+            data[name] = pd.Categorical.from_codes(field.codes, field.categories)
+        elif isinstance(field, Integers):
+            data[name] = pd.arrays.IntegerArray(field.values, field.missing)
+        else:
+            data[name] = field
+    return pd.DataFrame(data, index=index)
+
+
+def parse_arrow(serialnumbers: pa.Array | pa.ChunkedArray) -> pa.StructArray:
+    """
+    Decode an Arrow array of serial numbers into a struct array, a field each.
+
+    Text fields are dictionary encoded. Nulls are not valid serial numbers.
+    Use :meth:`pyarrow.Table.from_struct_array` to get a table.
+    """
+    try:
+        import pyarrow as pa  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+    except ImportError as exc:  # pragma: no cover
+        msg = "Parsing Arrow arrays requires pyarrow: python -m pip install 'itksn[arrow]'"
+        raise ImportError(msg) from exc
+
+    if isinstance(serialnumbers, pa.ChunkedArray):
+        serialnumbers = serialnumbers.combine_chunks()
+    fields = decode_fields(serialnumbers.to_numpy(zero_copy_only=False))
+    arrays = []
+    for field in fields.values():
+        if isinstance(field, Categories):
+            arrays.append(
+                pa.DictionaryArray.from_arrays(
+                    pa.array(field.codes, mask=field.codes < 0),
+                    pa.array(field.categories, type=pa.string()),
+                )
+            )
+        elif isinstance(field, Integers):
+            arrays.append(pa.array(field.values, mask=field.missing))
+        else:
+            arrays.append(pa.array(field))
+    return pa.StructArray.from_arrays(arrays, names=list(fields))
+
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    pass
+else:
+
+    @pd.api.extensions.register_series_accessor("itksn")
+    class SerialNumberAccessor:
+        """
+        The ``itksn`` accessor of a :class:`pandas.Series` of serial numbers.
+        """
+
+        def __init__(self, series: pd.Series) -> None:
+            self._series = series
+
+        def parse(self) -> pd.DataFrame:
+            """
+            Decode the serial numbers, see :func:`parse_frame`.
+            """
+            return parse_frame(self._series.to_numpy(), index=self._series.index)
+
+
+__all__ = (
+    "Categories",
+    "Column",
+    "Integers",
+    "decode_fields",
+    "parse_arrow",
+    "parse_frame",
+)
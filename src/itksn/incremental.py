@@ -0,0 +1,268 @@
+"""
+Parse serial numbers as they are typed or scanned, one character at a time.
+
+Hand scanners and keyboard wedges deliver a serial number character by
+character. :class:`IncrementalParser` accepts the input as it arrives and
+tells, after every character, whether the input can still become a valid
+serial number, which field the next character belongs to, and which
+characters may come next.
+
+>>> from itksn.incremental import IncrementalParser
+>>> parser = IncrementalParser()
+>>> parser.feed("20UPG")
+True
+>>> parser.field
+'component_code'
+>>> parser.feed("R9")
+True
+>>> parser.field, sorted(parser.allowed_next)
+('identifier.FE_chip_version', ['0', '1', '2', '3', '4', '5', '9'])
+>>> parser.feed("X")
+False
+>>> parser.error.field, parser.error.value
+('identifier.FE_chip_version', b'X')
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from construct import ConstError, Container, MappingError
+
+from itksn.common import EnumByteString, as_bytes
+from itksn.errors import ErrorCode, FieldError
+from itksn.flat import PREFIX_LENGTH, Layout, layouts
+from itksn.validation import check_prefix
+
+#: the characters :attr:`IncrementalParser.allowed_next` chooses from,
+#: printable ASCII without the space
+ALPHABET = tuple(chr(code) for code in range(0x21, 0x7F))
+
+
+#: characters padding a partial field without a fixed set of values, to check
+#: the fields computed from it; digits first, as most of these are numbers
+_FILLERS = (b"0", b"1", b"A", b" ")
+
+#: the widest field without a fixed set of values that is padded
+_MAX_WIDTH = 32
+
+
+def _completions(error: FieldError) -> list[bytes]:
+    """
+    The ways to complete the field the input ends in, if it has a fixed set of values.
+    """
+    return [
+        raw[len(error.value) :]
+        for raw in (getattr(value, "bytevalue", value) for value in error.allowed)
+        if raw.startswith(error.value)
+    ]
+
+
+def _mismatch(error: FieldError) -> FieldError:
+    """
+    Describe a field whose start matches none of its values.
+    """
+    if all(isinstance(value, EnumByteString) for value in error.allowed):
+        msg = f"parsing failed, no mapping starts with {error.value!r}"
+        return error._replace(
+            code=ErrorCode.unknown_value, message=msg, exception_type=MappingError
+        )
+    msg = f"parsing expected one of {error.allowed!r} but parsed {error.value!r}"
+    return error._replace(
+        code=ErrorCode.bad_constant, message=msg, exception_type=ConstError
+    )
+
+
+class IncrementalParser:
+    """
+    Parse a serial number while it arrives.
+
+    The prefix is decoded once: as soon as its 7 characters are in, the
+    layout of the identifier is looked up and only the identifier is checked
+    for every further character. When the input ends within a field, the
+    fields computed from it are checked on completions of it, so that e.g. an
+    FE chip number only allows the characters its batch can be decoded from.
+    """
+
+    __slots__ = ("_allowed", "_data", "_error", "_layout", "_viable")
+
+    def __init__(self, data: bytes | str = b"") -> None:
+        self._data = b""
+        self._layout: Layout | None = None
+        self._error: FieldError | None = None
+        self._viable = True
+        self._allowed: frozenset[str] | None = None
+        self._update(as_bytes(data))
+
+    def _check(self, data: bytes) -> FieldError | None:
+        layout = None
+        if len(data) >= PREFIX_LENGTH:
+            layout = self._layout or layouts().get(data[:PREFIX_LENGTH])
+        if layout is None:
+            return check_prefix(data)[1]
+        return layout.check(data)
+
+    def _passes(self, data: bytes, error: FieldError) -> FieldError | None:
+        """
+        Check ``data``, a completion of the field that failed with ``error``.
+
+        Returns ``None`` if the completed field and the fields computed from
+        it are valid (the input may end in a later field), or the error.
+        """
+        probed = self._check(data)
+        if probed is None or (
+            probed.code is ErrorCode.too_short
+            # parsed without a layout (e.g. strips), where it ends is not known
+            and (probed.offset is None or probed.offset > (error.offset or 0))
+        ):
+            return None
+        return probed
+
+    def _assess(self, data: bytes) -> tuple[FieldError | None, bool]:
+        """
+        Check ``data``, and tell whether it is a valid serial number or the start of one.
+        """
+        error = self._check(data)
+        if error is None:
+            return None, True
+        if error.code is not ErrorCode.too_short:
+            return error, False
+        if error.offset is None:
+            # not known where the field starts, only its start can be checked
+            return error, not error.allowed or bool(_completions(error))
+        if error.allowed:
+            completions = _completions(error)
+            if not completions:
+                return _mismatch(error), False
+            failed = error
+            for completion in completions:
+                probed = self._passes(data + completion, error)
+                if probed is None:
+                    return error, True
+                failed = probed
+            return failed, False
+        # the input ends within a field such as a number, pad it to its width
+        # to check the fields computed from it (e.g. the batch of an FE chip)
+        failed = error
+        for filler in _FILLERS:
+            probe = data
+            for _ in range(_MAX_WIDTH):
+                probe += filler
+                probed = self._check(probe)
+                if probed is None or probed.offset != error.offset:
+                    break
+            else:
+                return error, True
+            probed = self._passes(probe, error)
+            if probed is None:
+                return error, True
+            if failed is error:
+                msg = f"no completion of {error.value!r} is valid, {probed.message}"
+                failed = probed._replace(message=msg)
+        return failed, False
+
+    def _update(self, data: bytes) -> None:
+        if len(data) < PREFIX_LENGTH:
+            self._layout = None
+        elif self._layout is None:
+            self._layout = layouts().get(data[:PREFIX_LENGTH])
+        self._data = data
+        self._error, self._viable = self._assess(data)
+        self._allowed = None
+
+    def feed(self, data: bytes | str) -> bool:
+        """
+        Append the next character(s), returning whether the input is still viable.
+
+        Once the input is invalid, further input cannot make it valid again,
+        see :meth:`backspace`.
+        """
+        self._update(self._data + as_bytes(data))
+        return self._viable
+
+    def backspace(self, count: int = 1) -> bool:
+        """
+        Remove the last ``count`` characters, returning whether the input is viable.
+        """
+        self._update(self._data[: max(len(self._data) - count, 0)])
+        return self._viable
+
+    def reset(self) -> None:
+        """
+        Forget all input, e.g. to start over with the next serial number.
+        """
+        self._update(b"")
+
+    @property
+    def data(self) -> bytes:
+        """
+        The input so far.
+        """
+        return self._data
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the input so far is a valid serial number, or the start of one.
+        """
+        return self._viable
+
+    @property
+    def complete(self) -> bool:
+        """
+        Whether the input so far is a valid serial number.
+        """
+        return self._error is None
+
+    @property
+    def error(self) -> FieldError | None:
+        """
+        Why the input cannot become a valid serial number, or ``None`` if it still can.
+        """
+        return None if self._viable else self._error
+
+    @property
+    def field(self) -> str | None:
+        """
+        The dotted path of the field the next character belongs to.
+
+        ``None`` if the input is complete or invalid, or if the field is not
+        known before parsing (e.g. for strips).
+        """
+        if self._error is None or not self._viable:
+            return None
+        return self._error.field
+
+    @property
+    def allowed_next(self) -> frozenset[str]:
+        """
+        The characters of :data:`ALPHABET` that keep the input viable.
+
+        Empty if the input is invalid, or complete and cannot be extended.
+        """
+        if self._allowed is None:
+            allowed: frozenset[str] = frozenset()
+            if self._viable:
+                allowed = frozenset(
+                    char
+                    for char in ALPHABET
+                    if self._assess(self._data + char.encode())[1]
+                )
+            self._allowed = allowed
+        return self._allowed
+
+    def value(self) -> Container[Any] | None:
+        """
+        The parsed serial number, or ``None`` if the input is not complete.
+        """
+        if self._error is not None:
+            return None
+        if self._layout is None:
+            return check_prefix(self._data)[0]
+        return self._layout.parse(self._data)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+
+__all__ = ("ALPHABET", "IncrementalParser")
@@ -0,0 +1,462 @@
+"""
+Look up serial numbers by the values of their fields, without parsing them again.
+
+A :class:`FieldIndex` parses an inventory of serial numbers once and stores an
+inverted index per field in an SQLite database: for each value of each field
+(the component code, every enum of the identifier, computed fields such as the
+``wafer`` of an FE chip, ...), the serial numbers having it. Questions like
+"all FE chips from wafer 12 of batch ITkpix_v2" are then answered from the
+index alone.
+
+>>> with FieldIndex(":memory:") as index:
+...     index.add(["20UPGFC0001234", "20UPGFC0001289", "20UPGFC1048575"])
+...     index.query(component_code="FE_chip", wafer=4)
+3
+[b'20UPGFC0001234']
+
+Fields are named as in :func:`itksn.formats.flatten` (``identifier.wafer``),
+or by their last part (``wafer``) when no other field has it. Values are
+compared as text, ``wafer=4`` and ``wafer="4"`` are the same.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from itertools import islice
+from types import TracebackType
+from typing import Any
+
+from itksn.common import as_bytes, open_sqlite
+from itksn.flat import (
+    PREFIX_LENGTH,
+    ComputedStep,
+    EnumStep,
+    Step,
+    StructStep,
+    SwitchStep,
+    layouts,
+)
+from itksn.schema import fingerprint
+from itksn.validation import try_parse
+
+#: version of the database layout, indexes of other versions are rebuilt
+STORAGE_VERSION = 1
+
+#: number of serial numbers parsed and stored per transaction
+CHUNK_SIZE = 10_000
+
+#: number of serial numbers looked up in the database at once
+_LOOKUP_SIZE = 500
+
+
+def indexed_fields(
+    container: Mapping[str, Any], prefix: str = ""
+) -> Iterator[tuple[str, str]]:
+    """
+    The indexed fields of a parsed serial number, as ``(name, value)`` pairs.
+
+    Enum and computed fields are indexed. Raw bytes (e.g. the running
+    ``number``) identify a single component and are not, nor are private or
+    skipped (``None``) fields.
+
+    >>> from itksn import parse
+    >>> dict(indexed_fields(parse(b"20UPGR92101041")))["identifier.FE_chip_version"]
+    'ITkpix_v1p1'
+    """
+    for key, value in container.items():
+        if key.startswith("_") or value is None or isinstance(value, bytes):
+            continue
+        if isinstance(value, Mapping):
+            yield from indexed_fields(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", str(value)
+
+
+def _step_fields(steps: Iterable[Step], path: str, names: set[str]) -> None:
+    for step in steps:
+        if isinstance(step, SwitchStep):
+            _step_fields((*step.cases.values(), step.default), path, names)
+        elif isinstance(step, StructStep):
+            inner = f"{path}{step.name}." if step.name else path
+            _step_fields(step.steps, inner, names)
+        elif (
+            isinstance(step, (EnumStep, ComputedStep))
+            and step.name
+            and not step.name.startswith("_")
+        ):
+            names.add(f"{path}{step.name}")
+
+
+@functools.cache
+def _schema_fields() -> frozenset[str]:
+    """
+    The names of the fields of pixel serial numbers that can be indexed.
+    """
+    names: set[str] = set()
+    for layout in layouts().values():
+        names.update(layout.header)
+        _step_fields(layout.steps, "", names)
+    return frozenset(names)
+
+
+class FieldIndex:
+    """
+    Inverted indexes of the fields of many serial numbers, in an SQLite database.
+
+    Args:
+        path: the database file, created if needed, or ``":memory:"``
+
+    :meth:`add` parses and indexes serial numbers, :meth:`query` and
+    :meth:`count` look them up by field values. Each serial number is stored
+    with the :func:`~itksn.schema.fingerprint` of the definitions that parsed
+    it, and after upgrading ``itksn``, :meth:`refresh` parses again exactly
+    those whose layout changed. The index can be shared between threads.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self._connection = open_sqlite(
+            path, STORAGE_VERSION, ("postings", "fields", "serials", "prefixes")
+        )
+        self._lock = threading.Lock()
+        with self._connection as connection:
+            # the fingerprint only depends on the prefix, it is stored once per prefix
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS prefixes (id INTEGER PRIMARY KEY,"
+                " prefix BLOB UNIQUE NOT NULL, fingerprint TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS serials (id INTEGER PRIMARY KEY,"
+                " serialnumber BLOB UNIQUE NOT NULL, prefix INTEGER NOT NULL,"
+                " valid INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS serials_prefix ON serials (prefix)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS fields (id INTEGER PRIMARY KEY,"
+                " name TEXT UNIQUE NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS postings (field INTEGER NOT NULL,"
+                " value TEXT NOT NULL, serial INTEGER NOT NULL,"
+                " PRIMARY KEY (field, value, serial)) WITHOUT ROWID"
+            )
+        self._fields: dict[str, int] = {}
+        self._load_fields()
+
+    def __enter__(self) -> FieldIndex:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        The number of valid serial numbers in the index.
+        """
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT count(*) FROM serials WHERE valid"
+            ).fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _load_fields(self) -> None:
+        self._fields = dict(self._connection.execute("SELECT name, id FROM fields"))
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[tuple[sqlite3.Connection, dict[str, int]]]:
+        """
+        A transaction, and a dict for the ids of the fields it adds.
+
+        The new fields are only cached once the transaction is committed, as
+        their ids are gone if it rolls back (e.g. on ``KeyboardInterrupt``).
+        """
+        fields: dict[str, int] = {}
+        with self._lock:
+            try:
+                with self._connection as connection:
+                    yield connection, fields
+            except BaseException:
+                self._load_fields()
+                raise
+            self._fields.update(fields)
+
+    def _field_id(
+        self, connection: sqlite3.Connection, name: str, fields: dict[str, int]
+    ) -> int:
+        if name in self._fields:
+            return self._fields[name]
+        if name not in fields:
+            cursor = connection.execute("INSERT INTO fields (name) VALUES (?)", (name,))
+            fields[name] = cursor.lastrowid  # type: ignore[assignment]
+        return fields[name]
+
+    def _prefix_id(self, connection: sqlite3.Connection, prefix: bytes) -> int:
+        row = connection.execute(
+            "SELECT id FROM prefixes WHERE prefix = ?", (prefix,)
+        ).fetchone()
+        if row is not None:
+            return int(row[0])
+        cursor = connection.execute(
+            "INSERT INTO prefixes (prefix, fingerprint) VALUES (?, ?)",
+            (prefix, fingerprint(prefix)),
+        )
+        return cursor.lastrowid  # type: ignore[return-value]
+
+    def _store(
+        self,
+        connection: sqlite3.Connection,
+        fields: dict[str, int],
+        serials: Iterable[tuple[int, bytes]],
+    ) -> None:
+        """
+        Parse and index ``serials``, ``(id, serialnumber)`` pairs not in the index.
+
+        The ids of new fields are put in ``fields``, see :meth:`_transaction`.
+        """
+        prefixes: dict[bytes, int] = {}
+        rows = []
+        postings = []
+        for serial, serialnumber in serials:
+            prefix = serialnumber[:PREFIX_LENGTH]
+            if prefix not in prefixes:
+                prefixes[prefix] = self._prefix_id(connection, prefix)
+            outcome = try_parse(serialnumber)
+            rows.append((serial, serialnumber, prefixes[prefix], outcome.ok))
+            if outcome.value is not None:
+                for name, value in indexed_fields(outcome.value):
+                    field = self._fields.get(name) or self._field_id(
+                        connection, name, fields
+                    )
+                    postings.append((field, value, serial))
+        # inserting in key order touches each page of the index once
+        postings.sort()
+        connection.executemany("INSERT INTO serials VALUES (?, ?, ?, ?)", rows)
+        connection.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+
+    def _known(self, keys: list[bytes]) -> set[bytes]:
+        known: set[bytes] = set()
+        for start in range(0, len(keys), _LOOKUP_SIZE):
+            chunk = keys[start : start + _LOOKUP_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            known.update(
+                serialnumber
+                for (serialnumber,) in self._connection.execute(
+                    f"SELECT serialnumber FROM serials WHERE serialnumber IN ({placeholders})",
+                    chunk,
+                )
+            )
+        return known
+
+    def add(self, serialnumbers: Iterable[bytes | str]) -> int:
+        """
+        Parse and index the serial numbers that are not in the index yet.
+
+        The serial numbers are consumed (and committed) in chunks of
+        :data:`CHUNK_SIZE`, so that inventories of any size can be streamed.
+        Invalid serial numbers are kept track of, but have no fields.
+
+        Returns:
+            the number of serial numbers added
+        """
+        added = 0
+        items = iter(serialnumbers)
+        while chunk := [as_bytes(item) for item in islice(items, CHUNK_SIZE)]:
+            with self._transaction() as (connection, fields):
+                known = self._known(list(dict.fromkeys(chunk)))
+                # in order, for the index of the serial numbers
+                new = sorted({key for key in chunk if key not in known})
+                (last,) = connection.execute(
+                    "SELECT coalesce(max(id), 0) FROM serials"
+                ).fetchone()
+                self._store(connection, fields, enumerate(new, last + 1))
+                added += len(new)
+        return added
+
+    def _resolve(self, name: str) -> int | None:
+        """
+        The id of a field, or ``None`` for a field no serial number has yet.
+        """
+        if name not in self._fields:
+            # added by another connection since
+            self._load_fields()
+        known = _schema_fields().union(self._fields)
+        if name not in known:
+            matches = sorted(field for field in known if field.endswith(f".{name}"))
+            if len(matches) != 1:
+                if matches:
+                    msg = f"ambiguous field {name!r}, one of {matches}"
+                else:
+                    msg = f"unknown field {name!r}, not in {sorted(known)}"
+                raise KeyError(msg)
+            (name,) = matches
+        return self._fields.get(name)
+
+    def _select(
+        self, conditions: Mapping[str, Any] | None, fields: Mapping[str, Any]
+    ) -> tuple[str, list[Any]] | None:
+        """
+        A query of the ids of the valid serial numbers matching all conditions.
+
+        A condition is a value, or a list, tuple or set of values to match any
+        of. ``None`` if a field is not in the index, so nothing matches.
+        """
+        selects = []
+        parameters: list[Any] = []
+        for name, value in {**(conditions or {}), **fields}.items():
+            values = (
+                sorted(value, key=str)
+                if isinstance(value, (list, tuple, set, frozenset))
+                else [value]
+            )
+            field = self._resolve(name)
+            if field is None:
+                return None
+            placeholders = ", ".join("?" * len(values))
+            selects.append(
+                f"SELECT serial FROM postings WHERE field = ? AND value IN ({placeholders})"
+            )
+            parameters.extend([field, *(str(item) for item in values)])
+        if not selects:
+            return "SELECT id FROM serials WHERE valid", []
+        return " INTERSECT ".join(selects), parameters
+
+    def query(
+        self, conditions: Mapping[str, Any] | None = None, /, **fields: Any
+    ) -> list[bytes]:
+        """
+        The serial numbers with all the given field values, sorted.
+
+        Conditions are given as keyword arguments, or as a mapping for field
+        names that are not identifiers (``{"identifier.wafer": 12}``). A
+        condition with several values (a list, tuple or set) matches any of
+        them. Without conditions, all valid serial numbers are returned.
+
+        Raises:
+            KeyError: for a field that serial numbers do not have, or a short
+                name that more than one field has
+        """
+        with self._lock:
+            select = self._select(conditions, fields)
+            if select is None:
+                return []
+            rows = self._connection.execute(
+                f"SELECT serialnumber FROM serials WHERE id IN ({select[0]})"
+                " ORDER BY serialnumber",
+                select[1],
+            ).fetchall()
+        return [serialnumber for (serialnumber,) in rows]
+
+    def count(
+        self, conditions: Mapping[str, Any] | None = None, /, **fields: Any
+    ) -> int:
+        """
+        The number of serial numbers :meth:`query` would return.
+        """
+        with self._lock:
+            select = self._select(conditions, fields)
+            if select is None:
+                return 0
+            (count,) = self._connection.execute(
+                f"SELECT count(*) FROM ({select[0]})", select[1]
+            ).fetchone()
+        return int(count)
+
+    def fields(self) -> list[str]:
+        """
+        The names of the indexed fields, sorted.
+        """
+        with self._lock:
+            return sorted(self._fields)
+
+    def values(self, name: str) -> dict[str, int]:
+        """
+        The values of a field in the index, with their number of serial numbers.
+        """
+        with self._lock:
+            field = self._resolve(name)
+            if field is None:
+                return {}
+            rows = self._connection.execute(
+                "SELECT value, count(*) FROM postings WHERE field = ?"
+                " GROUP BY value ORDER BY value",
+                (field,),
+            ).fetchall()
+        return dict(rows)
+
+    def failures(self) -> list[bytes]:
+        """
+        The serial numbers in the index that are not valid, sorted.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT serialnumber FROM serials WHERE NOT valid ORDER BY serialnumber"
+            ).fetchall()
+        return [serialnumber for (serialnumber,) in rows]
+
+    def refresh(self) -> int:
+        """
+        Parse and index again the serial numbers whose layout changed.
+
+        Only the serial numbers with a prefix whose fingerprint changed (e.g.
+        after an upgrade) are parsed again.
+
+        Returns:
+            the number of serial numbers indexed again
+        """
+        with self._transaction() as (connection, fields):
+            stale = [
+                (prefix_id, prefix)
+                for prefix_id, prefix, stored in connection.execute(
+                    "SELECT id, prefix, fingerprint FROM prefixes"
+                ).fetchall()
+                if fingerprint(prefix) != stored
+            ]
+            if not stale:
+                return 0
+            connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS stale (id INTEGER PRIMARY KEY)"
+            )
+            connection.execute("DELETE FROM stale")
+            serials: list[tuple[int, bytes]] = []
+            for prefix_id, prefix in stale:
+                serials.extend(
+                    connection.execute(
+                        "SELECT id, serialnumber FROM serials WHERE prefix = ?",
+                        (prefix_id,),
+                    )
+                )
+                connection.execute(
+                    "UPDATE prefixes SET fingerprint = ? WHERE id = ?",
+                    (fingerprint(prefix), prefix_id),
+                )
+            connection.executemany(
+                "INSERT INTO stale VALUES (?)", [(serial,) for serial, _ in serials]
+            )
+            # a single pass over the postings, there is no index by serial number
+            connection.execute(
+                "DELETE FROM postings WHERE serial IN (SELECT id FROM stale)"
+            )
+            connection.execute("DELETE FROM serials WHERE id IN (SELECT id FROM stale)")
+            self._store(connection, fields, serials)
+            return len(serials)
+
+
+__all__ = ("CHUNK_SIZE", "STORAGE_VERSION", "FieldIndex", "indexed_fields")
@@ -0,0 +1,677 @@
+"""
+Export the serial number definitions as a Kaitai Struct schema (``.ksy``).
+
+`Kaitai Struct <https://kaitai.io>`_ compiles a ``.ksy`` schema into parsers
+for C++, Java, JavaScript, ... so that tools outside of Python can decode
+serial numbers the same way as ``itksn``. The schema is generated from the
+constructs in :mod:`itksn.core` and :mod:`itksn.pixels`, and follows them
+with a few adaptations to what Kaitai can express:
+
+- enum fields are read as big-endian integers (``U`` is ``0x55``, ``20`` is
+  ``0x3230``) and checked with ``valid: in-enum``, member names are lowercase
+  identifiers with the original name kept as ``-orig-id``;
+- a field whose layout depends on an earlier field (e.g. ``component_code`` on
+  ``subproject_code``) is parsed by a ``by_<field>`` attribute switching on that
+  field, to a type holding the rest of the structure for each value, so that
+  ``identifier`` is at ``by_project_code.by_subproject_code.by_component_code``;
+- computed fields are value instances, with lookup tables written as
+  conditional expressions (and a check that the table has the entry);
+- fields that are skipped (``Pass``) are left out rather than null.
+
+``valid: in-enum`` needs Kaitai Struct 0.11 or later.
+
+The lambdas of the switches and computed fields are translated from their
+source code (:func:`inspect.getsource`), so exporting needs the ``.py`` files
+of ``itksn`` installed. Without them (e.g. a bytecode-only install), it raises
+:class:`NotImplementedError`.
+
+>>> from itksn import ksy
+>>> schema = ksy.to_ksy()
+>>> schema["seq"][0]
+{'id': 'atlas_project', 'type': 'u2be', 'enum': 'atlas_project', 'valid': {'in-enum': True}}
+>>> schema["enums"]["atlas_project"]
+{12848: 'atlas_detector'}
+"""
+
+from __future__ import annotations
+
+import ast
+import contextlib
+import inspect
+import io
+import json
+import os
+import textwrap
+from types import FunctionType
+from typing import Any, NamedTuple
+
+from construct import Computed as _Computed
+from construct import (
+    Const,
+    Construct,
+    Container,
+    Error,
+    FixedSized,
+    NullStripped,
+    Pass,
+    Pointer,
+    Renamed,
+    Select,
+    StringEncoded,
+    Struct,
+    Switch,
+    Terminated,
+)
+from construct.core import evaluate
+
+from itksn.common import Bytes, EnumStr, kaitai_identifier, resolve_switch
+from itksn.core import SerialNumberStruct
+from itksn.pixels import local_supports, modules, services
+
+#: the ``meta/id`` of the exported schema
+SCHEMA_ID = "itk_serial_number"
+
+_INT_TYPES = {1: "u1", 2: "u2be", 4: "u4be", 8: "u8be"}
+
+_OPERATORS = {
+    ast.BitAnd: "&",
+    ast.BitOr: "|",
+    ast.RShift: ">>",
+    ast.LShift: "<<",
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+}
+
+#: the value of a switch key for the default case, equal to none of the cases
+_OTHER = object()
+
+
+def _unique(name: str, used: Any) -> str:
+    candidate, number = name, 1
+    while candidate in used:
+        number += 1
+        candidate = f"{name}_{number}"
+    return candidate
+
+
+def _literal(value: Any) -> str:
+    """
+    A Kaitai expression for a constant.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, bytes):
+        return "[" + ", ".join(f"0x{byte:02x}" for byte in value) + "]"
+    if isinstance(value, str):
+        return json.dumps(str(value), ensure_ascii=False)
+    msg = f"cannot export the constant {value!r}"
+    raise NotImplementedError(msg)
+
+
+class _Unreachable(Exception):
+    """
+    Raised for a computed field that always fails, e.g. a lookup of a missing key.
+    """
+
+
+class _Symbol(NamedTuple):
+    """
+    A field that expressions can refer to.
+
+    ``depth`` counts the ``by_<field>`` types between the start of the
+    structure and the field, to refer to it through ``_parent``.
+    """
+
+    id: str
+    kind: str  # "enum", "bytes", "str" or "value"
+    depth: int
+    enum: str | None = None
+    members: dict[str, str] | None = None
+
+    def ref(self, depth: int) -> str:
+        return "_parent." * (depth - self.depth) + self.id
+
+    def enum_members(self) -> dict[str, str]:
+        """
+        The Kaitai member of each value of an enum field.
+        """
+        if self.members is None:
+            msg = f"{self.id} is a {self.kind} field, not an enum"
+            raise TypeError(msg)
+        return self.members
+
+
+class _Expression(NamedTuple):
+    """
+    A translated (part of a) function: a constant, or a Kaitai expression.
+    """
+
+    text: str | None = None
+    value: Any = None
+    symbol: _Symbol | None = None
+    checks: tuple[str, ...] = ()
+
+    def expr(self) -> str:
+        return self.text if self.text is not None else _literal(self.value)
+
+
+def _lambda(func: FunctionType) -> ast.Lambda:
+    """
+    The syntax tree of the lambda ``func``, from its source.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(func)).strip().rstrip(",")
+        tree = ast.parse(source)
+    except (OSError, TypeError, SyntaxError):
+        msg = (
+            f"cannot export {func!r}, its source is not available"
+            " (are the .py files of itksn installed?)"
+        )
+        raise NotImplementedError(msg) from None
+    lambdas = [node for node in ast.walk(tree) if isinstance(node, ast.Lambda)]
+    # several lambdas on the same lines, e.g. in a dictionary of cases
+    code = func.__code__
+    for node in lambdas:
+        compiled = compile(ast.Expression(node), "<ksy>", "eval").co_consts[0]
+        if (compiled.co_names, compiled.co_consts) == (code.co_names, code.co_consts):
+            return node
+    msg = f"cannot export {func!r}, its source is not a lambda"
+    raise NotImplementedError(msg)
+
+
+class _Generator:
+    """
+    Collects the types and enums of the schema while walking the constructs.
+    """
+
+    def __init__(self) -> None:
+        self.types: dict[str, Any] = {}
+        self.enums: dict[str, Any] = {}
+        self._by_content: dict[tuple[int, str], str] = {}
+        self._struct_names = {
+            id(struct): name
+            for module in (modules, services, local_supports)
+            for name, struct in vars(module).items()
+            if isinstance(struct, Struct)
+        }
+
+    def _add(self, table: dict[str, Any], hint: str, content: Any) -> str:
+        """
+        Add a type or an enum, reusing an identical one if there is one.
+        """
+        key = (id(table), json.dumps(content, sort_keys=True))
+        if key not in self._by_content:
+            name = _unique(hint, table)
+            table[name] = content
+            self._by_content[key] = name
+        return self._by_content[key]
+
+    def enum(self, hint: str, field: EnumStr) -> tuple[str, dict[str, str]]:
+        width: int = field.subcon.length  # type: ignore[attr-defined]
+        entries: dict[int, Any] = {}
+        members: dict[str, str] = {}
+        for raw, value in field.decmapping.items():
+            if len(raw) != width:
+                # can never be read, e.g. a 2-character code in a 1-byte field
+                continue
+            member = _unique(kaitai_identifier(value), members.values())
+            entries[int.from_bytes(raw, "big")] = (
+                member if member == value else {"id": member, "-orig-id": str(value)}
+            )
+            members[str(value)] = member
+        return self._add(self.enums, hint, entries), members
+
+    def seq(
+        self,
+        subcons: list[Construct[Any, Any]],
+        context: Container[Any],
+        symbols: dict[str, _Symbol],
+        depth: int,
+    ) -> dict[str, Any]:
+        """
+        The type parsing ``subcons``, the (rest of the) fields of a struct.
+        """
+        seq: list[dict[str, Any]] = []
+        instances: dict[str, Any] = {}
+        for index, subcon in enumerate(subcons):
+            name: str | None = None
+            field = subcon
+            while isinstance(field, Renamed):
+                name, field = field.name, field.subcon
+            field = resolve_switch(field, context)
+            attr: dict[str, Any] = (
+                {} if name is None else {"id": kaitai_identifier(name)}
+            )
+            if name is not None and attr["id"] != name:
+                attr["-orig-id"] = name
+
+            if isinstance(field, Switch):
+                # the rest depends on a field read at run time
+                seq.append(
+                    self.dispatch(field, subcons[index:], context, symbols, depth)
+                )
+                break
+            if field is Pass:
+                if name is not None:
+                    context[name] = None
+                continue
+            if field is Error:
+                seq.append({**attr, "size": 0, "valid": {"expr": "false"}})
+                break
+            if field is Terminated:
+                seq.append({"size-eos": True, "valid": {"expr": "_.length == 0"}})
+                continue
+
+            # instances need an id, unnamed ones cannot be exported
+            if name is not None and isinstance(field, _Computed):
+                try:
+                    expression = self.expression(field.func, context, symbols, depth)
+                except _Unreachable:
+                    seq.append({"size": 0, "valid": {"expr": "false"}})
+                    break
+                seq.extend(
+                    {"size": 0, "valid": {"expr": check}} for check in expression.checks
+                )
+                instance = attr.pop("id")
+                instances[instance] = {**attr, "value": expression.expr()}
+                kind = "value"
+            elif (
+                name is not None
+                and isinstance(field, Pointer)
+                and isinstance(field.offset, int)
+            ):
+                inner = self.attribute(field.subcon, name, context)
+                instance = attr.pop("id")
+                instances[instance] = {**attr, "pos": field.offset, **inner}
+                kind = "bytes"
+            else:
+                seq.append({**attr, **self.attribute(field, name, context)})
+                kind = "bytes"
+
+            if name is None:
+                continue
+            if isinstance(field, EnumStr):
+                enum, members = self.enum(kaitai_identifier(name), field)
+                symbols[name] = _Symbol(attr["id"], "enum", depth, enum, members)
+            elif isinstance(field, StringEncoded):
+                symbols[name] = _Symbol(attr["id"], "str", depth)
+            else:
+                symbols[name] = _Symbol(kaitai_identifier(name), kind, depth)
+
+        content: dict[str, Any] = {"seq": seq}
+        if instances:
+            content["instances"] = instances
+        return content
+
+    def attribute(
+        self, field: Construct[Any, Any], name: str | None, context: Container[Any]
+    ) -> dict[str, Any]:
+        """
+        The keys of a ``seq`` attribute reading ``field``, besides its ``id``.
+        """
+        if isinstance(field, EnumStr) and isinstance(field.subcon, Bytes):
+            width: int = field.subcon.length  # type: ignore[assignment]
+            enum, _ = self.enum(kaitai_identifier(name or "enum"), field)
+            return {
+                "type": _INT_TYPES.get(width, f"b{8 * width}"),
+                "enum": enum,
+                "valid": {"in-enum": True},
+            }
+        if isinstance(field, Bytes) and isinstance(field.length, int):
+            return {"size": field.length}
+        if isinstance(field, Const) and isinstance(field.value, bytes):
+            return {"contents": list(field.value)}
+        if isinstance(field, Select) and all(
+            isinstance(sc, Const) and isinstance(sc.value, bytes)
+            for sc in field.subcons
+        ):
+            values = [sc.value for sc in field.subcons]  # type: ignore[attr-defined]
+            if len({len(value) for value in values}) == 1:
+                return {
+                    "size": len(values[0]),
+                    "valid": {"any-of": [_literal(value) for value in values]},
+                }
+        if isinstance(field, StringEncoded):
+            # PaddedString
+            padded = getattr(field, "subcon", None)
+            if (
+                isinstance(padded, FixedSized)
+                and isinstance(padded.length, int)
+                and isinstance(padded.subcon, NullStripped)
+            ):
+                return {
+                    "type": "str",
+                    "size": padded.length,
+                    "encoding": field.encoding.upper().replace("UTF8", "UTF-8"),
+                    "pad-right": 0,
+                }
+        if isinstance(field, Struct):
+            hint = self._struct_names.get(
+                id(field), kaitai_identifier(name or "struct")
+            )
+            inner: Container[Any] = Container(_=context)
+            return {
+                "type": self._add(
+                    self.types, hint, self.seq(field.subcons, inner, {}, 0)
+                )
+            }
+
+        msg = f"cannot export {field!r} ({name}) as Kaitai Struct"
+        raise NotImplementedError(msg)
+
+    def dispatch(
+        self,
+        switch: Switch[Any, Any],
+        subcons: list[Construct[Any, Any]],
+        context: Container[Any],
+        symbols: dict[str, _Symbol],
+        depth: int,
+    ) -> dict[str, Any]:
+        """
+        The attribute parsing ``subcons`` with a type per value of the key of ``switch``.
+        """
+        key = _key_name(switch)
+        if key not in symbols:
+            msg = f"cannot export a switch on {switch.keyfunc!r}, it is not a field read before"
+            raise NotImplementedError(msg)
+        symbol = symbols[key]
+        ref = symbol.ref(depth)
+
+        labels: dict[Any, str] = {}
+        if symbol.kind == "enum":
+            members = symbol.enum_members()
+            for value in switch.cases:
+                if value in members:
+                    labels[value] = f"{symbol.enum}::{members[value]}"
+            switch_on = ref
+            exhaustive = len(labels) == len(members)
+        else:
+            values = list(switch.cases)
+            switch_on = "".join(
+                f"{ref} == {_literal(value)} ? {number} : "
+                for number, value in enumerate(values, 1)
+            )
+            switch_on = f"{switch_on}0"
+            labels = {value: str(number) for number, value in enumerate(values, 1)}
+            exhaustive = False
+
+        cases: dict[str, str] = {}
+        for value, label in labels.items():
+            member = label.rsplit(":", 1)[-1]
+            cases[label] = self.continuation(
+                f"{symbol.id}_{member}", key, value, subcons, context, symbols, depth
+            )
+        if not exhaustive:
+            cases["_"] = self.continuation(
+                f"{symbol.id}_other", key, _OTHER, subcons, context, symbols, depth
+            )
+        return {
+            "id": f"by_{symbol.id}",
+            "type": {"switch-on": switch_on, "cases": cases},
+        }
+
+    def continuation(
+        self,
+        hint: str,
+        key: str,
+        value: Any,
+        subcons: list[Construct[Any, Any]],
+        context: Container[Any],
+        symbols: dict[str, _Symbol],
+        depth: int,
+    ) -> str:
+        # the key is known in the case, which resolves the switches on it
+        known: Container[Any] = Container(context)
+        known[key] = value
+        return self._add(
+            self.types, hint, self.seq(subcons, known, dict(symbols), depth + 1)
+        )
+
+    def expression(
+        self,
+        func: Any,
+        context: Container[Any],
+        symbols: dict[str, _Symbol],
+        depth: int,
+    ) -> _Expression:
+        """
+        Translate the lambda of a ``Computed`` field into a Kaitai expression.
+        """
+        if not isinstance(func, FunctionType) or func.__name__ != "<lambda>":
+            msg = f"cannot export the computed field {func!r}"
+            raise NotImplementedError(msg)
+        node = _lambda(func)
+        argument = node.args.args[0].arg
+        expression: _Expression = _Translator(
+            func, argument, context, symbols, depth
+        ).visit(node.body)
+        return expression
+
+
+class _Translator(ast.NodeVisitor):
+    """
+    Translates the body of a lambda taking the context, see :meth:`_Generator.expression`.
+
+    Fields of the struct become references, while anything known when the
+    schema is generated (e.g. ``ctx._.component_code`` of the enclosing
+    struct, or a lookup table) is evaluated right away.
+    """
+
+    def __init__(
+        self,
+        func: FunctionType,
+        argument: str,
+        context: Container[Any],
+        symbols: dict[str, _Symbol],
+        depth: int,
+    ) -> None:
+        self.func = func
+        self.argument = argument
+        self.context = context
+        self.symbols = symbols
+        self.depth = depth
+
+    def generic_visit(self, node: ast.AST) -> _Expression:
+        msg = f"cannot export {ast.unparse(node)!r} in {self.func!r}"
+        raise NotImplementedError(msg)
+
+    def visit_Constant(self, node: ast.Constant) -> _Expression:
+        return _Expression(value=node.value)
+
+    def visit_Name(self, node: ast.Name) -> _Expression:
+        if node.id in self.func.__globals__:
+            return _Expression(value=self.func.__globals__[node.id])
+        return self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> _Expression:
+        path = [node.attr]
+        base = node.value
+        while isinstance(base, ast.Attribute):
+            path.insert(0, base.attr)
+            base = base.value
+        if not isinstance(base, ast.Name) or base.id != self.argument:
+            return self.generic_visit(node)
+        if path[0] == "_":
+            # a field of an enclosing struct, known for this layout
+            value: Any = self.context
+            try:
+                for attr in path:
+                    value = value[attr]
+            except KeyError:
+                return self.generic_visit(node)
+            return _Expression(value=value)
+        if len(path) != 1 or path[0] not in self.symbols:
+            return self.generic_visit(node)
+        symbol = self.symbols[path[0]]
+        return _Expression(text=symbol.ref(self.depth), symbol=symbol)
+
+    def visit_Call(self, node: ast.Call) -> _Expression:
+        if (
+            isinstance(node.func, ast.Name)
+            and node.func.id == "int"
+            and len(node.args) == 1
+            and not node.keywords
+        ):
+            argument: _Expression = self.visit(node.args[0])
+            if argument.symbol is not None and argument.symbol.kind == "bytes":
+                return argument._replace(
+                    text=f'{argument.text}.to_s("ASCII").to_i', symbol=None
+                )
+        return self.generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> _Expression:
+        operator = _OPERATORS.get(type(node.op))
+        if operator is None:
+            return self.generic_visit(node)
+        left, right = self.visit(node.left), self.visit(node.right)
+        operands = [
+            hex(operand.value)
+            if operator in "&|" and type(operand.value) is int and operand.text is None
+            else operand.expr()
+            for operand in (left, right)
+        ]
+        return _Expression(
+            text=f"({operands[0]} {operator} {operands[1]})",
+            checks=left.checks + right.checks,
+        )
+
+    def visit_Tuple(self, node: ast.Tuple) -> _Expression:
+        # only as the key of a lookup, see visit_Subscript
+        return _Expression(value=tuple(self.visit(element) for element in node.elts))
+
+    def visit_Subscript(self, node: ast.Subscript) -> _Expression:
+        table = self.visit(node.value)
+        key = self.visit(node.slice)
+        if table.text is not None or not isinstance(table.value, dict):
+            return self.generic_visit(node)
+        parts = key.value if isinstance(key.value, tuple) else (key,)
+        if all(part.text is None for part in parts):
+            # evaluated now, e.g. the table of the component of the layout
+            try:
+                return _Expression(value=table.value[key.value])
+            except KeyError:
+                raise _Unreachable from None
+
+        entries = []
+        for entry, value in table.value.items():
+            keys = entry if isinstance(key.value, tuple) else (entry,)
+            if len(keys) != len(parts):
+                return self.generic_visit(node)
+            conditions = [self._equals(part, item) for part, item in zip(parts, keys)]
+            if None not in conditions:
+                entries.append((" and ".join(conditions), _literal(value)))  # type: ignore[arg-type]
+        if not entries:
+            return self.generic_visit(node)
+        text = entries[-1][1]
+        for condition, value in reversed(entries[:-1]):
+            text = f"{condition} ? {value} : {text}"
+        check = " or ".join(f"({condition})" for condition, _ in entries)
+        return _Expression(text=f"({text})", checks=(*key.checks, check))
+
+    def _equals(self, part: _Expression, value: Any) -> str | None:
+        """
+        The condition of ``part`` being ``value``, or None if it never is.
+        """
+        if part.text is None:
+            return "true" if part.value == value else None
+        symbol = part.symbol
+        if symbol is not None and symbol.kind == "enum":
+            members = symbol.enum_members()
+            if value not in members:
+                return None
+            return f"{part.text} == {symbol.enum}::{members[value]}"
+        return f"{part.text} == {_literal(value)}"
+
+
+class _Probe(dict):  # type: ignore[type-arg]
+    """
+    A context recording the name of the field a switch key looks up.
+    """
+
+    def __getitem__(self, key: str) -> Any:
+        self.setdefault("key", key)
+        raise KeyError(key)
+
+    __getattr__ = __getitem__
+
+
+def _key_name(switch: Switch[Any, Any]) -> str | None:
+    probe = _Probe()
+    with contextlib.suppress(KeyError, AttributeError):
+        evaluate(switch.keyfunc, probe)  # type: ignore[arg-type]
+    return probe.get("key")
+
+
+def to_ksy(
+    struct: Construct[Any, Any] = SerialNumberStruct, schema_id: str = SCHEMA_ID
+) -> dict[str, Any]:
+    """
+    The Kaitai Struct schema of ``struct``, as a dictionary.
+
+    ``struct`` is :data:`itksn.core.SerialNumberStruct` or another (named)
+    ``Struct`` of the same constructs.
+
+    Raises:
+        TypeError: if ``struct`` is not a ``Struct``
+        NotImplementedError: if a definition has no Kaitai equivalent
+    """
+    while isinstance(struct, Renamed):
+        struct = struct.subcon
+    if not isinstance(struct, Struct):
+        msg = f"expected a Struct, not {type(struct).__name__}"
+        raise TypeError(msg)
+    generator = _Generator()
+    root = generator.seq(struct.subcons, Container(), {}, 0)
+    return {
+        "meta": {"id": schema_id, "title": "ATLAS ITk serial number", "endian": "be"},
+        "doc": (
+            "A 14-character ATLAS ITk serial number, e.g. 20UPGFC1048575.\n"
+            "Generated by itksn, see itksn.ksy for how the layout is mapped."
+        ),
+        **root,
+        "types": generator.types,
+        "enums": generator.enums,
+    }
+
+
+def export_ksy(
+    struct: Construct[Any, Any] = SerialNumberStruct,
+    schemaname: str = SCHEMA_ID,
+    filename: str | bytes | os.PathLike[str] | os.PathLike[bytes] | None = None,
+) -> str:
+    """
+    The Kaitai Struct schema of ``struct`` as YAML, also written to ``filename`` if given.
+
+    Use this instead of :meth:`construct.Construct.export_ksy`, which cannot
+    export :data:`itksn.core.SerialNumberStruct`, with the same arguments
+    after ``struct``. Requires ``ruamel.yaml``.
+    """
+    try:
+        from ruamel.yaml import YAML  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+        from ruamel.yaml.scalarint import HexInt  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+    except ImportError as exc:
+        msg = "Exporting Kaitai Struct schemas requires ruamel.yaml: python -m pip install 'itksn[ksy]'"
+        raise ImportError(msg) from exc
+
+    schema = to_ksy(struct, schemaname)
+    # enum values as in a hex dump, 0x3230 for "20"
+    for name, entries in schema["enums"].items():
+        schema["enums"][name] = {
+            HexInt(value, width=2 * ((value.bit_length() + 7) // 8)): entry
+            for value, entry in entries.items()
+        }
+    yaml = YAML()
+    yaml.width = 4096
+    stream = io.StringIO()
+    yaml.dump(schema, stream)
+    text = stream.getvalue()
+    if filename is not None:
+        with open(filename, "w", encoding="utf-8") as output:  # noqa: PTH123
+            output.write(text)
+    return text
+
+
+__all__ = ("SCHEMA_ID", "export_ksy", "to_ksy")
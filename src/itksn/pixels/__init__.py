@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 from construct import (
-    Bytes,
     Error,
     Switch,
+    this,
 )
 
-from itksn.common import EnumStr
+from itksn.common import Bytes, EnumStr
 from itksn.pixels import local_supports, modules, services, utils
 
 yy_identifiers = {
@@ -28,7 +28,7 @@ subproject_codes = {
 }
 
 identifiers = Switch(
-    lambda ctx: ctx.component_code,
+    this.component_code,
     {
         "FE_chip_wafer": modules.fe_chip,
         "FE_chip": modules.fe_chip,
@@ -1,8 +1,6 @@
 from __future__ import annotations
 
-from construct import Bytes
-
-from itksn.common import EnumStr
+from itksn.common import Bytes, EnumStr
 
 pcb_manufacturer = EnumStr(
     Bytes(1),
@@ -1,11 +1,8 @@
 from __future__ import annotations
 
-from construct import (
-    Bytes,
-    Struct,
-)
+from construct import Struct
 
-from itksn.common import EnumStr
+from itksn.common import Bytes, EnumStr
 from itksn.pixels.common import pcb_manufacturer
 
 local_supports_production_type = EnumStr(
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 from construct import (
-    Bytes,
-    Computed,
     Pass,
     Struct,
     Switch,
+    this,
 )
 
-from itksn.common import EnumStr
+from itksn.common import Bytes, Computed, EnumStr
 from itksn.pixels.common import pcb_manufacturer
 
 triplet_assembly_site = EnumStr(
@@ -41,11 +40,11 @@ batch_number = {
 
 fe_chip = Struct(
     "number" / Bytes(7),
-    "batch_number" / Computed(lambda ctx: (int(ctx.number) & 0xF0000) >> 16),  # type: ignore[arg-type,return-value]
+    "batch_number" / Computed(lambda ctx: (int(ctx.number) & 0xF0000) >> 16, int),  # type: ignore[arg-type,return-value]
     "batch" / Computed(lambda ctx: batch_number[ctx.batch_number]),  # type: ignore[arg-type,return-value]
-    "wafer" / Computed(lambda ctx: (int(ctx.number) & 0x0FF00) >> 8),  # type: ignore[arg-type,return-value]
-    "row" / Computed(lambda ctx: (int(ctx.number) & 0x000F0) >> 4),  # type: ignore[arg-type,return-value]
-    "column" / Computed(lambda ctx: (int(ctx.number) & 0x0000F) >> 0),  # type: ignore[arg-type,return-value]
+    "wafer" / Computed(lambda ctx: (int(ctx.number) & 0x0FF00) >> 8, int),  # type: ignore[arg-type,return-value]
+    "row" / Computed(lambda ctx: (int(ctx.number) & 0x000F0) >> 4, int),  # type: ignore[arg-type,return-value]
+    "column" / Computed(lambda ctx: (int(ctx.number) & 0x0000F) >> 0, int),  # type: ignore[arg-type,return-value]
 )
 
 fe_chip_version = EnumStr(
@@ -107,7 +106,7 @@ bare_module = Struct(
     "FE_chip_version" / fe_chip_version,
     "Vendor_or_Thickness"
     / Switch(
-        lambda ctx: ctx.FE_chip_version,
+        this.FE_chip_version,
         {"RD53A": Bytes(1), "No_chip": Bytes(1)},
         default=EnumStr(
             Bytes(1),
@@ -154,11 +153,11 @@ pcb_triplets = Struct(
     "PCB_manufacturer" / pcb_manufacturer,
     "loading"
     / Switch(
-        lambda ctx: ctx.PCB_manufacturer, {"Dummy": Bytes(1)}, default=pcb_loading_site
+        this.PCB_manufacturer, {"Dummy": Bytes(1)}, default=pcb_loading_site
     ),  # esdape hatch for some dummy/digitals
     "reception"
     / Switch(
-        lambda ctx: ctx.PCB_manufacturer,
+        this.PCB_manufacturer,
         {"Dummy": Bytes(1)},
         default=pcb_reception_site,
     ),  # esdape hatch for some dummy/digitals
@@ -169,11 +168,8 @@ pcb_triplets = Struct(
 module = Struct(
     "FE_chip_version" / fe_chip_version,
     "PCB_manufacturer"
-    / Switch(
-        lambda ctx: ctx.FE_chip_version, {"RD53A": pcb_manufacturer}, default=Pass
-    ),
-    "number"
-    / Switch(lambda ctx: ctx.FE_chip_version, {"RD53A": Bytes(5)}, default=Bytes(6)),
+    / Switch(this.FE_chip_version, {"RD53A": pcb_manufacturer}, default=Pass),
+    "number" / Switch(this.FE_chip_version, {"RD53A": Bytes(5)}, default=Bytes(6)),
 )
 triplet_module = Struct(
     "FE_chip_version" / fe_chip_version,
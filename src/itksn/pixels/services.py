@@ -1,16 +1,15 @@
 from __future__ import annotations
 
 from construct import (
-    Bytes,
-    Computed,
     Const,
     Pointer,
     Select,
     Struct,
     Switch,
+    this,
 )
 
-from itksn.common import EnumStr
+from itksn.common import Bytes, Computed, EnumStr
 
 orientation = EnumStr(
     Bytes(1),
@@ -214,7 +213,7 @@ pb_type0_cable = Struct(
     "type" / EnumStr(Bytes(1), Flat=b"0", Inclined=b"1", Inclined_test_coupon=b"2"),
     "flavor"
     / Switch(
-        lambda ctx: ctx.type,
+        this.type,
         {
             "Flat": EnumStr(Bytes(1), Bottom=b"0", Top=b"1"),
             "Inclined": EnumStr(
@@ -241,7 +240,7 @@ pb_type0_pp0 = Struct(
     "type" / EnumStr(Bytes(1), Flat=b"0", Inclined=b"1", Inclined_test_coupon=b"2"),
     "flavor"
     / Switch(
-        lambda ctx: ctx.type,
+        this.type,
         {
             "Flat": EnumStr(
                 Bytes(1), Short_L2=b"0", Long_L2=b"1", Short_L3_L4=b"2", Long_L3_L4=b"3"
@@ -324,7 +323,7 @@ pb_type1_data = Struct(
     "_reserved" / Pointer(2, Bytes(2)),
     "data"
     / Switch(
-        lambda ctx: ctx._reserved,  # pylint: disable=protected-access
+        this._reserved,  # pylint: disable=protected-access
         {
             b"00": pb_type1_data_inclined,
         },
@@ -335,7 +334,7 @@ pb_type1_data = Struct(
 )
 
 pe_type0_data_mapping = Switch(
-    lambda ctx: ctx.layer,
+    this.layer,
     {
         "L2": EnumStr(
             Bytes(1),
@@ -396,7 +395,7 @@ pe_type1 = Struct(
 type2 = Struct(
     "flavor"
     / Switch(
-        lambda ctx: ctx._.component_code,
+        this._.component_code,
         {
             "Type_2_power_cable": EnumStr(Bytes(1), normal=b"1", abnormal=b"2"),
             "Type_2_optobox_cable": Const(b"0"),
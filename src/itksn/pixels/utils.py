@@ -6,6 +6,7 @@ from construct import (
     Construct,
     Error,
     Switch,
+    this,
 )
 
 # from construct-typing
@@ -23,7 +24,7 @@ def subproject_switch(
     helper utility to pick up a different Construct for different subprojects
     """
     return Switch(
-        lambda ctx: ctx.subproject_code,
+        this.subproject_code,
         {
             "inner_pixel": pi or Error,
             "outer_pixel_barrel": pb or Error,
@@ -0,0 +1,144 @@
+"""
+Compact, immutable records as an alternative to ``construct.Container``.
+
+Each identifier layout (e.g. ``itksn.pixels.modules.module``) gets a frozen
+dataclass with ``__slots__`` and the same field names, named after the layout
+(``Module``). Records take a fraction of the memory of the nested dictionaries
+returned by :func:`itksn.parse`, so they suit keeping many parsed serial
+numbers around. Enum fields hold the same shared ``EnumByteString`` objects as
+the containers, they are not copied per record.
+
+>>> from itksn import records
+>>> sn = records.parse(b"20UPGR92101041")
+>>> sn.identifier
+Module(FE_chip_version=EnumByteString.new(b'2', 'ITkpix_v1p1'), PCB_manufacturer=None, number=b'101041')
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+from typing import Any
+
+from construct import Struct
+
+from itksn.core import CompiledSerialNumberStruct
+from itksn.pixels import identifiers, local_supports, modules, services
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class SerialNumber:
+    """
+    A parsed serial number.
+
+    ``identifier`` is a record of the layout of the component, or ``bytes``
+    for projects without identifier layouts.
+    """
+
+    atlas_project: str
+    system_code: str
+    project_code: str
+    subproject_code: str
+    component_code: str
+    identifier: Any
+
+
+def _fields(struct: Struct) -> tuple[str, ...]:
+    return tuple(
+        sc.name for sc in struct.subcons if sc.name and not sc.name.startswith("_")
+    )
+
+
+def _class_name(name: str) -> str:
+    return "".join(part[:1].upper() + part[1:] for part in name.split("_"))
+
+
+def _make_class(name: str, fields: tuple[str, ...]) -> type:
+    cls = dataclasses.make_dataclass(name, fields, frozen=True, slots=True)
+    cls.__module__ = __name__
+    return cls
+
+
+@functools.cache
+def _classes() -> tuple[dict[str, type], dict[tuple[str, ...], type], dict[str, type]]:
+    """
+    Build the record classes, by name, by field names and by component code.
+    """
+    by_name: dict[str, type] = {}
+    by_struct: dict[int, type] = {}
+    by_fields: dict[tuple[str, ...], type] = {}
+    for module in (modules, services, local_supports):
+        for name, struct in vars(module).items():
+            if not isinstance(struct, Struct):
+                continue
+            fields = _fields(struct)
+            cls = _make_class(_class_name(name), fields)
+            by_name[cls.__name__] = by_struct[id(struct)] = cls
+            # layouts with the same fields share the class of the first one
+            by_fields.setdefault(fields, cls)
+
+    by_component = {
+        component_code: by_struct[id(case)]
+        for component_code, case in identifiers.cases.items()
+        if id(case) in by_struct
+    }
+    return by_name, by_fields, by_component
+
+
+def _record_class(fields: tuple[str, ...], component_code: str | None = None) -> type:
+    _, by_fields, by_component = _classes()
+    cls = by_component.get(component_code) if component_code is not None else None
+    if cls is not None and cls.__match_args__ == fields:  # type: ignore[attr-defined]
+        return cls
+    if fields not in by_fields:
+        # a layout that is not a module-level struct, give it a unique name
+        by_fields[fields] = _make_class(f"Record{len(by_fields)}", fields)
+    return by_fields[fields]
+
+
+def _convert(value: Any, component_code: str | None = None) -> Any:
+    if not isinstance(value, dict):
+        return value
+    items = [(key, item) for key, item in value.items() if not key.startswith("_")]
+    cls = _record_class(tuple(key for key, _ in items), component_code)
+    return cls(*(_convert(item) for _, item in items))
+
+
+def to_record(container: dict[str, Any]) -> SerialNumber:
+    """
+    Convert the result of :func:`itksn.parse` into a :class:`SerialNumber` record.
+    """
+    return SerialNumber(
+        container["atlas_project"],
+        container["system_code"],
+        container["project_code"],
+        container["subproject_code"],
+        container["component_code"],
+        _convert(container["identifier"], container["component_code"]),
+    )
+
+
+def parse(data: bytes) -> SerialNumber:
+    """
+    Parse a serial number into a :class:`SerialNumber` record.
+    """
+    return to_record(CompiledSerialNumberStruct.parse(data))
+
+
+def record_classes() -> dict[str, type]:
+    """
+    The record classes of every identifier layout, by class name.
+    """
+    return dict(_classes()[0])
+
+
+def __getattr__(name: str) -> type:
+    # the classes are created at run time, resolve them for pickle
+    try:
+        return _classes()[0][name]
+    except KeyError:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg) from None
+
+
+__all__ = ("SerialNumber", "parse", "record_classes", "to_record")
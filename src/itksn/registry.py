@@ -0,0 +1,222 @@
+"""
+Registry of the layout of every pixel serial number prefix.
+
+The first 7 bytes of a pixel serial number (e.g. ``20UPGM2``) select the
+component and, with it, the layout of the identifier. The registry answers
+"which component and which fields does this prefix stand for?" with a single
+dictionary lookup, without parsing a full serial number, e.g. to route or
+pre-validate partial input from a scanner.
+
+>>> from itksn import registry
+>>> entry = registry.lookup("20UPGM2")
+>>> entry.component, entry.allowed_subprojects, entry.lengths
+('Outer_system_quad_module', ('PG',), (14,))
+>>> [(field.name, field.offset, field.width) for field in entry.fields]
+[('FE_chip_version', 7, 1), ('PCB_manufacturer', 8, None), ('number', None, None)]
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import Any, NamedTuple
+
+from construct import Construct, Container, Switch
+from construct.core import evaluate
+
+from itksn import pixels
+from itksn.common import as_bytes
+from itksn.flat import (
+    PREFIX_LENGTH,
+    ConstStep,
+    EnumStep,
+    ErrorStep,
+    PointerStep,
+    RawStep,
+    Step,
+    StructStep,
+    SwitchStep,
+    layouts,
+)
+
+
+class Field(NamedTuple):
+    """
+    A field of the identifier stored in the serial number.
+
+    ``offset`` is ``None`` if it depends on earlier fields, and so is
+    ``width`` if it depends on the values of other fields.
+    """
+
+    name: str
+    offset: int | None
+    width: int | None
+
+
+class Entry(NamedTuple):
+    """
+    The layout of the serial numbers starting with ``prefix``.
+
+    Attributes:
+        prefix: the 7-byte prefix, e.g. ``b"20UPGM2"``
+        component: the name of the component, e.g. ``Outer_system_quad_module``
+        subproject_code: the subproject of the prefix, e.g. ``PG``
+        allowed_subprojects: all subprojects the component code is defined for
+        identifier: the construct parsing the identifier
+        fields: the fields of the identifier, in order
+        lengths: the possible lengths of the serial numbers
+        allowed: whether any serial number starts with this prefix, ``False``
+            for components that have no serial numbers (yet)
+    """
+
+    prefix: bytes
+    component: str
+    subproject_code: str
+    allowed_subprojects: tuple[str, ...]
+    identifier: Construct[Any, Any]
+    fields: tuple[Field, ...]
+    lengths: tuple[int, ...]
+    allowed: bool
+
+
+def _width(step: Step) -> int | None:
+    if isinstance(step, (RawStep, EnumStep, ConstStep)):
+        return step.width
+    if isinstance(step, StructStep):
+        widths = [_width(sub) for sub in step.steps]
+        return None if None in widths else sum(widths)  # type: ignore[arg-type]
+    if isinstance(step, SwitchStep):
+        cases = {_width(case) for case in (*step.cases.values(), step.default)}
+        return cases.pop() if len(cases) == 1 else None
+    # pointers, computed and empty fields do not advance
+    return 0
+
+
+def _fields(
+    steps: tuple[Step, ...], path: str, offset: int | None
+) -> tuple[list[Field], int | None]:
+    """
+    Describe the stored fields of ``steps``, returning the offset after them.
+    """
+    fields: list[Field] = []
+    for step in steps:
+        name = f"{path}{step.name}"
+        if step.name and step.name.startswith("_"):
+            # hidden fields, e.g. pointers back into the prefix
+            pass
+        elif isinstance(step, StructStep) and step.name:
+            inner, offset = _fields(step.steps, f"{name}.", offset)
+            fields.extend(inner)
+        elif isinstance(step, PointerStep) and step.name:
+            fields.append(Field(name, step.offset, step.width))
+        elif isinstance(step, (RawStep, EnumStep, ConstStep, SwitchStep)):
+            width = _width(step)
+            if step.name:
+                fields.append(Field(name, offset, width))
+            offset = None if offset is None or width is None else offset + width
+    return fields, offset
+
+
+def _advance(
+    step: Step, obj: dict[str, Any], pos: int
+) -> list[tuple[dict[str, Any], int]]:
+    """
+    The possible states after ``step``, as the fields known so far and the position.
+    """
+    if isinstance(step, SwitchStep):
+        try:
+            key = evaluate(step.keyfunc, Container(obj))  # type: ignore[arg-type]
+        except (KeyError, AttributeError):
+            # switches on bytes that are not enumerated, any case can apply
+            cases = (*step.cases.values(), step.default)
+            return [state for case in cases for state in _advance(case, obj, pos)]
+        return _advance(step.cases.get(key, step.default), obj, pos)
+    if isinstance(step, EnumStep) and step.name:
+        return [({**obj, step.name: value}, pos + step.width) for value in step.allowed]
+    if isinstance(step, StructStep):
+        ends = {end for _, end in _states(step.steps, pos)}
+        return [(obj, end) for end in sorted(ends)]
+    return [(obj, pos + (_width(step) or 0))]
+
+
+def _states(steps: tuple[Step, ...], pos: int) -> list[tuple[dict[str, Any], int]]:
+    states: list[tuple[dict[str, Any], int]] = [({}, pos)]
+    # enumerating the enum fields is only needed for the switches on them
+    branch = any(isinstance(step, SwitchStep) for step in steps)
+    for step in steps:
+        if not branch and isinstance(step, EnumStep):
+            states = [(obj, end + step.width) for obj, end in states]
+            continue
+        states = [state for obj, end in states for state in _advance(step, obj, end)]
+    return states
+
+
+def _identifier(component: str, subproject: str) -> Construct[Any, Any]:
+    identifier: Construct[Any, Any] = pixels.identifiers.cases.get(
+        component, pixels.identifiers.default
+    )
+    if isinstance(identifier, Switch):
+        # laid out differently per subproject, e.g. cables
+        identifier = identifier.cases.get(subproject, identifier.default)
+    return identifier
+
+
+@functools.cache
+def registry() -> dict[bytes, Entry]:
+    """
+    The entry of every prefix, keyed by the 7-byte prefix.
+
+    Built on first use.
+    """
+    entries: dict[bytes, Entry] = {}
+    for prefix, layout in layouts().items():
+        component = str(layout.header["component_code"])
+        subproject = prefix[3:5].decode("utf-8")
+        identifier_step = layout.steps[0]
+        allowed = not isinstance(identifier_step, ErrorStep)
+        fields: list[Field] = []
+        if isinstance(identifier_step, StructStep):
+            fields, _ = _fields(identifier_step.steps, "", PREFIX_LENGTH)
+        lengths = _states(layout.steps[:1], PREFIX_LENGTH) if allowed else []
+        entries[prefix] = Entry(
+            prefix,
+            component,
+            subproject,
+            tuple(pixels.yy_identifiers[component][1:]),
+            _identifier(component, str(layout.header["subproject_code"])),
+            tuple(fields),
+            tuple(sorted({end for _, end in lengths})),
+            allowed,
+        )
+    return entries
+
+
+@functools.cache
+def _candidates() -> dict[bytes, tuple[Entry, ...]]:
+    candidates: dict[bytes, list[Entry]] = {}
+    for prefix, entry in registry().items():
+        for end in range(PREFIX_LENGTH + 1):
+            candidates.setdefault(prefix[:end], []).append(entry)
+    return {partial: tuple(entries) for partial, entries in candidates.items()}
+
+
+def lookup(data: bytes | str) -> Entry | None:
+    """
+    The entry of the prefix of a (possibly partial) serial number.
+
+    Only the first 7 bytes are looked at. Returns ``None`` if there is no
+    pixel component with this prefix, or if ``data`` is shorter than a prefix.
+    """
+    return registry().get(as_bytes(data)[:PREFIX_LENGTH])
+
+
+def candidates(data: bytes | str) -> tuple[Entry, ...]:
+    """
+    The entries of all prefixes a (possibly partial) serial number can start with.
+
+    >>> [entry.component for entry in candidates("20UPGM")][:3]
+    ['Outer_system_quad_module', 'Module_carrier', 'MOPS_chip']
+    """
+    return _candidates().get(as_bytes(data)[:PREFIX_LENGTH], ())
+
+
+__all__ = ("Entry", "Field", "candidates", "lookup", "registry")
@@ -0,0 +1,166 @@
+"""
+Scan files of serial numbers without reading them line by line.
+
+Database exports hold millions of serial numbers, either one per line or
+packed back to back as fixed-width records. :func:`scan` memory-maps such a
+file and finds the records in it as :class:`memoryview` slices of the mapping,
+without decoding lines into ``str`` or splitting the file into lines first.
+Every result carries the byte offset to resume from, so that an interrupted
+scan can continue where it stopped.
+
+>>> from itksn.scan import iter_records
+>>> [(record.offset, record.end, bytes(record.data)) for record in
+...  iter_records(b"20UPGFC1048575\\r\\n\\n  20UPGR92101041\\n")]
+[(0, 16, b'20UPGFC1048575'), (19, 34, b'20UPGR92101041')]
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+from collections.abc import Callable, Generator, Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from construct import Container
+
+from itksn.errors import FieldError
+from itksn.validation import try_parse
+
+#: the length of a serial number, the size of the records of packed files
+RECORD_LENGTH = 14
+
+_WHITESPACE = frozenset(b" \t\r\v\f")
+
+
+class Record(NamedTuple):
+    """
+    A serial number found in a buffer.
+
+    Attributes:
+        offset: position of the serial number in the buffer
+        end: position after the record (and its newline), to resume from
+        data: the serial number, a slice of the buffer
+    """
+
+    offset: int
+    end: int
+    data: memoryview
+
+
+class ScanResult(NamedTuple):
+    """
+    Outcome of parsing a serial number found in a file.
+
+    Exactly one of ``value`` and ``error`` is set, as for
+    :class:`~itksn.validation.ParseOutcome`.
+    """
+
+    offset: int
+    end: int
+    serialnumber: bytes
+    value: Container[Any] | None
+    error: FieldError | None
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the serial number was parsed successfully.
+        """
+        return self.error is None
+
+
+def _iter_lines(
+    view: memoryview, find: Callable[[bytes, int], int], offset: int
+) -> Generator[Record, None, None]:
+    size = len(view)
+    pos = offset
+    while pos < size:
+        newline = find(b"\n", pos)
+        stop = size if newline < 0 else newline
+        end = size if newline < 0 else newline + 1
+        start = pos
+        while start < stop and view[start] in _WHITESPACE:
+            start += 1
+        while stop > start and view[stop - 1] in _WHITESPACE:
+            stop -= 1
+        if start < stop:
+            yield Record(start, end, view[start:stop])
+        pos = end
+
+
+def _iter_packed(
+    view: memoryview, offset: int, length: int
+) -> Generator[Record, None, None]:
+    size = len(view)
+    for start in range(offset, size, length):
+        end = min(start + length, size)
+        yield Record(start, end, view[start:end])
+
+
+def iter_records(
+    buffer: Any,
+    packed: bool = False,
+    offset: int = 0,
+    length: int = RECORD_LENGTH,
+) -> Generator[Record, None, None]:
+    """
+    Find the serial numbers in a buffer, e.g. a :class:`mmap.mmap` of a file.
+
+    Args:
+        buffer: any object supporting the buffer protocol
+        packed: whether the records are ``length`` bytes each, back to back,
+            instead of one per line
+        offset: where to start, e.g. the ``end`` of the last record seen
+        length: the size of packed records
+
+    Lines are stripped of surrounding whitespace (including ``\\r``), and
+    empty lines are skipped. A packed buffer ending in a partial record
+    yields it as is.
+    """
+    view = memoryview(buffer).cast("B")
+    if packed:
+        return _iter_packed(view, offset, length)
+    # searching for newlines is done in C, on the buffer itself where possible
+    if isinstance(buffer, (bytes, bytearray, mmap.mmap)):
+        return _iter_lines(view, buffer.find, offset)
+    return _iter_lines(view, bytes(view).find, offset)
+
+
+def scan(
+    path: str | os.PathLike[str],
+    packed: bool = False,
+    offset: int = 0,
+    length: int = RECORD_LENGTH,
+) -> Iterator[ScanResult]:
+    """
+    Parse the serial numbers in a file, one :class:`ScanResult` each.
+
+    The file is memory-mapped and read as in :func:`iter_records`. Invalid
+    serial numbers do not raise, their error is on the result, see
+    :func:`itksn.try_parse`. To resume an interrupted scan, pass the ``end``
+    of the last result as ``offset``.
+
+    Finding the records does not copy the file, but each serial number is
+    copied once into ``bytes`` to parse it: the results (and the fields parsed
+    from them, e.g. ``identifier.number``) are ``bytes`` like those of
+    :func:`itksn.parse`, and they outlive the mapping.
+    """
+    with Path(path).open("rb") as stream:
+        if os.fstat(stream.fileno()).st_size == 0:
+            return
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            records = iter_records(mapping, packed, offset, length)
+            try:
+                for start, end, data in records:
+                    # the only copy of the record, shared by the result and
+                    # the fields sliced from it
+                    outcome = try_parse(data.tobytes())
+                    # the mapping cannot be closed while slices of it are alive
+                    data.release()
+                    yield ScanResult(start, end, *outcome)
+            finally:
+                records.close()
+
+
+__all__ = ("RECORD_LENGTH", "Record", "ScanResult", "iter_records", "scan")
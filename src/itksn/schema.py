@@ -0,0 +1,302 @@
+"""
+Fingerprints of the serial number definitions.
+
+A fingerprint is a short hash of everything that decides how a serial number is
+parsed: the meaning of its prefix (``20UPGFC`` is a pixel ``FE_chip``) and the
+identifier layout of its component, down to the enum tables and the functions
+of computed fields. It changes when (and only when) a new ``itksn`` release
+parses serial numbers with this prefix differently, so results stored along
+with it (e.g. by :class:`itksn.cache.PersistentCache`) can be reused until then.
+
+>>> from itksn import schema
+>>> schema.fingerprint(b"20UPGFC1048575") == schema.fingerprint(b"20UPGFC0000001")
+True
+>>> schema.fingerprint(b"20UPGFC1048575") == schema.fingerprint(b"20UPGR92101041")
+False
+
+:func:`component_fingerprints` gives a fingerprint per pixel component code
+instead. Saved with one release and compared with the next by :func:`diff`,
+they tell which components are parsed differently after an upgrade.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import io
+import json
+import textwrap
+import tokenize
+from collections.abc import Mapping
+from types import CodeType, FunctionType, ModuleType
+from typing import Any, NamedTuple
+
+from construct import Construct, Container
+from construct.expr import ExprMixin
+
+from itksn import pixels
+from itksn.common import EnumStr, as_bytes, resolve_switch
+from itksn.core import SerialNumberStruct
+from itksn.flat import PREFIX_LENGTH, layouts
+
+#: attributes of constructs that do not change how they parse
+_IGNORED = frozenset({"docs", "flagbuildnone", "parsed", "result_type"})
+
+_SKIPPED_TOKENS = frozenset(
+    {
+        tokenize.COMMENT,
+        tokenize.NL,
+        tokenize.NEWLINE,
+        tokenize.INDENT,
+        tokenize.DEDENT,
+        tokenize.ENDMARKER,
+    }
+)
+
+
+def _describe_code(code: CodeType) -> Any:
+    """
+    What ``code`` refers to: its arguments, names and constants.
+
+    Unlike the bytecode, these do not depend on the version of Python. ``None``
+    is left out, some versions add it to the constants of every function.
+    """
+    return {
+        "arguments": list(code.co_varnames[: code.co_argcount]),
+        "names": list(code.co_names),
+        "constants": [
+            _describe_code(value) if isinstance(value, CodeType) else repr(value)
+            for value in code.co_consts
+            if value is not None
+        ],
+    }
+
+
+def _source(func: FunctionType) -> Any:
+    """
+    The source of ``func`` without comments and formatting.
+
+    Functions without source (e.g. created by ``exec``) are described by
+    :func:`_describe_code` instead.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+    except (OSError, TypeError):
+        return _describe_code(func.__code__)
+    tokens = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type not in _SKIPPED_TOKENS:
+                tokens.append(token.string)
+    except tokenize.TokenError:
+        # the lines of a lambda inside a larger expression
+        pass
+    return " ".join(tokens)
+
+
+def _describe_function(func: FunctionType, seen: set[int]) -> Any:
+    # the tables a function looks up (e.g. ``batch_number``) are part of it
+    names = sorted(name for name in func.__code__.co_names if name in func.__globals__)
+    return {
+        "function": _source(func),
+        # tells apart functions sharing a line, e.g. in a dictionary of cases
+        "names": list(func.__code__.co_names),
+        "globals": {
+            name: _describe(func.__globals__[name], seen)
+            for name in names
+            if not isinstance(func.__globals__[name], ModuleType)
+        },
+    }
+
+
+def _describe(obj: Any, seen: set[int]) -> Any:
+    if isinstance(obj, (bool, int, float, str)) or obj is None:
+        # enum values (``EnumByteString``) are described by their name
+        return str(obj) if isinstance(obj, str) else obj
+    if isinstance(obj, bytes):
+        return {"bytes": obj.hex()}
+    if isinstance(obj, ExprMixin):
+        return {"expr": repr(obj)}
+    if id(obj) in seen:
+        return {"recursive": type(obj).__name__}
+    seen = seen | {id(obj)}
+    if isinstance(obj, Construct):
+        return {
+            "construct": type(obj).__name__,
+            **{
+                key: _describe(value, seen)
+                for key, value in vars(obj).items()
+                if not key.startswith("_") and key not in _IGNORED
+            },
+        }
+    if isinstance(obj, FunctionType):
+        return _describe_function(obj, seen)
+    if isinstance(obj, dict):
+        items = [
+            [_describe(key, seen), _describe(value, seen)] for key, value in obj.items()
+        ]
+        return {"dict": sorted(items, key=json.dumps)}
+    if isinstance(obj, (list, tuple)):
+        return [_describe(item, seen) for item in obj]
+    return {"object": type(obj).__name__, "repr": repr(obj)}
+
+
+def describe(obj: Any) -> Any:
+    """
+    A canonical, JSON-serialisable description of a construct (or any value).
+
+    Two constructs parse the same way if their descriptions are equal.
+    Functions (``Computed`` and ``Switch`` lambdas) are described by their
+    source code and the tables they look up, so that reformatting a function
+    counts as a change while editing a comment does not.
+    """
+    return _describe(obj, set())
+
+
+def digest(description: Any) -> str:
+    """
+    Hash a description from :func:`describe` into a short hexadecimal string.
+    """
+    data = json.dumps(description, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+@functools.cache
+def _field_digest(field: Construct[Any, Any]) -> str:
+    # the tables are shared by many prefixes, e.g. all component codes
+    return digest(describe(field))
+
+
+def _prefix_description(prefix: bytes) -> list[Any]:
+    """
+    Describe how serial numbers starting with ``prefix`` are parsed.
+
+    The fields making up the prefix are described by their decoded values,
+    not by their whole tables, so that e.g. adding a component code does not
+    change the fingerprint of every other component. The other fields are
+    described in full, e.g. the identifier layout of the component.
+    """
+    context: Container[Any] = Container()
+    description: list[Any] = []
+    pos = 0
+    decoding = True
+    for subcon in SerialNumberStruct.subcon.subcons:  # type: ignore[attr-defined]
+        field = resolve_switch(subcon.subcon if subcon.name else subcon, context)
+        if decoding and isinstance(field, EnumStr):
+            width: int = field.subcon.length  # type: ignore[attr-defined]
+            value = field.decmapping.get(prefix[pos : pos + width])
+            if value is not None:
+                context[subcon.name] = value
+                description.append([subcon.name, value.bytevalue.hex(), str(value)])
+                pos += width
+                continue
+        # the prefix is not (fully) decoded by enum fields from here on
+        decoding = False
+        description.append([subcon.name, _field_digest(field)])
+    return description
+
+
+@functools.lru_cache(maxsize=4096)
+def _prefix_fingerprint(prefix: bytes) -> str:
+    return digest(_prefix_description(prefix))
+
+
+def fingerprint(serialnumber: bytes | str) -> str:
+    """
+    The fingerprint of the definitions used to parse ``serialnumber``.
+
+    It only depends on the first 7 characters (the prefix), serial numbers
+    sharing a prefix have the same fingerprint.
+    """
+    return _prefix_fingerprint(as_bytes(serialnumber)[:PREFIX_LENGTH])
+
+
+@functools.cache
+def component_fingerprints() -> dict[str, str]:
+    """
+    A fingerprint per pixel component, by name (e.g. ``FE_chip``).
+
+    Each covers the entry of the component in ``pixels.yy_identifiers`` (its
+    code and the subprojects it is allowed in) and its identifier layout in
+    ``pixels.identifiers``.
+    """
+    identifiers = pixels.identifiers
+    return {
+        name: digest(
+            [
+                name,
+                list(entry),
+                _field_digest(identifiers.cases.get(name, identifiers.default)),
+            ]
+        )
+        for name, entry in pixels.yy_identifiers.items()
+    }
+
+
+class SchemaDiff(NamedTuple):
+    """
+    The pixel components that differ between two sets of fingerprints.
+
+    All attributes are sorted tuples of component names.
+    """
+
+    added: tuple[str, ...]
+    removed: tuple[str, ...]
+    changed: tuple[str, ...]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def affects(self, serialnumber: bytes | str) -> bool:
+        """
+        Whether ``serialnumber`` may be parsed differently in the new version.
+
+        Only the component the serial number has in the installed version is
+        known, so this assumes the new fingerprints are the installed ones.
+        Serial numbers that are not pixel components (or not valid ones) are
+        always affected if anything changed.
+        """
+        layout = layouts().get(as_bytes(serialnumber)[:PREFIX_LENGTH])
+        if layout is None:
+            return bool(self)
+        component = str(layout.header["component_code"])
+        return component in self.added or component in self.changed
+
+
+def diff(old: Mapping[str, str], new: Mapping[str, str] | None = None) -> SchemaDiff:
+    """
+    Compare the component fingerprints of two versions.
+
+    Args:
+        old: fingerprints by component name, e.g. :func:`component_fingerprints`
+            saved with the previous release
+        new: the fingerprints to compare with, the installed ones by default
+
+    >>> fingerprints = component_fingerprints()
+    >>> old = {**fingerprints, "FE_chip": "0123456789abcdef", "Retired": "ffff"}
+    >>> changes = diff(old)
+    >>> changes
+    SchemaDiff(added=(), removed=('Retired',), changed=('FE_chip',))
+    >>> changes.affects("20UPGFC1048575"), changes.affects("20UPGR92101041")
+    (True, False)
+    """
+    if new is None:
+        new = component_fingerprints()
+    return SchemaDiff(
+        tuple(sorted(new.keys() - old.keys())),
+        tuple(sorted(old.keys() - new.keys())),
+        tuple(
+            sorted(name for name in old.keys() & new.keys() if old[name] != new[name])
+        ),
+    )
+
+
+__all__ = (
+    "SchemaDiff",
+    "component_fingerprints",
+    "describe",
+    "diff",
+    "digest",
+    "fingerprint",
+)
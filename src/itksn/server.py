@@ -0,0 +1,441 @@
+"""
+A long-running local server answering parse, validate and build requests.
+
+Calling ``itksn parse`` once per serial number pays for starting Python and
+building the parser every time. ``itksn serve`` does that once, and then
+answers requests from any language over HTTP (with keep-alive) and, optionally,
+a Unix domain socket.
+
+Over HTTP, ``GET /parse/<serialnumber>`` and ``GET /validate/<serialnumber>``
+answer a single serial number. ``POST /parse``, ``/validate`` and ``/build``
+take a JSON body: a single serial number (or object to build), or a list of
+them for a batch, answered in order. ``GET /health`` tells the version.
+
+Over the Unix socket, every line is a JSON request ``{"op": "parse", "data":
+...}`` with the same ``data`` as the body of a ``POST``, and is answered by a
+line of JSON.
+
+:class:`Client` talks to either.
+"""
+
+from __future__ import annotations
+
+import functools
+import http.client
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from collections.abc import Callable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import unquote, urlsplit
+
+from itksn import __version__
+from itksn.batch import ParseErrors
+from itksn.core import CompiledSerialNumberStruct
+from itksn.errors import FieldError
+from itksn.flat import PointerStep, RawStep, Step, StructStep, SwitchStep, layouts
+from itksn.formats import flatten
+from itksn.validation import try_parse, validate
+
+log = logging.getLogger(__name__)
+
+#: where the server listens by default
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+#: the operations answered by the server
+OPERATIONS = ("parse", "validate", "build")
+
+#: the fields selecting the layout of a serial number
+_HEADER = (
+    "atlas_project",
+    "system_code",
+    "project_code",
+    "subproject_code",
+    "component_code",
+)
+
+
+def _error(error: FieldError) -> dict[str, Any]:
+    return {
+        "code": error.code.value,
+        "field": error.field,
+        "offset": error.offset,
+        "value": error.value.decode("utf-8", errors="backslashreplace"),
+        "message": error.message,
+        "type": error.exception_type.__name__,
+    }
+
+
+def _text(data: bytes) -> str:
+    return data.decode("utf-8", errors="backslashreplace")
+
+
+def _parse(serialnumber: str) -> dict[str, Any]:
+    outcome = try_parse(serialnumber)
+    return {
+        "serialnumber": _text(outcome.serialnumber),
+        "ok": outcome.ok,
+        "value": None if outcome.value is None else flatten(outcome.value),
+        "error": None if outcome.error is None else _error(outcome.error),
+    }
+
+
+def _validate(serialnumber: str) -> dict[str, Any]:
+    result = validate(serialnumber)
+    return {
+        "serialnumber": _text(result.serialnumber),
+        "ok": result.ok,
+        "error": None if result.error is None else _error(result.error),
+    }
+
+
+def _raw(steps: tuple[Step, ...], path: str, found: set[str]) -> None:
+    for step in steps:
+        if isinstance(step, SwitchStep):
+            _raw((*step.cases.values(), step.default), path, found)
+        elif isinstance(step, StructStep):
+            _raw(step.steps, f"{path}{step.name}." if step.name else path, found)
+        elif isinstance(step, (RawStep, PointerStep)) and step.name:
+            found.add(f"{path}{step.name}")
+
+
+@functools.cache
+def _raw_fields() -> dict[tuple[str, ...], frozenset[str]]:
+    """
+    The dotted paths of the fields holding bytes, by the header of each layout.
+    """
+    fields = {}
+    for layout in layouts().values():
+        found: set[str] = set()
+        _raw(layout.steps, "", found)
+        fields[tuple(str(layout.header[name]) for name in _HEADER)] = frozenset(found)
+    return fields
+
+
+def _from_json(obj: dict[str, Any]) -> dict[str, Any]:
+    """
+    Encode the fields of an object holding bytes, which JSON cannot represent.
+    """
+    header = tuple(str(obj.get(name)) for name in _HEADER)
+    # without a layout (e.g. strips), the identifier is stored as is
+    raw = _raw_fields().get(header, frozenset({"identifier"}))
+
+    def encode(value: Any, path: str) -> Any:
+        if isinstance(value, dict):
+            return {key: encode(item, f"{path}{key}.") for key, item in value.items()}
+        if isinstance(value, str) and path[:-1] in raw:
+            return value.encode("utf-8")
+        return value
+
+    return encode(obj, "")  # type: ignore[no-any-return]
+
+
+def _build(obj: dict[str, Any]) -> dict[str, Any]:
+    try:
+        serialnumber = CompiledSerialNumberStruct.build(_from_json(obj))
+    except (*ParseErrors, TypeError, AttributeError) as exc:
+        error = {"message": " ".join(str(exc).split()), "type": type(exc).__name__}
+        return {"ok": False, "serialnumber": None, "error": error}
+    return {"ok": True, "serialnumber": _text(serialnumber), "error": None}
+
+
+_operations: dict[str, Callable[[Any], dict[str, Any]]] = {
+    "parse": _parse,
+    "validate": _validate,
+    "build": _build,
+}
+
+
+def handle(op: str, data: Any) -> Any:
+    """
+    Answer a request, a result for a single item or a list of them for a list.
+
+    Raises:
+        KeyError: for unknown operations
+        ValueError: for items of the wrong type
+    """
+    func = _operations[op]
+    expected = dict if op == "build" else str
+    items = data if isinstance(data, list) else [data]
+    if not all(isinstance(item, expected) for item in items):
+        msg = f"{op} expects {'objects' if expected is dict else 'strings'}"
+        raise ValueError(msg)
+    results = [func(item) for item in items]
+    return results if isinstance(data, list) else results[0]
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    # keep connections open between requests
+    protocol_version = "HTTP/1.1"
+    server_version = f"itksn/{__version__}"
+
+    def _send(self, status: HTTPStatus, body: Any) -> None:
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _answer(self, op: str, data: Any) -> None:
+        try:
+            self._send(HTTPStatus.OK, handle(op, data))
+        except KeyError:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"unknown operation {op!r}"})
+        except ValueError as exc:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self._send(HTTPStatus.OK, {"version": __version__})
+            return
+        _, op, serialnumber = [*path.split("/", 2), "", ""][:3]
+        if op not in ("parse", "validate") or not serialnumber:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"not found: {path}"})
+            return
+        self._answer(op, unquote(serialnumber))
+
+    def do_POST(self) -> None:
+        length = self.headers.get("Content-Length", "0")
+        if not length.isdigit():
+            # the body cannot be skipped, so the connection cannot be reused
+            self.close_connection = True
+            msg = f"invalid Content-Length: {length!r}"
+            self._send(HTTPStatus.BAD_REQUEST, {"error": msg})
+            return
+        body = self.rfile.read(int(length))
+        try:
+            data = json.loads(body)
+        except ValueError as exc:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {exc}"})
+            return
+        self._answer(urlsplit(self.path).path.strip("/"), data)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        log.debug("%s - %s", self.address_string(), format % args)
+
+
+class _StreamHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                answer = handle(request["op"], request["data"])
+            except KeyError as exc:
+                answer = {"error": f"unknown operation or missing key {exc}"}
+            except (ValueError, TypeError) as exc:
+                answer = {"error": str(exc)}
+            self.wfile.write(json.dumps(answer).encode("utf-8") + b"\n")
+
+
+class UnixServer(socketserver.ThreadingUnixStreamServer):
+    """
+    The server listening on a Unix domain socket, one JSON request per line.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        super().__init__(os.fspath(path), _StreamHandler)
+
+    def server_bind(self) -> None:
+        path = Path(self.server_address)  # type: ignore[arg-type]
+        if path.is_socket():
+            # left behind by a server that was killed, unless one is listening
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(os.fspath(path))
+                except ConnectionRefusedError:
+                    path.unlink()
+        super().server_bind()
+
+    def server_close(self) -> None:
+        super().server_close()
+        Path(self.server_address).unlink(missing_ok=True)  # type: ignore[arg-type]
+
+
+def make_http_server(
+    host: str = DEFAULT_HOST, port: int = DEFAULT_PORT
+) -> ThreadingHTTPServer:
+    """
+    The HTTP server, use port ``0`` for any free port (see ``server_address``).
+    """
+    server = ThreadingHTTPServer((host, port), _HTTPHandler)
+    server.daemon_threads = True
+    return server
+
+
+def warm_up() -> None:
+    """
+    Build the parser and the lookup tables, so that the first request is fast.
+    """
+    _parse("20UPGFC1048575")
+    _raw_fields()
+
+
+def _interrupt(_signum: int, _frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def serve(servers: list[socketserver.BaseServer]) -> None:
+    """
+    Serve requests on all ``servers`` until interrupted, then close them.
+
+    In the main thread, ``SIGTERM`` (e.g. from systemd or docker) interrupts
+    it like ``SIGINT``, raising :class:`KeyboardInterrupt` once the servers
+    are closed, so that the Unix domain socket is removed either way.
+    """
+    threads = [
+        threading.Thread(target=server.serve_forever, daemon=True) for server in servers
+    ]
+    previous = None
+    if threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGTERM, _interrupt)
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        if previous is not None:
+            signal.signal(signal.SIGTERM, previous)
+
+
+class Client:
+    """
+    Send requests to a running server.
+
+    ``url`` is ``http://host:port`` or ``unix:/path/to/socket``. The
+    connection is opened on first use and kept open.
+
+    >>> with Client("http://127.0.0.1:8765") as client:  # doctest: +SKIP
+    ...     client.parse("20UPGFC1048575")["value"]["identifier.wafer"]
+    255
+    """
+
+    def __init__(
+        self, url: str = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout: float = 10.0
+    ) -> None:
+        self.url = url
+        self.timeout = timeout
+        self._http: http.client.HTTPConnection | None = None
+        self._socket: socket.socket | None = None
+        self._stream: Any = None
+
+    def _request_http(self, op: str, data: Any) -> Any:
+        if self._http is None:
+            parts = urlsplit(self.url)
+            self._http = http.client.HTTPConnection(
+                parts.hostname or DEFAULT_HOST,
+                parts.port or DEFAULT_PORT,
+                timeout=self.timeout,
+            )
+        body = json.dumps(data).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        self._http.request("POST", f"/{op}", body, headers)
+        response = self._http.getresponse()
+        answer = json.loads(response.read())
+        if response.status != HTTPStatus.OK:
+            raise ValueError(answer["error"])
+        return answer
+
+    def _request_unix(self, op: str, data: Any) -> Any:
+        if self._stream is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(self.timeout)
+            self._socket.connect(self.url.removeprefix("unix:"))
+            self._stream = self._socket.makefile("rwb")
+        self._stream.write(json.dumps({"op": op, "data": data}).encode("utf-8") + b"\n")
+        self._stream.flush()
+        answer = json.loads(self._stream.readline())
+        if isinstance(answer, dict) and "error" in answer and "ok" not in answer:
+            raise ValueError(answer["error"])
+        return answer
+
+    def request(self, op: str, data: Any) -> Any:
+        """
+        Send a request, see :func:`handle`.
+
+        Raises:
+            ValueError: if the server rejects the request
+        """
+        if self.url.startswith("unix:"):
+            return self._request_unix(op, data)
+        return self._request_http(op, data)
+
+    def parse(self, serialnumber: str) -> dict[str, Any]:
+        """
+        Parse a serial number, the fields are flattened as by :func:`itksn.formats.flatten`.
+        """
+        return self.request("parse", serialnumber)  # type: ignore[no-any-return]
+
+    def parse_many(self, serialnumbers: list[str]) -> list[dict[str, Any]]:
+        """
+        Parse many serial numbers in a single request.
+        """
+        return self.request("parse", list(serialnumbers))  # type: ignore[no-any-return]
+
+    def validate(self, serialnumber: str) -> dict[str, Any]:
+        """
+        Validate a serial number.
+        """
+        return self.request("validate", serialnumber)  # type: ignore[no-any-return]
+
+    def validate_many(self, serialnumbers: list[str]) -> list[dict[str, Any]]:
+        """
+        Validate many serial numbers in a single request.
+        """
+        return self.request("validate", list(serialnumbers))  # type: ignore[no-any-return]
+
+    def build(self, obj: dict[str, Any]) -> dict[str, Any]:
+        """
+        Build a serial number, fields holding bytes are given as strings.
+        """
+        return self.request("build", obj)  # type: ignore[no-any-return]
+
+    def close(self) -> None:
+        """
+        Close the connection.
+        """
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self) -> Client:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+
+__all__ = (
+    "DEFAULT_HOST",
+    "DEFAULT_PORT",
+    "OPERATIONS",
+    "Client",
+    "UnixServer",
+    "handle",
+    "make_http_server",
+    "serve",
+    "warm_up",
+)
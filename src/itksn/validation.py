@@ -0,0 +1,209 @@
+"""
+Validate serial numbers without raising.
+
+Validation checks exactly what :func:`itksn.parse` checks, and agrees with it
+on which serial numbers are valid, but stops at the first failing field and
+returns a :class:`~itksn.errors.FieldError` describing it (the dotted path of
+the field, its byte offset, the offending bytes and the allowed values)
+instead of raising. Nothing is raised and unwound for invalid serial numbers,
+so they cost about as much to check as valid ones.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+from construct import Container, MappingError, StreamError, Switch
+from construct.core import evaluate
+
+from itksn.batch import ParseErrors
+from itksn.common import EnumStr, as_bytes
+from itksn.core import CompiledSerialNumberStruct, SerialNumberStruct
+from itksn.errors import ErrorCode, FieldError
+from itksn.flat import PREFIX_LENGTH, layouts
+
+
+class Validation(NamedTuple):
+    """
+    Outcome of validating a single serial number.
+
+    For an invalid serial number, ``error`` describes the first field that
+    failed, see :class:`~itksn.errors.FieldError`.
+    """
+
+    serialnumber: bytes
+    error: FieldError | None
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the serial number is valid.
+        """
+        return self.error is None
+
+    @property
+    def field(self) -> str | None:
+        """
+        The dotted path of the field that failed, e.g. ``identifier.FE_chip_version``.
+        """
+        return None if self.error is None else self.error.field
+
+    @property
+    def offset(self) -> int | None:
+        """
+        The position of the field that failed in the serial number.
+        """
+        return None if self.error is None else self.error.offset
+
+    @property
+    def reason(self) -> str | None:
+        """
+        Why the serial number is invalid, on a single line.
+        """
+        if self.error is None:
+            return None
+        return f"{self.error.exception_type.__name__}: {self.error.message}"
+
+
+class ParseOutcome(NamedTuple):
+    """
+    Outcome of :func:`try_parse`, exactly one of ``value`` and ``error`` is set.
+    """
+
+    serialnumber: bytes
+    value: Container[Any] | None
+    error: FieldError | None
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the serial number was parsed successfully.
+        """
+        return self.error is None
+
+
+def check_prefix(data: bytes) -> tuple[Container[Any] | None, FieldError | None]:
+    """
+    Check a serial number whose prefix has no flat layout.
+
+    The fields of the prefix are checked one at a time, so that a partial or
+    malformed prefix is reported like :func:`validate` reports other fields.
+    Prefixes that are valid but not flattened (e.g. strips) are parsed.
+
+    Returns:
+        the parsed serial number and ``None``, or ``None`` and the error
+    """
+    context: Container[Any] = Container()
+    pos = 0
+    for subcon in SerialNumberStruct.subcon.subcons[:-2]:  # type: ignore[attr-defined]
+        field = subcon.subcon
+        while isinstance(field, Switch):
+            field = field.cases.get(evaluate(field.keyfunc, context), field.default)  # type: ignore[arg-type]
+        if not isinstance(field, EnumStr):
+            break
+        width: int = field.subcon.length  # type: ignore[attr-defined]
+        raw = data[pos : pos + width]
+        allowed = tuple(field.decmapping.values())
+        if len(raw) != width:
+            msg = f"stream read less than specified amount, expected {width}, found {len(raw)}"
+            error = FieldError(
+                ErrorCode.too_short, subcon.name, pos, raw, allowed, msg, StreamError
+            )
+            return None, error
+        value = field.decmapping.get(raw)
+        if value is None:
+            msg = f"parsing failed, no mapping for {raw!r}"
+            error = FieldError(
+                ErrorCode.unknown_value,
+                subcon.name,
+                pos,
+                raw,
+                allowed,
+                msg,
+                MappingError,
+            )
+            return None, error
+        context[subcon.name] = value
+        pos += width
+
+    # not a layout that can be flattened (e.g. strips), parse it instead
+    try:
+        return CompiledSerialNumberStruct.parse(data), None
+    except ParseErrors as exc:
+        return None, FieldError.from_exception(exc)
+
+
+def validate(serialnumber: bytes | str) -> Validation:
+    """
+    Validate a serial number, describing the first field that fails.
+
+    >>> validate("20UPGR92101041").ok
+    True
+    >>> result = validate("20UPGR9X101041")
+    >>> result.field, result.offset, result.error.code.value, result.error.value
+    ('identifier.FE_chip_version', 7, 'unknown_value', b'X')
+    >>> [str(value) for value in result.error.allowed][:3]
+    ['RD53A', 'ITkpix_v1', 'ITkpix_v1p1']
+    """
+    data = as_bytes(serialnumber)
+    layout = layouts().get(data[:PREFIX_LENGTH])
+    if layout is None:
+        return Validation(data, check_prefix(data)[1])
+    return Validation(data, layout.check(data))
+
+
+def is_valid(serialnumber: bytes | str) -> bool:
+    """
+    Whether :func:`itksn.parse` would parse the serial number successfully.
+    """
+    data = as_bytes(serialnumber)
+    layout = layouts().get(data[:PREFIX_LENGTH])
+    if layout is None:
+        return check_prefix(data)[1] is None
+    return layout.check(data) is None
+
+
+def validate_many(serialnumbers: Iterable[bytes | str]) -> list[Validation]:
+    """
+    Validate many serial numbers at once.
+
+    Args:
+        serialnumbers: serial numbers as ``bytes`` or ``str``
+
+    Returns:
+        one :class:`Validation` per input, in input order
+    """
+    return [validate(serialnumber) for serialnumber in serialnumbers]
+
+
+def try_parse(serialnumber: bytes | str) -> ParseOutcome:
+    """
+    Parse a serial number, returning the error instead of raising it.
+
+    Valid serial numbers give the same result as :func:`itksn.parse`.
+
+    >>> try_parse("20UPGR92101041").value.identifier.number
+    b'101041'
+    >>> outcome = try_parse("20UPGR9X101041")
+    >>> outcome.ok, outcome.value, outcome.error.field
+    (False, None, 'identifier.FE_chip_version')
+    """
+    data = as_bytes(serialnumber)
+    layout = layouts().get(data[:PREFIX_LENGTH])
+    if layout is None:
+        return ParseOutcome(data, *check_prefix(data))
+    obj: Container[Any] = Container(layout.header)
+    error = layout.check(data, obj)
+    return ParseOutcome(data, None if error else obj, error)
+
+
+__all__ = (
+    "ParseOutcome",
+    "Validation",
+    "check_prefix",
+    "is_valid",
+    "try_parse",
+    "validate",
+    "validate_many",
+)
@@ -0,0 +1,469 @@
+"""
+Decode columns of serial numbers at once with NumPy.
+
+Serial numbers are fixed-width ASCII, so a column of them can be viewed as an
+``(N, 14)`` ``uint8`` array without copying (e.g. a ``numpy`` array of dtype
+``S14``). :func:`decode` works on whole columns of that array: rows are grouped
+by their 7-byte prefix, enum fields are decoded through small lookup tables,
+and the computed bit fields of front-end chips (``batch_number``, ``wafer``,
+``row``, ``column``) are masks and shifts of their number as an integer. Other
+fields keep their bytes, including the ``number`` of other components, which
+is not always digits (e.g. ``01F00``).
+
+Requires ``numpy`` (``python -m pip install 'itksn[numpy]'``).
+
+>>> import numpy as np
+>>> from itksn import vectorize
+>>> columns = vectorize.decode(np.array([b"20UPGFC1048575", b"20UPGR92101041"]))
+>>> columns["valid"]
+array([ True,  True])
+>>> columns["component_code"]
+array(['FE_chip', 'Digital_quad_module'], dtype='<U19')
+>>> columns["identifier.number"], columns["identifier.wafer"]
+(array([b'1048575', b'101041'], dtype='|S7'), array([255,  -1]))
+"""
+
+from __future__ import annotations
+
+import functools
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover
+    msg = "itksn.vectorize requires numpy: python -m pip install 'itksn[numpy]'"
+    raise ImportError(msg) from exc
+
+from construct import Container
+from construct.core import evaluate
+
+from itksn.common import Computed, as_bytes
+from itksn.flat import (
+    PREFIX_LENGTH,
+    ComputedErrors,
+    ComputedStep,
+    ConstStep,
+    EnumStep,
+    ErrorStep,
+    PassStep,
+    PointerStep,
+    RawStep,
+    Step,
+    StructStep,
+    SwitchStep,
+    TerminatedStep,
+    layouts,
+)
+from itksn.pixels import modules
+
+#: decoded fields by dotted name, one value per serial number
+Columns = dict[str, np.ndarray]
+
+#: the values of a field for some rows, ``(rows, values)``
+Piece = tuple[np.ndarray, np.ndarray]
+
+#: rows still being decoded, the position in them, and the fields decoded so
+#: far for each (nested) struct, outermost first
+_Group = tuple[np.ndarray, int, list[dict[str, Any]]]
+
+
+def as_array(serialnumbers: np.ndarray | Iterable[bytes | str]) -> np.ndarray:
+    """
+    View serial numbers as a 2-dimensional ``uint8`` array, one row each.
+
+    Arrays of dtype ``S`` are viewed without copying. Shorter serial numbers
+    are padded with zero bytes, which are not part of the serial number.
+    """
+    if isinstance(serialnumbers, np.ndarray):
+        if serialnumbers.dtype == np.uint8 and serialnumbers.ndim == 2:
+            return serialnumbers
+        array = serialnumbers
+        if array.dtype.kind != "S":
+            array = array.astype("S")
+    else:
+        array = np.array([as_bytes(item) for item in serialnumbers], dtype="S")
+    array = np.ascontiguousarray(array).reshape(-1)
+    return array.view(np.uint8).reshape(len(array), array.dtype.itemsize)
+
+
+def _lengths(array: np.ndarray) -> np.ndarray:
+    """
+    The length of each row without the zero padding at the end.
+    """
+    if array.shape[1] == 0:
+        return np.zeros(len(array), dtype=np.int64)
+    nonzero = array[:, ::-1] != 0
+    padding = np.where(nonzero.any(axis=1), nonzero.argmax(axis=1), array.shape[1])
+    return np.asarray(array.shape[1] - padding)
+
+
+def _as_bytes(block: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(block).view(f"S{block.shape[1]}").reshape(-1)
+
+
+def _as_integers(block: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert rows of ASCII digits to integers, and tell which rows are all digits.
+    """
+    digits = block.astype(np.int64) - ord("0")
+    ok = np.asarray(((digits >= 0) & (digits <= 9)).all(axis=1))
+    powers = 10 ** np.arange(block.shape[1] - 1, -1, -1, dtype=np.int64)
+    return np.where(ok, digits @ powers, -1), ok
+
+
+@functools.cache
+def _enum_table(step: EnumStep) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    A lookup table from the bytes of an enum field to the index of its name.
+    """
+    if step.width > 2:
+        return None
+    table = np.full(256**step.width, -1, dtype=np.int32)
+    for index, value in enumerate(step.allowed):
+        if len(value.bytevalue) == step.width:
+            table[int.from_bytes(value.bytevalue, "big")] = index
+    return table, np.array([str(value) for value in step.allowed])
+
+
+def _decode_enum(step: EnumStep, block: np.ndarray) -> np.ndarray:
+    """
+    Decode an enum field, ``""`` for bytes without a mapping.
+    """
+    lookup = _enum_table(step)
+    if lookup is None:
+        mapping = {value.bytevalue: str(value) for value in step.allowed}
+        return np.array([mapping.get(raw, "") for raw in _as_bytes(block).tolist()])
+    table, names = lookup
+    keys = np.zeros(len(block), dtype=np.int64)
+    for column in range(step.width):
+        keys = (keys << 8) | block[:, column]
+    indices = table[keys]
+    return np.where(indices >= 0, names[indices], "")
+
+
+def _fe_chip() -> dict[Any, Callable[[dict[str, Any]], np.ndarray | None]]:
+    """
+    Vectorised equivalents of the ``Computed`` fields of front-end chips.
+
+    Each returns ``None`` for inputs it cannot handle, which are then
+    computed one row at a time instead.
+    """
+    funcs = {
+        subcon.name: subcon.subcon.func  # type: ignore[attr-defined]
+        for subcon in modules.fe_chip.subcons
+        if isinstance(subcon.subcon, Computed)  # type: ignore[attr-defined]
+    }
+    batches = np.array([modules.batch_number.get(key, "") for key in range(16)])
+
+    def bits(mask: int, shift: int) -> Callable[[dict[str, Any]], np.ndarray | None]:
+        def compute(fields: dict[str, Any]) -> np.ndarray | None:
+            numbers, ok = _as_integers(
+                fields["number"].view(np.uint8).reshape(len(fields["number"]), -1)
+            )
+            if not ok.all():
+                return None
+            return (numbers & mask) >> shift
+
+        return compute
+
+    def batch(fields: dict[str, Any]) -> np.ndarray | None:
+        if "" in batches[fields["batch_number"]]:
+            return None
+        return batches[fields["batch_number"]]  # type: ignore[no-any-return]
+
+    return {
+        funcs["batch_number"]: bits(0xF0000, 16),
+        funcs["batch"]: batch,
+        funcs["wafer"]: bits(0x0FF00, 8),
+        funcs["row"]: bits(0x000F0, 4),
+        funcs["column"]: bits(0x0000F, 0),
+    }
+
+
+@functools.cache
+def _vectorised() -> dict[Any, Callable[[dict[str, Any]], np.ndarray | None]]:
+    return _fe_chip()
+
+
+def _missing(dtype: np.dtype[Any]) -> Any:
+    """
+    The value of a column for serial numbers without the field.
+    """
+    return {"U": "", "S": b"", "i": -1, "u": 0, "b": False, "f": np.nan}.get(dtype.kind)
+
+
+def _subset(fields: Any, mask: np.ndarray) -> Any:
+    if isinstance(fields, list):
+        return [_subset(level, mask) for level in fields]
+    if isinstance(fields, np.ndarray):
+        return fields[mask]
+    if isinstance(fields, dict):
+        return {name: _subset(value, mask) for name, value in fields.items()}
+    return fields
+
+
+def _row(fields: Any, index: int) -> Any:
+    if isinstance(fields, np.ndarray):
+        return fields[index].item()
+    if isinstance(fields, dict):
+        return Container({name: _row(value, index) for name, value in fields.items()})
+    return fields
+
+
+def _context(stack: list[dict[str, Any]], index: int | None = None) -> Container[Any]:
+    """
+    The context of the innermost struct, of one row or all rows at once.
+    """
+    context: Container[Any] | None = None
+    for fields in stack:
+        level = Container(fields) if index is None else _row(fields, index)
+        if context is not None:
+            level["_"] = context
+        context = level
+    return context  # type: ignore[return-value]
+
+
+class _Decoder:
+    """
+    Decode the rows of an array, one group of rows with the same layout at a time.
+    """
+
+    def __init__(self, array: np.ndarray) -> None:
+        self.array = array
+        self.lengths = _lengths(array)
+        self.valid = np.zeros(len(array), dtype=bool)
+        # the rows and values of every column, put together once all groups
+        # are decoded so that no column is copied when its dtype widens
+        self.pieces: dict[str, list[Piece]] = {}
+
+    def assign(self, name: str, rows: np.ndarray, values: Any) -> None:
+        self.pieces.setdefault(name, []).append((rows, np.asarray(values)))
+
+    def columns(self) -> Columns:
+        columns: Columns = {"valid": self.valid}
+        for name, pieces in self.pieces.items():
+            try:
+                dtype = np.result_type(*(values.dtype for _, values in pieces))
+            except TypeError:
+                dtype = np.dtype(object)
+            column = np.full(len(self.array), _missing(dtype), dtype=dtype)
+            for rows, values in pieces:
+                column[rows] = values
+            # fields were assigned before later fields of the same rows failed
+            column[~self.valid] = _missing(dtype)
+            columns[name] = column
+        return columns
+
+    def store(self, step: Step, path: str, group: _Group, values: np.ndarray) -> None:
+        rows, _, stack = group
+        if not step.name:
+            return
+        stack[-1][step.name] = values
+        if not step.name.startswith("_"):
+            self.assign(f"{path}{step.name}", rows, values)
+
+    def read(self, group: _Group, offset: int, width: int) -> tuple[_Group, np.ndarray]:
+        """
+        Keep the rows long enough for a field, and return its bytes.
+        """
+        rows, pos, stack = group
+        mask = self.lengths[rows] >= offset + width
+        if not mask.all():
+            rows, stack = rows[mask], _subset(stack, mask)
+        return (rows, pos, stack), self.array[rows, offset : offset + width]
+
+    def walk(self, steps: tuple[Step, ...], group: _Group, path: str) -> list[_Group]:
+        groups = [group]
+        for step in steps:
+            groups = [
+                result
+                for current in groups
+                if len(current[0])
+                for result in self.step(step, current, path)
+            ]
+        return groups
+
+    def step(self, step: Step, group: _Group, path: str) -> list[_Group]:
+        rows, pos, stack = group
+        if isinstance(step, (EnumStep, ConstStep, RawStep)):
+            group, block = self.read(group, pos, step.width)
+            if isinstance(step, EnumStep):
+                values = _decode_enum(step, block)
+                mask = values != ""
+            else:
+                values = _as_bytes(block)
+                mask = (
+                    np.isin(values, np.array(step.values))
+                    if isinstance(step, ConstStep)
+                    else np.ones(len(values), dtype=bool)
+                )
+            rows, _, stack = group
+            if not mask.all():
+                rows, values, stack = rows[mask], values[mask], _subset(stack, mask)
+            group = (rows, pos + step.width, stack)
+            self.store(step, path, group, values)
+            return [group]
+
+        if isinstance(step, PointerStep):
+            group, block = self.read(group, step.offset, step.width)
+            self.store(step, path, group, _as_bytes(block))
+            return [group]
+
+        if isinstance(step, ComputedStep):
+            return [self.computed(step, group, path)]
+
+        if isinstance(step, PassStep):
+            if step.name:
+                stack[-1][step.name] = None
+            return [group]
+
+        if isinstance(step, StructStep):
+            inner = f"{path}{step.name}." if step.name else path
+            results = []
+            for inner_rows, end, inner_stack in self.walk(
+                step.steps, (rows, pos, [*stack, {}]), inner
+            ):
+                *outer, fields = inner_stack
+                if step.name:
+                    outer[-1][step.name] = fields
+                results.append((inner_rows, end, outer))
+            return results
+
+        if isinstance(step, SwitchStep):
+            keys = evaluate(step.keyfunc, _context(stack))  # type: ignore[arg-type]
+            if not isinstance(keys, np.ndarray):
+                return self.step(step.cases.get(keys, step.default), group, path)
+            results = []
+            for key in np.unique(keys):
+                mask = keys == key
+                case = step.cases.get(key.item(), step.default)
+                results.extend(
+                    self.step(case, (rows[mask], pos, _subset(stack, mask)), path)
+                )
+            return results
+
+        if isinstance(step, TerminatedStep):
+            mask = self.lengths[rows] == pos
+            return [(rows[mask], pos, _subset(stack, mask))]
+
+        if isinstance(step, ErrorStep):
+            return []
+
+        msg = f"cannot decode {type(step).__name__} at {step.path}"
+        raise NotImplementedError(msg)
+
+    def computed(self, step: ComputedStep, group: _Group, path: str) -> _Group:
+        rows, pos, stack = group
+        vectorised = _vectorised().get(step.func)
+        values = None if vectorised is None else vectorised(stack[-1])
+        if values is None:
+            # one row at a time, exactly like the parser
+            results, mask = [], np.ones(len(rows), dtype=bool)
+            for index in range(len(rows)):
+                try:
+                    results.append(evaluate(step.func, _context(stack, index)))  # type: ignore[arg-type]
+                except ComputedErrors:
+                    mask[index] = False
+            values = np.array(results)
+            if not mask.all():
+                rows, stack = rows[mask], _subset(stack, mask)
+        group = (rows, pos, stack)
+        self.store(step, path, group, values)
+        return group
+
+    def run(self) -> None:
+        """
+        Decode all rows into :attr:`pieces` and :attr:`valid`.
+        """
+        if len(self.array) == 0 or self.array.shape[1] < PREFIX_LENGTH:
+            return
+
+        keys = np.zeros(len(self.array), dtype=np.uint64)
+        for index in range(PREFIX_LENGTH):
+            keys = (keys << np.uint64(8)) | self.array[:, index]
+        prefixes, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        ends = np.cumsum(np.bincount(inverse, minlength=len(prefixes)))
+
+        table = layouts()
+        for prefix, start, end in zip(prefixes, ends - np.bincount(inverse), ends):
+            layout = table.get(int(prefix).to_bytes(PREFIX_LENGTH, "big"))
+            if layout is None:
+                continue
+            group = (order[start:end], PREFIX_LENGTH, [dict(layout.header)])
+            for rows, _, _ in self.walk(layout.steps, group, ""):
+                self.valid[rows] = True
+                for name, value in layout.header.items():
+                    self.assign(name, rows, np.str_(value))
+
+    def decode(self) -> Columns:
+        self.run()
+        return self.columns()
+
+
+class Pieces(NamedTuple):
+    """
+    Decoded fields before they are put together into columns, see :func:`decode_pieces`.
+    """
+
+    #: whether each serial number is valid
+    valid: np.ndarray
+    #: by dotted name, the values of the field for each group of rows decoded
+    #: together, one per row or a single one for all of them (e.g. the
+    #: component code of a prefix), including rows that turned out not valid
+    pieces: dict[str, list[Piece]]
+
+
+def decode_pieces(array: np.ndarray) -> Pieces:
+    """
+    Decode the rows of an array from :func:`as_array`, without building columns.
+
+    Each field is a list of ``(rows, values)`` pieces, one per group of rows
+    with the same layout, so that callers can put them together into columns
+    of their own kind (e.g. categoricals) without copying through
+    :func:`decode`'s columns first.
+    """
+    decoder = _Decoder(array)
+    decoder.run()
+    return Pieces(decoder.valid, decoder.pieces)
+
+
+def decode(serialnumbers: np.ndarray | Iterable[bytes | str]) -> Columns:
+    """
+    Decode serial numbers column-wise.
+
+    Args:
+        serialnumbers: an ``(N, width)`` ``uint8`` array, an array of dtype
+            ``S14``, or any iterable of serial numbers
+
+    Returns:
+        a column per field, by dotted name as in :func:`itksn.formats.flatten`
+        (e.g. ``identifier.FE_chip_version``), plus ``valid``. Enum fields
+        hold their names, computed fields their values (e.g. ``wafer`` is an
+        integer) and other fields the raw bytes, as :func:`itksn.parse` gives
+        them (e.g. ``identifier.number``). Rows that are not valid, or do not
+        have the field, hold ``""``, ``b""`` or ``-1``.
+
+    Only pixel serial numbers are decoded. Others (e.g. strips) are not
+    valid here, use :func:`itksn.parse` for those.
+    """
+    return _Decoder(as_array(serialnumbers)).decode()
+
+
+def to_structured(columns: Columns) -> np.ndarray:
+    """
+    Combine the columns of :func:`decode` into a structured array.
+    """
+    return np.rec.fromarrays(list(columns.values()), names=list(columns))  # type: ignore[call-overload,no-any-return]
+
+
+__all__ = (
+    "Columns",
+    "Piece",
+    "Pieces",
+    "as_array",
+    "decode",
+    "decode_pieces",
+    "to_structured",
+)
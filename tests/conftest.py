@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import pathlib
 
 # shutil is nicer, but doesn't work: https://bugs.python.org/issue20849
@@ -8,8 +9,44 @@ from shutil import copytree as _copytree
 
 import pytest
 
+from itksn import pixels
+
 copytree = partial(_copytree, dirs_exist_ok=True)
 
+VALID_SNS = json.loads(
+    (pathlib.Path(__file__).parent / "test_integration" / "valid_sns.json").read_text()
+)
+
+# a spread of identifiers that exercises every enum value and switch branch
+IDENTIFIERS = [str(digit) * 7 for digit in range(10)] + [
+    "0120000",
+    "0510000",
+    "2101041",
+    "1048575",
+    "00AB123",
+    "0000",
+    "000000000",
+]
+
+COMPONENT_CODES = [
+    (subproject_code, component_code)
+    for subproject_code, enum in pixels.subproject_codes.items()
+    for component_code in enum.decmapping
+]
+
+# the component codes whose 7-byte prefix selects a flat layout
+LAYOUT_CODES = [codes for codes in COMPONENT_CODES if len(codes[1]) == 2]
+
+
+def _prefix(codes):
+    subproject_code, component_code = codes
+    return b"20U" + subproject_code.encode() + component_code
+
+
+def _prefix_id(codes):
+    subproject_code, component_code = codes
+    return f"{subproject_code}{component_code.decode()}"
+
 
 @pytest.fixture
 def datadir(tmp_path, request):
@@ -26,3 +63,43 @@ def datadir(tmp_path, request):
         copytree(test_dir, str(tmp_path))
 
     return tmp_path
+
+
+@pytest.fixture
+def valid_sns():
+    """
+    The valid serial numbers of ``test_integration/valid_sns.json``.
+    """
+    return list(VALID_SNS)
+
+
+@pytest.fixture(params=VALID_SNS)
+def valid_sn(request):
+    """
+    Each of the valid serial numbers, as ``str``.
+    """
+    return request.param
+
+
+@pytest.fixture
+def identifiers():
+    """
+    Identifiers to append to a prefix, valid for some layouts and not others.
+    """
+    return list(IDENTIFIERS)
+
+
+@pytest.fixture(params=COMPONENT_CODES, ids=_prefix_id)
+def component_prefix(request):
+    """
+    The prefix (e.g. ``b"20UPGFC"``) of each pixel component code.
+    """
+    return _prefix(request.param)
+
+
+@pytest.fixture(params=LAYOUT_CODES, ids=_prefix_id)
+def layout_prefix(request):
+    """
+    The 7-byte prefix of each pixel component code with a flat layout.
+    """
+    return _prefix(request.param)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import itksn
+from itksn import aio
+
+serialnumbers = [
+    b"20UPGFC1048575",
+    "20UPGMC2291234",
+    b"20UPIFW2123456",
+    "20UPGR9X101041",
+]
+
+
+def test_parse_many():
+    results = asyncio.run(aio.parse_many(serialnumbers, chunksize=3))
+    expected = itksn.parse_many(serialnumbers)
+    assert [result.serialnumber for result in results] == [
+        result.serialnumber for result in expected
+    ]
+    assert [result.value for result in results] == [result.value for result in expected]
+    assert [type(result.error) for result in results] == [
+        type(result.error) for result in expected
+    ]
+
+
+def test_validate_many():
+    results = asyncio.run(aio.validate_many(serialnumbers, chunksize=3))
+    assert results == itksn.validate_many(serialnumbers)
+
+
+def test_iter_parse_async_iterable():
+    async def upload():
+        for serialnumber in serialnumbers:
+            await asyncio.sleep(0)
+            yield serialnumber
+
+    async def main():
+        return [result.ok async for result in aio.iter_parse(upload(), chunksize=2)]
+
+    assert asyncio.run(main()) == [True, True, False, False]
+
+
+def test_iter_validate_executor():
+    async def main(executor):
+        return [
+            result.field
+            async for result in aio.iter_validate(serialnumbers, executor=executor)
+        ]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert asyncio.run(main(executor)) == [
+            None,
+            None,
+            "component_code",
+            "identifier.FE_chip_version",
+        ]
+
+
+def test_iter_parse_yields_to_loop():
+    # other tasks get to run while a large batch is parsed
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(len(results))
+            await asyncio.sleep(0)
+
+    results: list[itksn.ParseResult] = []
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        async for result in aio.iter_parse(serialnumbers * 100, chunksize=10):
+            results.append(result)
+        task.cancel()
+
+    asyncio.run(main())
+    assert len(results) == 400
+    assert len(ticks) >= 40
+    assert 0 < ticks[len(ticks) // 2] < 400
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import pickle
+
+import pytest
+from construct.core import MappingError, StreamError, TerminatedError
+
+import itksn
+import itksn.flat
+from itksn import batch
+
+
+def test_parse_many():
+    results = itksn.parse_many(
+        [b"20UPGFC1048575", "20UPGMC2291234", b"20UPIFW2123456", "20UPGMC2291234999"]
+    )
+    assert [result.ok for result in results] == [True, True, False, False]
+    assert results[0].serialnumber == b"20UPGFC1048575"
+    assert results[0].value == itksn.parse(b"20UPGFC1048575")
+    assert results[1].serialnumber == b"20UPGMC2291234"
+    assert results[1].value.identifier.module_type == "Linear_triplet_module_carrier"
+    assert results[2].value is None
+    assert isinstance(results[2].error, MappingError)
+    assert isinstance(results[3].error, TerminatedError)
+
+
+def test_parse_many_computed_error():
+    (result,) = itksn.parse_many([b"20UPGFC10485AB"])
+    assert not result.ok
+    assert isinstance(result.error, ValueError)
+
+
+def test_parse_chunk():
+    chunk = [b"20UPGFC1048575", b"20UPGMC2291234999"]
+    ok, invalid = batch.parse_chunk(chunk)
+    assert ok.value == itksn.parse(chunk[0])
+    assert isinstance(invalid.error, TerminatedError)
+    assert pickle.loads(pickle.dumps(batch.parse_chunk)) is batch.parse_chunk
+
+
+def test_iter_parse_is_lazy():
+    def serialnumbers():
+        yield b"20UPGFC1048575"
+        pytest.fail("consumed more than requested")
+
+    result = next(itksn.iter_parse(serialnumbers()))
+    assert result.ok
+
+
+def test_parse_many_empty():
+    assert itksn.parse_many([]) == []
+
+
+def test_parse_many_workers():
+    serialnumbers = [b"20UPGFC1048575", b"20UPIFW2123456", b"20UPGMC2291234"] * 5
+    expected = itksn.parse_many(serialnumbers)
+    results = itksn.parse_many(serialnumbers, workers=2, chunksize=4)
+    assert [result.serialnumber for result in results] == serialnumbers
+    assert [result.value for result in results] == [result.value for result in expected]
+    assert [type(result.error) for result in results] == [
+        type(result.error) for result in expected
+    ]
+    assert results[2].value.identifier.module_type.bytevalue == b"2"
+
+
+def test_parse_many_workers_small_input(monkeypatch):
+    def pool(*_args, **_kwargs):
+        pytest.fail("started a process pool for a single chunk")
+
+    monkeypatch.setattr("itksn.batch.ProcessPoolExecutor", pool)
+    results = itksn.parse_many([b"20UPGFC1048575"], workers=4)
+    assert [result.ok for result in results] == [True]
+
+
+def test_build_many_agrees_with_build(valid_sns):
+    for serial_number in valid_sns:
+        data = serial_number.encode("utf-8")
+        if data[:7] not in itksn.flat.layouts():
+            continue
+        obj = itksn.parse(data)
+        if "number" not in obj.identifier:
+            continue
+        template = {**obj, "identifier": {**obj.identifier, "number": None}}
+        assert itksn.build_many(template, [obj.identifier.number]) == [itksn.build(obj)]
+
+
+def test_build_many_range():
+    template = {
+        "atlas_project": "atlas_detector",
+        "system_code": "phaseII_upgrade",
+        "project_code": "pixel",
+        "subproject_code": "pixel_general",
+        "component_code": "Digital_quad_module",
+        "identifier": {"FE_chip_version": "ITkpix_v1", "PCB_manufacturer": None},
+    }
+    serial_numbers = itksn.build_many(template, range(101041, 101044))
+    assert serial_numbers == [b"20UPGR91101041", b"20UPGR91101042", b"20UPGR91101043"]
+    assert itksn.build_many(template, [b"000001", "000002"]) == [
+        b"20UPGR91000001",
+        b"20UPGR91000002",
+    ]
+    assert itksn.build_many(template, []) == []
+
+
+@pytest.mark.parametrize(
+    ("number", "error"),
+    [(-1, ValueError), (1000000, StreamError), (b"12345", StreamError)],
+)
+def test_build_many_invalid_number(number, error):
+    template = {
+        "atlas_project": "atlas_detector",
+        "system_code": "phaseII_upgrade",
+        "project_code": "pixel",
+        "subproject_code": "pixel_general",
+        "component_code": "Digital_quad_module",
+        "identifier": {"FE_chip_version": "ITkpix_v1", "PCB_manufacturer": None},
+    }
+    with pytest.raises(error):
+        itksn.build_many(template, [number])
+
+
+def test_build_many_invalid_template():
+    template = {
+        "atlas_project": "atlas_detector",
+        "system_code": "phaseII_upgrade",
+        "project_code": "pixel",
+        "subproject_code": "pixel_general",
+        "component_code": "Digital_quad_module",
+        "identifier": {"FE_chip_version": "not_a_chip"},
+    }
+    with pytest.raises(MappingError):
+        itksn.build_many(template, [1])
+    with pytest.raises(KeyError):
+        itksn.build_many({**template, "component_code": "FE_chip"}, [1], field="x")
+    with pytest.raises(ValueError, match="no identifier layout"):
+        itksn.build_many({**template, "project_code": "strip"}, [1])
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import json
+import pickle
+import sqlite3
+
+import pytest
+from construct.core import MappingError
+
+import itksn
+from itksn.cache import (
+    CacheInfo,
+    FrozenContainer,
+    ParseCache,
+    PersistentCache,
+    PersistentCacheInfo,
+)
+from itksn.formats import flatten
+
+
+def test_cache_hits_and_misses():
+    cache = itksn.ParseCache(maxsize=4)
+    first = cache(b"20UPGFC1048575")
+    assert first == itksn.parse(b"20UPGFC1048575")
+    assert cache("20UPGFC1048575") is first
+    assert cache.cache_info() == CacheInfo(
+        hits=1, misses=1, evictions=0, maxsize=4, currsize=1
+    )
+    cache.cache_clear()
+    assert cache.cache_info() == CacheInfo(
+        hits=0, misses=0, evictions=0, maxsize=4, currsize=0
+    )
+    assert cache(b"20UPGFC1048575") is not first
+
+
+@pytest.mark.parametrize(
+    ("policy", "evicted"),
+    [("lru", b"20UPGMC2291234"), ("fifo", b"20UPGFC1048575")],
+)
+def test_cache_eviction(policy, evicted):
+    cache = ParseCache(maxsize=2, policy=policy)
+    cache(b"20UPGFC1048575")
+    cache(b"20UPGMC2291234")
+    cache(b"20UPGFC1048575")
+    cache(b"20UPGR92101041")
+    assert cache.cache_info().evictions == 1
+    assert cache.cache_info().currsize == 2
+    misses = cache.cache_info().misses
+    cache(evicted)
+    assert cache.cache_info().misses == misses + 1
+
+
+def test_cache_errors_are_not_cached():
+    cache = ParseCache()
+    for _ in range(2):
+        with pytest.raises(MappingError):
+            cache(b"20UPIFW2123456")
+    assert cache.cache_info().misses == 2
+    assert cache.cache_info().currsize == 0
+
+
+def test_cache_custom_parser():
+    calls = []
+
+    def parse(data):
+        calls.append(data)
+        return {"data": data, "nested": {"length": len(data)}}
+
+    cache = ParseCache(parse=parse)
+    assert cache("abc").nested.length == 3
+    assert cache(b"abc").data == b"abc"
+    assert calls == [b"abc"]
+
+
+@pytest.mark.parametrize(("maxsize", "policy"), [(0, "lru"), (1, "random")])
+def test_cache_invalid_arguments(maxsize, policy):
+    with pytest.raises(ValueError, match="must be"):
+        ParseCache(maxsize=maxsize, policy=policy)
+
+
+def test_frozen_container():
+    value = ParseCache()(b"20UPGMC2291234")
+    assert isinstance(value, FrozenContainer)
+    assert isinstance(value.identifier, FrozenContainer)
+    assert "Linear_triplet_module_carrier" in repr(value)
+    assert "Linear_triplet_module_carrier" in str(value)
+    for mutate in [
+        lambda: value.__setitem__("serial", 1),
+        lambda: setattr(value.identifier, "number", b"0000"),
+        lambda: delattr(value, "identifier"),
+        lambda: value.update(identifier=None),
+        lambda: value.pop("identifier"),
+        value.clear,
+    ]:
+        with pytest.raises(TypeError, match="immutable"):
+            mutate()
+
+    copy = value.copy()
+    copy.serial = 1
+    assert "serial" not in value
+    assert pickle.loads(pickle.dumps(value)) == value
+
+
+def test_persistent_cache(tmp_path):
+    path = tmp_path / "outcomes.db"
+    serialnumbers = ["20UPGFC1048575", "20UPIFW2123456", "20USBSL0000001"]
+    with PersistentCache(path) as cache:
+        first = cache.validate_many([*serialnumbers, serialnumbers[0]])
+        assert first == [*itksn.validate_many(serialnumbers), first[0]]
+        assert cache.cache_info() == PersistentCacheInfo(
+            hits=0, misses=3, stale=0, currsize=3
+        )
+
+    # a warm restart
+    with itksn.PersistentCache(path) as cache:
+        assert cache.validate_many(serialnumbers) == first[:3]
+        assert cache.validate("20UPGR92101041").ok
+        assert cache.cache_info() == PersistentCacheInfo(
+            hits=3, misses=1, stale=0, currsize=4
+        )
+        failures = list(cache.failures())
+        assert [failure.serialnumber for failure in failures] == [b"20UPIFW2123456"]
+        assert failures[0].error == first[1].error
+        assert cache.refresh() == 0
+        cache.cache_clear()
+        assert cache.cache_info() == PersistentCacheInfo(
+            hits=0, misses=0, stale=0, currsize=0
+        )
+
+
+def test_persistent_cache_values(tmp_path, monkeypatch, valid_sns):
+    path = tmp_path / "outcomes.db"
+    serialnumbers = [*valid_sns, "20UPGR9X101041"]
+    with PersistentCache(path) as cache:
+        first = cache.try_parse_many(serialnumbers)
+    assert first == [itksn.try_parse(serialnumber) for serialnumber in serialnumbers]
+
+    def parse_again(serialnumber):
+        raise AssertionError(serialnumber)
+
+    # a warm restart reads the values back instead of parsing again
+    monkeypatch.setattr("itksn.validation.try_parse", parse_again)
+    with PersistentCache(path) as cache:
+        outcomes = cache.try_parse_many(serialnumbers)
+        assert cache.cache_info().hits == len(set(serialnumbers))
+    assert [outcome.serialnumber for outcome in outcomes] == [
+        outcome.serialnumber for outcome in first
+    ]
+    for outcome, expected in zip(outcomes, first):
+        assert outcome.error == expected.error
+        if expected.value is None:
+            assert outcome.value is None
+            continue
+        assert outcome.value == expected.value
+        stored, parsed = flatten(outcome.value), flatten(expected.value)
+        assert stored == parsed
+        assert [type(value) for value in stored.values()] == [
+            type(value) for value in parsed.values()
+        ]
+
+
+def test_persistent_cache_stale(tmp_path):
+    path = tmp_path / "outcomes.db"
+    serialnumbers = ["20UPGFC1048575", "20UPGFC0000001", "20UPGR92101041"]
+    with PersistentCache(path) as cache:
+        cache.validate_many(serialnumbers)
+
+    # as if stored by a version of itksn parsing FE chips differently
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "UPDATE outcomes SET fingerprint = 'outdated'"
+            " WHERE substr(serialnumber, 1, 7) = ?",
+            (b"20UPGFC",),
+        )
+    connection.close()
+
+    with PersistentCache(path) as cache:
+        assert cache.validate("20UPGFC1048575").ok
+        assert cache.validate("20UPGR92101041").ok
+        assert cache.cache_info() == PersistentCacheInfo(
+            hits=1, misses=1, stale=1, currsize=3
+        )
+        assert cache.refresh() == 1
+        assert cache.refresh() == 0
+
+
+def test_persistent_cache_storage_version(tmp_path):
+    path = tmp_path / "outcomes.db"
+    with PersistentCache(path) as cache:
+        cache.validate("20UPGFC1048575")
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE meta SET value = '0'")
+    connection.close()
+    with PersistentCache(path) as cache:
+        assert cache.cache_info().currsize == 0
+
+
+@pytest.mark.parametrize(
+    "serialnumber",
+    [
+        "20UPGR9X101041",
+        "20UPIFW2123456",
+        "20UPGFC12",
+        "20UPGFC1048575X",
+        "20UPGG41234567",
+        "20UPGFCXXXXXXX",
+        "20U\xe9PG",
+    ],
+)
+def test_persistent_cache_errors(tmp_path, serialnumber):
+    path = tmp_path / "outcomes.db"
+    expected = itksn.validate(serialnumber)
+    assert not expected.ok
+    with PersistentCache(path) as cache:
+        cache.validate(serialnumber)
+    with PersistentCache(path) as cache:
+        assert cache.validate(serialnumber) == expected
+        assert cache.cache_info().hits == 1
+        (failure,) = cache.failures()
+        assert failure == expected
+        assert failure.error.exception_type is expected.error.exception_type
+    # stored as plain JSON, not pickled
+    with sqlite3.connect(path) as connection:
+        (error,) = connection.execute("SELECT error FROM outcomes").fetchone()
+    connection.close()
+    assert json.loads(error)[0] == expected.error.code.value
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import io
+import json
 import shlex
 import time
 
+import pytest
+
 import itksn
+from itksn import batch
 
 
 def test_version(script_runner):
@@ -23,3 +28,263 @@ def test_parse(script_runner):
     command = "itksn parse 20UPGR92101041"
     ret = script_runner.run(shlex.split(command))
     assert ret.success
+
+
+def test_parse_file(script_runner, tmp_path):
+    serialnumbers = tmp_path / "serialnumbers.txt"
+    serialnumbers.write_text("20UPGFC1048575\n\n  20UPGMC2291234  \n")
+    ret = script_runner.run(["itksn", "parse", "--file", str(serialnumbers)])
+    assert ret.success
+    lines = ret.stdout.splitlines()
+    assert len(lines) == 2
+    assert "FE_chip" in lines[0]
+    assert "Module_carrier" in lines[1]
+    assert not ret.stderr
+
+
+def test_parse_stdin(script_runner):
+    ret = script_runner.run(
+        ["itksn", "parse", "--file", "-"],
+        stdin=io.StringIO("20UPGFC1048575\n20UPIFW2123456\n20UPGMC2291234\n"),
+    )
+    assert not ret.success
+    assert len(ret.stdout.splitlines()) == 2
+    assert ret.stderr.splitlines() == [
+        "20UPIFW2123456: MappingError: parsing failed, no mapping for b'FW'"
+    ]
+
+
+def test_parse_requires_one_input(script_runner, tmp_path):
+    serialnumbers = tmp_path / "serialnumbers.txt"
+    serialnumbers.write_text("20UPGFC1048575\n")
+    assert not script_runner.run(["itksn", "parse"]).success
+    assert not script_runner.run(
+        ["itksn", "parse", "20UPGFC1048575", "--file", str(serialnumbers)]
+    ).success
+
+
+def test_parse_format_jsonl(script_runner):
+    ret = script_runner.run(
+        ["itksn", "parse", "--file", "-", "--format", "jsonl"],
+        stdin=io.StringIO("20UPGFC1048575\n20UPIFW2123456\n20UPGMC2291234\n"),
+    )
+    assert not ret.success
+    rows = [json.loads(line) for line in ret.stdout.splitlines()]
+    assert [row["serialnumber"] for row in rows] == ["20UPGFC1048575", "20UPGMC2291234"]
+    assert rows[1]["identifier.module_type.bytevalue"] == "2"
+    assert ret.stderr.splitlines() == [
+        "20UPIFW2123456: MappingError: parsing failed, no mapping for b'FW'"
+    ]
+
+
+def test_parse_format_csv(script_runner, tmp_path):
+    output = tmp_path / "serialnumbers.csv"
+    ret = script_runner.run(
+        ["itksn", "parse", "20UPGR92101041", "--format", "csv", "-o", str(output)]
+    )
+    assert ret.success
+    assert not ret.stdout
+    header, row = output.read_text().splitlines()
+    assert header.startswith("serialnumber,atlas_project,")
+    assert row.startswith("20UPGR92101041,atlas_detector,")
+
+
+def test_parse_format_parquet_requires_output(script_runner):
+    ret = script_runner.run(["itksn", "parse", "20UPGR92101041", "--format", "parquet"])
+    assert not ret.success
+    assert "requires --output" in ret.stderr
+
+
+def test_parse_jobs(script_runner, monkeypatch):
+    # more than two chunks, so that they are parsed in the worker processes
+    count = 2 * batch.CHUNK_SIZE + 1
+    serialnumbers = "".join(f"20UPGFC{number:07d}\n" for number in range(count))
+    serialnumbers += "20UPGMC2291234\n"
+    pools = []
+    parallel_parse = batch._iter_parse_parallel
+
+    def spy(first, chunks, workers):
+        pools.append(workers)
+        return parallel_parse(first, chunks, workers)
+
+    monkeypatch.setattr(batch, "_iter_parse_parallel", spy)
+    serial = script_runner.run(
+        ["itksn", "parse", "--file", "-"], stdin=io.StringIO(serialnumbers)
+    )
+    assert pools == []
+    parallel = script_runner.run(
+        ["itksn", "parse", "--file", "-", "--jobs", "2"],
+        stdin=io.StringIO(serialnumbers),
+    )
+    assert pools == [2]
+    assert parallel.success
+    assert parallel.stdout == serial.stdout
+    assert len(parallel.stdout.splitlines()) == count + 1
+
+
+def test_prefix(script_runner):
+    ret = script_runner.run(["itksn", "prefix", "20UPGFC1048575"])
+    assert ret.success
+    assert ret.stdout.splitlines() == [
+        "20UPGFC: FE_chip [PG] (length 14)",
+        "  number: offset 7, width 7",
+    ]
+
+
+def test_prefix_partial(script_runner):
+    ret = script_runner.run(["itksn", "prefix", "20UPGM"])
+    assert ret.success
+    assert "20UPGM2: Outer_system_quad_module" in ret.stdout.splitlines()
+
+
+def test_prefix_json(script_runner):
+    ret = script_runner.run(["itksn", "prefix", "20UPGG4", "--json"])
+    assert ret.success
+    (entry,) = json.loads(ret.stdout)
+    assert entry["component"] == "FourInch_bare_module_gel_pack"
+    assert entry["allowed"] is False
+
+
+def test_prefix_unknown(script_runner):
+    ret = script_runner.run(["itksn", "prefix", "20UPGXX"])
+    assert not ret.success
+    assert "no pixel component" in ret.stderr
+
+
+def test_scan(script_runner, tmp_path):
+    serialnumbers = tmp_path / "serialnumbers.txt"
+    serialnumbers.write_bytes(b"20UPGFC1048575\r\n20UPIFW2123456\n\n20UPGMC2291234\n")
+    ret = script_runner.run(["itksn", "scan", str(serialnumbers)])
+    assert not ret.success
+    assert not ret.stdout
+    assert ret.stderr.splitlines() == [
+        "16: 20UPIFW2123456: MappingError: parsing failed, no mapping for b'FW'",
+        "scanned 3 serial numbers, 1 failed, resume with --offset 47",
+    ]
+
+
+def test_scan_packed_offset(script_runner, tmp_path):
+    serialnumbers = tmp_path / "serialnumbers.bin"
+    serialnumbers.write_bytes(b"20UPGFC104857520UPGR9210104120UPGMC2291234")
+    options = ["--packed", "--offset", "14", "--format", "jsonl"]
+    ret = script_runner.run(["itksn", "scan", str(serialnumbers), *options])
+    assert ret.success
+    rows = [json.loads(line) for line in ret.stdout.splitlines()]
+    assert [row["serialnumber"] for row in rows] == ["20UPGR92101041", "20UPGMC2291234"]
+    assert "resume with --offset 42" in ret.stderr
+
+
+@pytest.mark.parametrize("output_format", ["csv", "jsonl"])
+def test_scan_interrupted(script_runner, tmp_path, monkeypatch, output_format):
+    import itksn.scan  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+
+    expected = [f"20UPGFC{number:07d}" for number in range(10)]
+    serialnumbers = tmp_path / "serialnumbers.txt"
+    serialnumbers.write_text("".join(f"{sn}\n" for sn in expected))
+    scan = itksn.scan.scan
+
+    def interrupted(*args, **kwargs):
+        # after the first batch of 4 rows, and 2 rows of the next one
+        for index, result in enumerate(scan(*args, **kwargs)):
+            if index == 6:
+                raise KeyboardInterrupt
+            yield result
+
+    def written(output):
+        if output_format == "csv":
+            return [line.split(",")[0] for line in output.read_text().splitlines()[1:]]
+        return [
+            json.loads(line)["serialnumber"] for line in output.read_text().splitlines()
+        ]
+
+    first = tmp_path / f"first.{output_format}"
+    options = ["--format", output_format, "--batch-size", "4"]
+    monkeypatch.setattr(itksn.scan, "scan", interrupted)
+    ret = script_runner.run(
+        ["itksn", "scan", str(serialnumbers), *options, "-o", str(first)]
+    )
+    monkeypatch.setattr(itksn.scan, "scan", scan)
+    assert ret.returncode == 130
+    assert "interrupted, resume with --offset 60" in ret.stderr
+    assert written(first) == expected[:4]
+
+    second = tmp_path / f"second.{output_format}"
+    options += ["--offset", "60", "-o", str(second)]
+    ret = script_runner.run(["itksn", "scan", str(serialnumbers), *options])
+    assert ret.success
+    assert written(first) + written(second) == expected
+
+
+def test_fingerprints(script_runner, tmp_path):
+    ret = script_runner.run(["itksn", "fingerprints"])
+    assert ret.success
+    saved = json.loads(ret.stdout)
+    assert saved["version"] == itksn.__version__
+    assert "FE_chip" in saved["components"]
+
+    saved["components"]["FE_chip"] = "0123456789abcdef"
+    saved["components"]["Retired"] = "0123456789abcdef"
+    del saved["components"]["Quad_PCB"]
+    old = tmp_path / "fingerprints.json"
+    old.write_text(json.dumps(saved))
+    ret = script_runner.run(["itksn", "fingerprints", "--diff", str(old)])
+    assert ret.success
+    assert ret.stdout.splitlines() == ["+ Quad_PCB", "- Retired", "~ FE_chip"]
+
+
+def test_export_ksy(script_runner, tmp_path):
+    pytest.importorskip("ruamel.yaml")
+    ret = script_runner.run(["itksn", "export-ksy"])
+    assert ret.success
+    assert ret.stdout.startswith("meta:\n  id: itk_serial_number\n")
+
+    output = tmp_path / "itk_sn.ksy"
+    ret = script_runner.run(
+        ["itksn", "export-ksy", "--id", "itk_sn", "-o", str(output)]
+    )
+    assert ret.success
+    assert not ret.stdout
+    assert output.read_text().startswith("meta:\n  id: itk_sn\n")
+
+
+def test_export_ksy_without_sources(script_runner, monkeypatch):
+    pytest.importorskip("ruamel.yaml")
+    import inspect  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+
+    def getsource(_obj):
+        # as for a bytecode-only installation
+        raise OSError
+
+    monkeypatch.setattr(inspect, "getsource", getsource)
+    ret = script_runner.run(["itksn", "export-ksy"])
+    assert ret.returncode == 1
+    assert not ret.stdout
+    assert "its source is not available" in ret.stderr
+
+
+def test_index_query(script_runner, tmp_path):
+    database = tmp_path / "inventory.db"
+    ret = script_runner.run(
+        ["itksn", "index", str(database), "-"],
+        stdin=io.StringIO("20UPGFC0001234\n20UPGFC0001289\n20UPGFC1048575\n20UPGXX\n"),
+    )
+    assert ret.success
+    assert "added 4 serial numbers" in ret.stderr
+    assert "3 valid serial numbers, 1 invalid" in ret.stderr
+
+    ret = script_runner.run(
+        ["itksn", "query", str(database), "component_code=FE_chip", "wafer=4,5"]
+    )
+    assert ret.success
+    assert ret.stdout.splitlines() == ["20UPGFC0001234", "20UPGFC0001289"]
+
+    ret = script_runner.run(["itksn", "query", str(database), "wafer=4", "--count"])
+    assert ret.stdout == "1\n"
+    ret = script_runner.run(["itksn", "query", str(database), "--values", "batch"])
+    assert ret.stdout.splitlines() == ["ITkpix_v2\t1", "RD53A\t2"]
+
+    ret = script_runner.run(["itksn", "query", str(database), "colour=red"])
+    assert not ret.success
+    assert "unknown field" in ret.stderr
+    ret = script_runner.run(["itksn", "query", str(database), "wafer"])
+    assert not ret.success
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import pytest
+from construct import StreamError
+
+from itksn.core import CompiledSerialNumberStruct, SerialNumberStruct
+
+
+def outcome(struct, serial_number):
+    try:
+        return struct.parse(serial_number)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        return type(exc)
+
+
+def assert_identical(serial_number):
+    expected = outcome(SerialNumberStruct, serial_number)
+    assert outcome(CompiledSerialNumberStruct, serial_number) == expected
+    if not isinstance(expected, type):
+        assert CompiledSerialNumberStruct.build(expected) == serial_number
+
+
+def test_compiled_identical(component_prefix, identifiers):
+    for identifier in identifiers:
+        assert_identical(component_prefix + identifier.encode())
+
+
+def test_compiled_identical_valid(valid_sn):
+    assert_identical(valid_sn.encode("utf-8"))
+
+
+@pytest.mark.parametrize(
+    "serial_number",
+    [b"", b"20UPGFC12", b"20USG0000000000", b"20UCCM0000000", b"20UPGMC2291234999"],
+)
+def test_compiled_identical_invalid(serial_number):
+    assert_identical(serial_number)
+
+
+def test_compiled_build_checks_length():
+    obj = SerialNumberStruct.parse(b"20UPGFC1048575")
+    obj.identifier.number = b"123"
+    with pytest.raises(StreamError, match="wrong length"):
+        CompiledSerialNumberStruct.build(obj)
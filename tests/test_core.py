@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import copy
+import pickle
+
 import pytest
 from construct import Bytes
 from construct.core import MappingError, TerminatedError
 
 import itksn
-from itksn.core import EnumStr
+import itksn.flat
+from itksn.common import EnumByteString
+from itksn.core import EnumStr, SerialNumberStruct
 
 
 def test_enumstr():
@@ -16,6 +21,32 @@ def test_enumstr():
         myenum.parse(b"xx")
 
 
+def test_enumstr_interned():
+    myenum = EnumStr(Bytes(2), itsaa=b"aa", itsbb=b"bb")
+    itsaa = myenum.parse(b"aa")
+    assert myenum.parse(b"aa") is itsaa
+    assert myenum.compile().parse(b"aa") is itsaa
+    assert myenum.itsaa is itsaa
+    assert EnumStr(Bytes(2), itsaa=b"aa").parse(b"aa") is itsaa
+    assert EnumByteString.new(b"aa", "itsaa") is itsaa
+    assert pickle.loads(pickle.dumps(itsaa)) is itsaa
+    assert copy.deepcopy(itsaa) is itsaa
+    with pytest.raises(AttributeError):
+        _ = myenum.itscc
+
+
+def test_enumstr_interned_across_parsers():
+    serialnumber = b"20UPGR92101041"
+    parsed = [
+        SerialNumberStruct.parse(serialnumber),
+        itksn.parse(serialnumber),
+        itksn.flat.parse(serialnumber),
+    ]
+    for field in ("project_code", "component_code"):
+        assert len({id(result[field]) for result in parsed}) == 1
+    assert len({id(result.identifier.FE_chip_version) for result in parsed}) == 1
+
+
 def test_parse_fe_wafer():
     parsed = itksn.parse(b"20UPGFW2123456")
     assert parsed.atlas_project == "atlas_detector"
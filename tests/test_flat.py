@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+import itksn.flat
+from itksn.core import CompiledSerialNumberStruct
+
+
+def outcome(parse, serial_number):
+    try:
+        return parse(serial_number)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        return type(exc)
+
+
+def assert_identical(serial_number):
+    expected = outcome(CompiledSerialNumberStruct.parse, serial_number)
+    assert outcome(itksn.flat.parse, serial_number) == expected
+
+
+def test_flat_identical(layout_prefix, identifiers):
+    assert layout_prefix in itksn.flat.layouts()
+    assert_identical(layout_prefix)
+    for identifier in identifiers:
+        assert_identical(layout_prefix + identifier.encode())
+
+
+def test_flat_identical_valid(valid_sn):
+    assert_identical(valid_sn.encode("utf-8"))
+
+
+@pytest.mark.parametrize(
+    "serial_number",
+    [
+        b"",
+        b"20UPGOD",
+        b"20UPE20",
+        b"20UPGFC12",
+        b"20USG0000000000",
+        b"20UCCM0000000",
+        b"20UPGMC2291234999",
+    ],
+)
+def test_flat_identical_invalid(serial_number):
+    assert_identical(serial_number)
+
+
+def test_flat_layout():
+    layout = itksn.flat.layouts()[b"20UPGFC"]
+    assert layout.prefix == b"20UPGFC"
+    assert layout.header == {
+        "atlas_project": "atlas_detector",
+        "system_code": "phaseII_upgrade",
+        "project_code": "pixel",
+        "subproject_code": "pixel_general",
+        "component_code": "FE_chip",
+    }
+
+
+def test_flat_layout_locate():
+    layout = itksn.flat.layouts()[b"20UPGR9"]
+    rd53a = {"identifier": {"FE_chip_version": "RD53A"}}
+    itkpix = {"identifier": {"FE_chip_version": "ITkpix_v1"}}
+    assert layout.locate("identifier.FE_chip_version", {}) == (7, 1)
+    assert layout.locate("identifier.number", rd53a) == (9, 5)
+    assert layout.locate("identifier.number", itkpix) == (8, 6)
+    with pytest.raises(KeyError):
+        layout.locate("identifier.wafer", rd53a)
+    with pytest.raises(ValueError, match="not stored at a fixed position"):
+        itksn.flat.layouts()[b"20UPGFC"].locate("identifier.wafer", {})
+
+
+def test_flat_shares_enum_values():
+    first = itksn.flat.parse(b"20UPGR92101041")
+    second = itksn.flat.parse(b"20UPGR92101042")
+    assert first.component_code is second.component_code
+    assert first.identifier.FE_chip_version is second.identifier.FE_chip_version
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+
+import pytest
+
+import itksn
+from itksn import formats
+
+
+def test_flatten():
+    row = formats.flatten(itksn.parse(b"20UPGFC1048575"))
+    assert row["component_code"] == "FE_chip"
+    assert row["component_code.bytevalue"] == "FC"
+    assert row["identifier.number"] == "1048575"
+    assert row["identifier.wafer"] == 255
+    assert not any(key.startswith("_") for key in row)
+    assert set(row) <= set(formats.columns())
+
+
+def test_columns():
+    columns = formats.columns()
+    assert columns[0] == "serialnumber"
+    assert len(columns) == len(set(columns))
+    assert "identifier.FE_chip_version" in columns
+    assert "identifier.FE_chip_version.bytevalue" in columns
+    assert "identifier.data.flavor" in columns
+
+
+def test_column_types():
+    types = formats.column_types()
+    assert tuple(types) == formats.columns()
+    assert {name for name, kind in types.items() if kind is int} == {
+        "identifier.batch_number",
+        "identifier.wafer",
+        "identifier.row",
+        "identifier.column",
+    }
+    assert types["identifier.batch"] is str
+    assert types["identifier.number"] is str
+
+
+def test_batched():
+    assert list(formats.batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(formats.batched([], 2)) == []
+
+
+@pytest.fixture
+def rows():
+    return [
+        {"serialnumber": sn, **formats.flatten(itksn.parse(sn.encode()))}
+        for sn in ["20UPGFC1048575", "20UPGMC2291234", "20UPGR92101041"]
+    ]
+
+
+def test_write_jsonl(rows):
+    stream = io.StringIO()
+    formats.write_jsonl(rows, stream, batch_size=2)
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == rows
+
+
+@pytest.mark.parametrize(
+    "writer", [formats.write_json, formats.write_jsonl, formats.write_csv]
+)
+def test_write_progress(rows, writer):
+    stream = io.StringIO()
+    written = []
+
+    def progress(count):
+        # the rows of the batch are written by then
+        written.append((count, stream.getvalue().count("20UPG")))
+
+    writer(rows, stream, 2, progress)
+    assert written == [(2, 2), (1, 3)]
+
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_write_json(rows, count):
+    stream = io.StringIO()
+    formats.write_json(rows[:count], stream, batch_size=2)
+    assert json.loads(stream.getvalue()) == rows[:count]
+
+
+def test_write_csv(rows):
+    stream = io.StringIO()
+    formats.write_csv(rows, stream, batch_size=2)
+    stream.seek(0)
+    reader = csv.DictReader(stream)
+    assert tuple(reader.fieldnames) == formats.columns()
+    written = list(reader)
+    assert [row["serialnumber"] for row in written] == [
+        row["serialnumber"] for row in rows
+    ]
+    assert written[2]["identifier.FE_chip_version"] == "ITkpix_v1p1"
+    assert not written[2]["identifier.wafer"]
+
+
+def test_write_parquet(rows, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "serialnumbers.parquet"
+    formats.write_parquet(rows, str(path), batch_size=2)
+    table = pq.read_table(path)
+    assert table.column_names == list(formats.columns())
+    assert table.num_rows == 3
+    assert table.column("identifier.wafer").to_pylist() == [255, None, None]
+    assert table.column("component_code.bytevalue").to_pylist() == ["FC", "MC", "R9"]
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3])
+def test_write_parquet_schema(rows, tmp_path, batch_size):
+    pq = pytest.importorskip("pyarrow.parquet")
+    # the schema does not depend on the order of the rows or the batches
+    path = tmp_path / "serialnumbers.parquet"
+    formats.write_parquet(rows[::-1], str(path), batch_size=batch_size)
+    table = pq.read_table(path)
+    assert str(table.schema.field("identifier.wafer").type) == "int64"
+    assert table.column("identifier.wafer").to_pylist() == [None, None, 255]
+    empty = tmp_path / "empty.parquet"
+    formats.write_parquet([], str(empty))
+    assert pq.read_schema(empty) == pq.read_schema(path)
+
+
+def test_write_parquet_empty(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "serialnumbers.parquet"
+    formats.write_parquet([], str(path))
+    assert pq.read_table(path).num_rows == 0
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import pytest
+
+import itksn
+from itksn.formats import flatten
+
+pd = pytest.importorskip("pandas")
+frames = pytest.importorskip("itksn.frames")
+
+
+def test_accessor_agrees_with_parse(valid_sns):
+    serialnumbers = [*valid_sns, "20USBSL0000001", "20UPGR9X101041", "20UPGX"]
+    frame = pd.Series(serialnumbers).itksn.parse()
+    assert len(frame) == len(serialnumbers)
+    for index, serialnumber in enumerate(serialnumbers):
+        outcome = itksn.try_parse(serialnumber)
+        assert frame["valid"][index] == outcome.ok, serialnumber
+        if not outcome.ok:
+            assert frame.drop(columns="valid").iloc[index].isna().all()
+            continue
+        for name, value in flatten(outcome.value).items():
+            if name.endswith(".bytevalue") or value is None:
+                continue
+            got = frame[name][index]
+            if frame[name].dtype == "Int64":
+                assert got == value, (serialnumber, name)
+            else:
+                assert got == str(value), (serialnumber, name)
+
+
+def test_accessor_dtypes():
+    series = pd.Series(["20UPGFC1048575", None, "20UPGR92101041"], index=[3, 5, 7])
+    frame = series.itksn.parse()
+    assert frame.index.tolist() == [3, 5, 7]
+    assert frame["valid"].tolist() == [True, False, True]
+    assert frame["component_code"].dtype == "category"
+    assert frame["identifier.number"].dtype == "category"
+    assert frame["identifier.wafer"].tolist() == [255, pd.NA, pd.NA]
+    # all values a field can take, not only the ones present
+    assert "ITkpix_v1p1" in frame["identifier.FE_chip_version"].cat.categories
+    assert frame["identifier.FE_chip_version"].tolist()[2] == "ITkpix_v1p1"
+
+
+def test_accessor_strips():
+    frame = pd.Series(["20USBSL0000001", "20UPGFC1048575"]).itksn.parse()
+    assert frame["valid"].all()
+    assert frame["project_code"].tolist() == ["strip", "pixel"]
+    assert frame["identifier"].tolist()[0] == "0000001"
+    assert frame["identifier.number"].isna().tolist() == [True, False]
+    assert frame["identifier.number"].tolist()[1] == "1048575"
+
+
+def test_accessor_alphanumeric_number(valid_sns):
+    # valid serial numbers whose number is not all digits
+    numbers = {}
+    for serialnumber in [*valid_sns, "20UPIRU22020N4"]:
+        number = flatten(itksn.parse(serialnumber.encode())).get("identifier.number")
+        if number is not None and not number.isdigit():
+            numbers[serialnumber] = number
+    assert {"20UPGBQ2001F00", "20UPIRU22020N4"} <= set(numbers)
+    frame = pd.Series(list(numbers)).itksn.parse()
+    assert frame["valid"].all()
+    assert frame["identifier.number"].tolist() == list(numbers.values())
+
+
+def test_parse_frame_empty():
+    frame = frames.parse_frame([])
+    assert frame.columns.tolist() == ["valid"]
+    assert len(frame) == 0
+
+
+def test_parse_arrow():
+    pa = pytest.importorskip("pyarrow")
+    array = pa.chunked_array(
+        [pa.array(["20UPGFC1048575", None]), pa.array(["20USBSL0000001"])]
+    )
+    table = pa.Table.from_struct_array(frames.parse_arrow(array))
+    assert table.column("valid").to_pylist() == [True, False, True]
+    assert table.schema.field("component_code").type == pa.dictionary(
+        pa.int32(), pa.string()
+    )
+    assert table.column("component_code").to_pylist() == ["FE_chip", None, "SL"]
+    assert table.column("identifier.wafer").to_pylist() == [255, None, None]
@@ -1,7 +1,43 @@
 from __future__ import annotations
 
+import subprocess
+import sys
+
+import pytest
+
 import itksn
 
+# the parser must not be built just to import the package or start the CLI, nor
+# the optional dependencies imported (the timing is in benchmarks/test_import.py)
+HEAVY_MODULES = (
+    "construct",
+    "itksn.core",
+    "itksn.pixels",
+    "numpy",
+    "pandas",
+    "pyarrow",
+)
+
 
 def test_import():
     assert itksn
+
+
+def test_lazy_attributes():
+    assert itksn.parse(b"20UPGFC1048575").identifier.wafer == 255
+    assert "parse_many" in dir(itksn)
+    with pytest.raises(AttributeError, match="no_such_attribute"):
+        _ = itksn.no_such_attribute
+
+
+@pytest.mark.parametrize("module", ["itksn", "itksn.cli.main"])
+def test_import_is_lazy(module):
+    code = f"""
+import sys
+import {module}
+print(*[name for name in {HEAVY_MODULES!r} if name in sys.modules])
+"""
+    ret = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert not ret.stdout.strip()
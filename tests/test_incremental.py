@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import pytest
+
+import itksn
+from itksn import registry
+from itksn.incremental import ALPHABET, IncrementalParser
+
+
+def test_incremental_valid(valid_sns):
+    for serial_number in valid_sns:
+        parser = IncrementalParser()
+        for char in serial_number:
+            assert parser.feed(char)
+        assert parser.complete
+        assert parser.value() == itksn.parse(serial_number.encode("utf-8"))
+
+
+@pytest.mark.parametrize(
+    "serial_number", ["20UPGFC1048575", "20UPGR92101041", "20UPBD10012345", "20USG"]
+)
+def test_incremental_allowed_next(serial_number):
+    parser = IncrementalParser()
+    for char in serial_number:
+        for candidate in ALPHABET:
+            expected = IncrementalParser(parser.data + candidate.encode()).ok
+            assert (candidate in parser.allowed_next) is expected
+        parser.feed(char)
+
+
+def test_incremental_fields():
+    parser = IncrementalParser()
+    fields = []
+    for char in "20UPGR92101041":
+        fields.append(parser.field)
+        parser.feed(char)
+    assert fields == [
+        "atlas_project",
+        "atlas_project",
+        "system_code",
+        "project_code",
+        "subproject_code",
+        "component_code",
+        "component_code",
+        "identifier.FE_chip_version",
+        "identifier.number",
+        "identifier.number",
+        "identifier.number",
+        "identifier.number",
+        "identifier.number",
+        "identifier.number",
+    ]
+    assert parser.field is None
+    assert parser.complete
+    assert parser.allowed_next == frozenset()
+
+
+def test_incremental_invalid():
+    parser = IncrementalParser("20UPG")
+    # gel packs (G4, G6) have no valid identifier in the pixel_general subproject
+    assert parser.allowed_next == {
+        entry.prefix[5:6].decode() for entry in registry.candidates("20UPG")
+    } - {"G"}
+    assert not parser.feed("Z")
+    assert parser.error.code == itksn.ErrorCode.unknown_value
+    assert parser.error.field == "component_code"
+    assert not parser.complete
+    assert parser.field is None
+    assert parser.value() is None
+    assert parser.allowed_next == frozenset()
+    # further input does not make it valid again
+    assert not parser.feed("C1048575")
+
+    assert parser.backspace(9)
+    assert parser.data == b"20UPG"
+    assert parser.feed("FC1048575")
+    assert parser.complete
+
+
+def test_incremental_computed():
+    # the computed fields of the FE chip need a number
+    parser = IncrementalParser("20UPGFC")
+    assert parser.allowed_next == frozenset("0123456789+-")
+    assert parser.feed("10485")
+    assert "A" not in parser.allowed_next
+    assert not parser.feed("A")
+    assert parser.error.code == itksn.ErrorCode.invalid_value
+    assert parser.error.field == "identifier.batch_number"
+
+
+@pytest.mark.parametrize("data", ["20UPGFCX", "20UPGFC1X", "20UPGFCXXXXXX"])
+def test_incremental_computed_letters(data):
+    parser = IncrementalParser(data)
+    assert not parser.ok
+    assert parser.allowed_next == frozenset()
+    # agrees with the final parse, whatever the rest of the number
+    for end in ("0", "9"):
+        completed = data + end * (14 - len(data))
+        assert not IncrementalParser(completed).ok
+        with pytest.raises(ValueError, match="invalid literal"):
+            itksn.parse(completed.encode())
+
+
+def test_incremental_trailing():
+    parser = IncrementalParser("20UPGFC1048575")
+    assert parser.complete
+    assert not parser.feed("1")
+    assert parser.error.code == itksn.ErrorCode.trailing_data
+
+
+def test_incremental_reset():
+    parser = IncrementalParser("20UPGZ")
+    assert not parser.ok
+    parser.reset()
+    assert parser.ok
+    assert parser.data == b""
+    assert parser.field == "atlas_project"
+    assert parser.allowed_next == frozenset("2")
+    assert repr(parser) == "IncrementalParser(b'')"
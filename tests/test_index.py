@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+import itksn
+from itksn import index
+from itksn.validation import try_parse
+
+FE_CHIPS = [b"20UPGFC0001234", b"20UPGFC0001289", b"20UPGFC1048575"]
+
+
+def test_indexed_fields():
+    fields = dict(index.indexed_fields(itksn.parse(b"20UPGFC1048575")))
+    assert fields["component_code"] == "FE_chip"
+    assert fields["identifier.wafer"] == "255"
+    assert fields["identifier.batch"] == "ITkpix_v2"
+    # the running number is not indexed
+    assert "identifier.number" not in fields
+
+
+def test_field_index_query(tmp_path):
+    with index.FieldIndex(tmp_path / "index.db") as field_index:
+        assert field_index.add([*FE_CHIPS, "20UPGR92101041", "20UPGR9X101041"]) == 5
+        assert field_index.add(FE_CHIPS) == 0
+        assert len(field_index) == 4
+        assert field_index.failures() == [b"20UPGR9X101041"]
+
+        assert field_index.query(component_code="FE_chip", wafer=4) == FE_CHIPS[:1]
+        assert field_index.query({"identifier.wafer": "4"}) == FE_CHIPS[:1]
+        assert field_index.query(wafer=[4, 5]) == FE_CHIPS[:2]
+        assert field_index.query(wafer=[4, 5], batch="ITkpix_v2") == []
+        assert field_index.query(FE_chip_version="ITkpix_v1p1") == [b"20UPGR92101041"]
+        assert field_index.count(component_code="FE_chip") == 3
+        assert field_index.query() == sorted([*FE_CHIPS, b"20UPGR92101041"])
+        assert field_index.values("wafer") == {"255": 1, "4": 1, "5": 1}
+        assert "identifier.FE_chip_version" in field_index.fields()
+
+        with pytest.raises(KeyError, match="unknown field"):
+            field_index.query(colour="red")
+        with pytest.raises(KeyError, match="ambiguous field"):
+            field_index.query(flavor="A")
+
+        # a field of the schema that no indexed serial number has
+        assert field_index.query(PCB_manufacturer="EPEC") == []
+        assert field_index.count(component_code="FE_chip", PCB_manufacturer=1) == 0
+        assert field_index.values("identifier.PCB_manufacturer") == {}
+
+    # reopened, the index is still there
+    with index.FieldIndex(tmp_path / "index.db") as field_index:
+        assert field_index.count(project_code="pixel") == 4
+
+
+def test_field_index_matches_parse(valid_sns):
+    with index.FieldIndex(":memory:") as field_index:
+        field_index.add(valid_sns)
+        assert len(field_index) == len(valid_sns)
+        for component_code, count in field_index.values("component_code").items():
+            expected = [
+                sn.encode()
+                for sn in valid_sns
+                if itksn.parse(sn.encode()).component_code == component_code
+            ]
+            assert count == len(expected)
+            assert field_index.query(component_code=component_code) == sorted(expected)
+
+
+def test_field_index_refresh(tmp_path, monkeypatch):
+    path = tmp_path / "index.db"
+    monkeypatch.setattr(index, "CHUNK_SIZE", 2)
+    with index.FieldIndex(path) as field_index:
+        field_index.add([*FE_CHIPS, "20UPGR92101041", "20UPGR9X101041"])
+        assert field_index.refresh() == 0
+
+    # as if indexed by a version of itksn parsing FE chips differently
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "UPDATE prefixes SET fingerprint = 'outdated' WHERE prefix = ?",
+            (b"20UPGFC",),
+        )
+    with index.FieldIndex(path) as field_index:
+        assert field_index.refresh() == 3
+        assert field_index.refresh() == 0
+        assert field_index.query(component_code="FE_chip") == FE_CHIPS
+        assert field_index.values("wafer") == {"255": 1, "4": 1, "5": 1}
+        assert len(field_index) == 4
+
+
+def test_field_index_interrupted(tmp_path, monkeypatch):
+    path = tmp_path / "index.db"
+
+    def interrupted(serialnumber):
+        if serialnumber == b"20UPGFC1048575":
+            raise KeyboardInterrupt
+        return try_parse(serialnumber)
+
+    with index.FieldIndex(path) as field_index:
+        monkeypatch.setattr(index, "try_parse", interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            field_index.add(FE_CHIPS)
+        monkeypatch.setattr(index, "try_parse", try_parse)
+        # the chunk was rolled back, with the fields it added
+        assert field_index.fields() == []
+        assert field_index.add(["20UPGR92101041"]) == 1
+        assert field_index.values("FE_chip_version") == {"ITkpix_v1p1": 1}
+        assert field_index.values("component_code") == {"Digital_quad_module": 1}
+
+    with index.FieldIndex(path) as field_index:
+        assert field_index.add(FE_CHIPS) == 3
+        assert field_index.query(component_code="FE_chip") == FE_CHIPS
+        assert field_index.values("FE_chip_version") == {"ITkpix_v1p1": 1}
+
+
+def test_field_index_storage_version(tmp_path):
+    path = tmp_path / "index.db"
+    with index.FieldIndex(path) as field_index:
+        field_index.add(FE_CHIPS)
+    with index.FieldIndex(path) as field_index:
+        assert len(field_index) == 3
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE meta SET value = '0'")
+    connection.close()
+    with index.FieldIndex(path) as field_index:
+        assert len(field_index) == 0
+        assert field_index.add(FE_CHIPS) == 3
+        assert field_index.query(component_code="FE_chip") == FE_CHIPS
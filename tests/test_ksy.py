@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import importlib.util
+import io
+import json
+import re
+import shutil
+import subprocess
+
+import pytest
+from construct import Struct
+
+from itksn import ksy, pixels
+from itksn.common import Bytes, EnumStr
+from itksn.core import SerialNumberStruct
+
+YAML = pytest.importorskip("ruamel.yaml").YAML
+
+
+def member_id(entry):
+    return entry["id"] if isinstance(entry, dict) else entry
+
+
+def original_name(entry):
+    return entry["-orig-id"] if isinstance(entry, dict) else entry
+
+
+@pytest.fixture(scope="module")
+def schema():
+    # round-trip through the YAML text, as a Kaitai compiler would read it
+    return YAML(typ="safe", pure=True).load(
+        io.StringIO(ksy.export_ksy(SerialNumberStruct))
+    )
+
+
+def test_export_ksy(schema, tmp_path):
+    assert schema == ksy.to_ksy()
+    assert schema["meta"]["id"] == "itk_serial_number"
+    assert schema["enums"]["atlas_project"] == {0x3230: "atlas_detector"}
+    # every referenced type and enum is defined
+    text = json.dumps(schema)
+    for name in re.findall(r'"type": "([a-z][a-z0-9_]*)"', text):
+        assert name in schema["types"] or re.fullmatch(r"u\d(be)?|str", name)
+    for name in re.findall(r'"enum": "([a-z0-9_]+)"', text):
+        assert name in schema["enums"]
+
+    filename = tmp_path / "itk_serial_number.ksy"
+    text = ksy.export_ksy(SerialNumberStruct, "itk_sn", str(filename))
+    assert text == filename.read_text()
+    assert "id: itk_sn" in filename.read_text()
+
+
+def test_export_ksy_identifiers(schema):
+    for typedef in [schema, *schema["types"].values()]:
+        for attr in typedef.get("seq", []):
+            assert re.fullmatch(r"[a-z][a-z0-9_]*", attr.get("id", "a"))
+    for entries in schema["enums"].values():
+        for entry in entries.values():
+            assert re.fullmatch(r"[a-z][a-z0-9_]*", member_id(entry))
+
+
+def case(schema, typedef, field, member):
+    """
+    The type that the ``by_<field>`` switch of ``typedef`` reads for ``member``.
+    """
+    (attr,) = [attr for attr in typedef["seq"] if attr.get("id") == f"by_{field}"]
+    (name,) = [
+        name
+        for label, name in attr["type"]["cases"].items()
+        if label.endswith(f"::{member}")
+    ]
+    return schema["types"][name]
+
+
+def test_ksy_switches(schema):
+    for typedef in [schema, *schema["types"].values()]:
+        seen = set(typedef.get("instances", {}))
+        for attr in typedef.get("seq", []):
+            switch = attr.get("type")
+            if isinstance(switch, dict):
+                # on a field read before or an instance of this type, or (through
+                # _parent) on a field of a parent
+                field = re.match(r"[a-z][a-z0-9_]*", switch["switch-on"])
+                assert field is None or field.group() in seen
+                for label, name in switch["cases"].items():
+                    assert name in schema["types"]
+                    if "::" in label:
+                        enum, member = label.split("::")
+                        assert member in map(member_id, schema["enums"][enum].values())
+            seen.add(attr.get("id"))
+
+
+def test_ksy_enums(schema):
+    enums = [
+        {value: original_name(entry) for value, entry in entries.items()}
+        for entries in schema["enums"].values()
+    ]
+    # the component codes of each pixel subproject, but those too short to be read
+    for table in pixels.subproject_codes.values():
+        decoded = {
+            int.from_bytes(data, "big"): str(name)
+            for data, name in table.decmapping.items()
+            if len(data) == table.subcon.length
+        }
+        assert decoded in enums
+    assert schema["enums"]["project_code"] == {
+        0x50: "pixel",
+        0x53: "strip",
+        0x43: "common",
+    }
+
+
+def test_ksy_identifier_path(schema):
+    # 20UPGFC1048575, by_project_code.by_subproject_code.by_component_code.identifier
+    typedef = case(schema, schema, "project_code", "pixel")
+    typedef = case(schema, typedef, "subproject_code", "pixel_general")
+    typedef = case(schema, typedef, "component_code", "fe_chip")
+    assert typedef["seq"][0] == {"id": "identifier", "type": "fe_chip"}
+    # nothing may follow the identifier
+    assert typedef["seq"][1] == {"size-eos": True, "valid": {"expr": "_.length == 0"}}
+
+
+def test_ksy_computed(schema):
+    fe_chip = schema["types"]["fe_chip"]
+    assert fe_chip["seq"][0] == {"id": "number", "size": 7}
+    instances = fe_chip["instances"]
+    assert instances["wafer"]["value"] == '((number.to_s("ASCII").to_i & 0xff00) >> 8)'
+    assert instances["batch"]["value"].startswith('(batch_number == 0 ? "RD53A" : ')
+    # a serial number whose batch is not in the table is invalid
+    assert fe_chip["seq"][1]["valid"]["expr"].startswith(
+        "(batch_number == 0) or (batch_number == 1) or "
+    )
+
+
+class KaitaiError(Exception):
+    pass
+
+
+@pytest.fixture(scope="module")
+def compiled(tmp_path_factory):
+    """
+    The parser generated by kaitai-struct-compiler for Python, if installed.
+    """
+    kaitaistruct = pytest.importorskip("kaitaistruct")
+    compiler = shutil.which("kaitai-struct-compiler")
+    if compiler is None:
+        pytest.skip("kaitai-struct-compiler is not installed")
+    directory = tmp_path_factory.mktemp("ksy")
+    source = directory / "itk_serial_number.ksy"
+    ksy.export_ksy(SerialNumberStruct, filename=str(source))
+    subprocess.run(
+        [compiler, "--target", "python", "--outdir", str(directory), str(source)],
+        check=True,
+        capture_output=True,
+    )
+    spec = importlib.util.spec_from_file_location(
+        "itk_serial_number", directory / "itk_serial_number.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ItkSerialNumber, kaitaistruct.KaitaiStructError
+
+
+def camel_case(name):
+    return "".join(part[:1].upper() + part[1:] for part in name.split("_"))
+
+
+def to_python(schema, typedef, obj, result=None):
+    """
+    Convert a parsed Kaitai object to the dictionary parsed by itksn, merging the by_* types.
+    """
+    types = {camel_case(name): nested for name, nested in schema["types"].items()}
+    result = {} if result is None else result
+    attrs = [attr for attr in typedef.get("seq", []) if "id" in attr]
+    attrs += [
+        {"id": name, **instance}
+        for name, instance in typedef.get("instances", {}).items()
+    ]
+    for attr in attrs:
+        value = getattr(obj, attr["id"])
+        if "enum" in attr:
+            (value,) = [
+                original_name(entry)
+                for entry in schema["enums"][attr["enum"]].values()
+                if member_id(entry) == value.name
+            ]
+        elif type(value).__name__ in types:
+            nested = types[type(value).__name__]
+            if attr["id"].startswith("by_"):
+                to_python(schema, nested, value, result=result)
+                continue
+            value = to_python(schema, nested, value)
+        result[attr.get("-orig-id", attr["id"])] = value
+    return result
+
+
+def outcome_kaitai(schema, compiled, serial_number):
+    parser, errors = compiled
+    try:
+        return normalized(to_python(schema, schema, parser.from_bytes(serial_number)))
+    except (errors, EOFError, ValueError, AttributeError):
+        return KaitaiError
+
+
+def normalized(value):
+    if isinstance(value, dict):
+        return {
+            key: normalized(item)
+            for key, item in value.items()
+            if key != "_io" and item is not None
+        }
+    return str(value) if isinstance(value, str) else value
+
+
+def outcome_itksn(serial_number):
+    try:
+        return normalized(SerialNumberStruct.parse(serial_number))
+    except Exception:  # pylint: disable=broad-exception-caught
+        return KaitaiError
+
+
+def test_ksy_round_trip(schema, compiled, layout_prefix, identifiers):
+    for identifier in identifiers:
+        serial_number = layout_prefix + identifier.encode()
+        assert outcome_kaitai(schema, compiled, serial_number) == outcome_itksn(
+            serial_number
+        )
+
+
+def test_ksy_round_trip_valid(schema, compiled, valid_sns):
+    for serial_number in valid_sns:
+        data = serial_number.encode("utf-8")
+        expected = outcome_itksn(data)
+        assert expected is not KaitaiError
+        assert outcome_kaitai(schema, compiled, data) == expected
+
+
+@pytest.mark.parametrize(
+    "serial_number",
+    [b"", b"20UPGFC12", b"20USG0000000000", b"20UCCM0000000", b"20UPGMC2291234999"],
+)
+def test_ksy_round_trip_invalid(schema, compiled, serial_number):
+    assert outcome_kaitai(schema, compiled, serial_number) == outcome_itksn(
+        serial_number
+    )
+
+
+def test_enumstr_export_ksy():
+    # construct's own export, for structs using EnumStr outside of itksn
+    struct = Struct("a" / EnumStr(Bytes(1), x=b"A", Some_Name=b"B"), "b" / Bytes(2))
+    exported = YAML(typ="safe", pure=True).load(struct.export_ksy())
+    assert exported["seq"][0] == {"id": "a", "type": "u1", "enum": "enum_1"}
+    assert exported["enums"]["enum_1"] == {0x41: "x", 0x42: "some_name"}
+
+
+def test_to_ksy_requires_a_struct():
+    with pytest.raises(TypeError, match="expected a Struct"):
+        ksy.to_ksy(Bytes(2))
+
+
+def test_symbol_enum_members():
+    symbol = ksy._Symbol("number", "bytes", 0)
+    with pytest.raises(TypeError, match="number is a bytes field, not an enum"):
+        symbol.enum_members()
+    assert ksy._Symbol("a", "enum", 0, "e", {"x": "y"}).enum_members() == {"x": "y"}
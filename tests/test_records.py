@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import dataclasses
+import pickle
+import tracemalloc
+
+import pytest
+
+import itksn
+from itksn import records
+
+
+def test_to_record(valid_sn):
+    container = itksn.parse(valid_sn.encode("utf-8"))
+    record = records.to_record(container)
+    assert dataclasses.asdict(record) == container
+
+
+@pytest.mark.parametrize(
+    ("serial_number", "name"),
+    [
+        ("20UPGR92101041", "Module"),
+        ("20UPGPC2210002", "Pcb"),
+        ("20UPGFC1048575", "FeChip"),
+        ("20UPBD10012345", "PbType1Data"),
+    ],
+)
+def test_record_class(serial_number, name):
+    record = records.parse(serial_number.encode("utf-8"))
+    assert type(record.identifier).__name__ == name
+    assert type(record.identifier) is records.record_classes()[name]
+
+
+def test_nested_record():
+    record = records.parse(b"20UPBD10012345")
+    assert type(record.identifier.data).__name__ == "PbType1DataBundle"
+    assert record.identifier.data.flavor == "Flat_L2_Normal_Slim"
+
+
+def test_record_is_immutable():
+    record = records.parse(b"20UPGR92101041")
+    assert not hasattr(record, "__dict__")
+    assert not hasattr(record.identifier, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        record.identifier.number = b"000000"  # type: ignore[misc]
+    assert hash(record) == hash(records.parse(b"20UPGR92101041"))
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_record_memory(valid_sns):
+    serialnumbers = [sn.encode("utf-8") for sn in valid_sns] * 10
+
+    def allocated(parse):
+        tracemalloc.start()
+        try:
+            results = [parse(sn) for sn in serialnumbers]
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert len(results) == len(serialnumbers)
+        return size
+
+    assert allocated(records.parse) < 0.6 * allocated(itksn.parse)
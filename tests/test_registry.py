@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+
+import itksn
+import itksn.flat
+from itksn import pixels, registry
+
+
+def test_registry_prefixes():
+    entries = registry.registry()
+    assert entries.keys() == itksn.flat.layouts().keys()
+    assert all(len(prefix) == 7 for prefix in entries)
+
+
+def test_lookup():
+    entry = registry.lookup("20UPGFC1048575")
+    assert entry is registry.lookup(b"20UPGFC")
+    assert entry.prefix == b"20UPGFC"
+    assert entry.component == "FE_chip"
+    assert entry.subproject_code == "PG"
+    assert entry.allowed_subprojects == ("PG",)
+    assert entry.identifier is pixels.modules.fe_chip
+    assert entry.fields == (registry.Field("number", 7, 7),)
+    assert entry.lengths == (14,)
+    assert entry.allowed
+
+
+@pytest.mark.parametrize("data", ["", "20UPG", "20UPGXX", "20USGFC"])
+def test_lookup_unknown(data):
+    assert registry.lookup(data) is None
+
+
+def test_lookup_not_allowed():
+    entry = registry.lookup("20UPGG4")
+    assert not entry.allowed
+    assert entry.fields == ()
+    assert entry.lengths == ()
+
+
+def test_lookup_subproject_switch():
+    entry = registry.lookup("20UPBD1")
+    assert entry.identifier is pixels.services.pb_type1_data
+    # hidden fields are not listed
+    assert [field.name for field in entry.fields] == ["data", "length", "number"]
+
+
+def test_candidates():
+    assert registry.candidates("20UPGFC1048575") == (registry.lookup("20UPGFC"),)
+    entries = registry.candidates("20UPGM")
+    assert {entry.component for entry in entries} >= {
+        "Outer_system_quad_module",
+        "Module_carrier",
+    }
+    assert all(entry.prefix.startswith(b"20UPGM") for entry in entries)
+    assert len(registry.candidates("")) == len(registry.registry())
+    assert registry.candidates("20X") == ()
+
+
+def test_registry_agrees_with_parse(valid_sns):
+    for serial_number in valid_sns:
+        entry = registry.lookup(serial_number)
+        if entry is None:
+            continue
+        assert entry.allowed
+        assert len(serial_number) in entry.lengths
+        identifier = itksn.parse(serial_number.encode("utf-8")).identifier
+        for field in entry.fields:
+            if field.offset is None or field.width is None:
+                continue
+            value = identifier
+            for name in field.name.split("."):
+                value = value[name]
+            raw = serial_number[field.offset : field.offset + field.width].encode()
+            assert getattr(value, "bytevalue", value) == raw
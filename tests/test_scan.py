@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import pytest
+
+import itksn
+from itksn import scan
+
+
+def test_iter_records_lines():
+    buffer = b"  20UPGFC1048575 \r\n\n\t\n20UPGR92101041"
+    records = list(scan.iter_records(buffer))
+    assert [(record.offset, record.end) for record in records] == [(2, 19), (22, 36)]
+    assert [record.data.tobytes() for record in records] == [
+        b"20UPGFC1048575",
+        b"20UPGR92101041",
+    ]
+    assert isinstance(records[0].data, memoryview)
+    assert records[0].data.obj is buffer
+
+
+def test_iter_records_resume():
+    buffer = bytearray(b"20UPGFC1048575\n20UPGR92101041\n20UPGMC2291234\n")
+    first, *_ = scan.iter_records(buffer)
+    resumed = list(scan.iter_records(memoryview(buffer), offset=first.end))
+    assert [record.data.tobytes() for record in resumed] == [
+        b"20UPGR92101041",
+        b"20UPGMC2291234",
+    ]
+
+
+def test_iter_records_packed():
+    buffer = b"20UPGFC104857520UPGR9210104120UPG"
+    records = list(scan.iter_records(buffer, packed=True))
+    assert [(record.offset, record.end) for record in records] == [
+        (0, 14),
+        (14, 28),
+        (28, 33),
+    ]
+    assert records[-1].data.tobytes() == b"20UPG"
+    assert [
+        record.data.tobytes() for record in scan.iter_records(buffer, True, 14)
+    ] == [b"20UPGR92101041", b"20UPG"]
+
+
+def test_scan(tmp_path):
+    path = tmp_path / "serialnumbers.txt"
+    path.write_bytes(b"20UPGFC1048575\n20UPIFW2123456\n20USBSL0000001\n")
+    results = list(scan.scan(path))
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[0].value == itksn.parse(b"20UPGFC1048575")
+    # copied out of the mapping, which is closed by now
+    assert type(results[0].serialnumber) is bytes
+    assert type(results[0].value.identifier.number) is bytes
+    assert results[1].serialnumber == b"20UPIFW2123456"
+    assert results[1].error.field == "component_code"
+    assert [result.offset for result in results] == [0, 15, 30]
+    assert [result.end for result in scan.scan(path, offset=results[0].end)] == [30, 45]
+
+
+def test_scan_packed(tmp_path):
+    path = tmp_path / "serialnumbers.bin"
+    path.write_bytes(b"20UPGFC104857520UPGR92101041")
+    results = list(scan.scan(path, packed=True))
+    assert [result.serialnumber for result in results] == [
+        b"20UPGFC1048575",
+        b"20UPGR92101041",
+    ]
+    assert all(result.ok for result in results)
+
+
+def test_scan_empty(tmp_path):
+    path = tmp_path / "serialnumbers.txt"
+    path.write_bytes(b"")
+    assert list(scan.scan(path)) == []
+
+
+def test_scan_stopped_early(tmp_path):
+    # the file can be closed while the scan is not finished
+    path = tmp_path / "serialnumbers.txt"
+    path.write_bytes(b"20UPGFC1048575\n20UPGR92101041\n")
+    results = scan.scan(path)
+    assert next(results).ok
+    results.close()
+
+
+def test_scan_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(scan.scan(tmp_path / "missing.txt"))
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from construct import Struct, this
+
+from itksn import pixels, schema
+from itksn.common import Bytes, Computed, EnumStr
+from itksn.pixels import modules
+
+TABLE = {0: "zero", 1: "one"}
+
+
+def test_fingerprint():
+    fingerprint = schema.fingerprint("20UPGFC1048575")
+    assert len(fingerprint) == 16
+    assert schema.fingerprint(b"20UPGFC0000001") == fingerprint
+    assert schema.fingerprint(b"20UPGFC") == fingerprint
+    assert schema.fingerprint(b"20UPIFC1048575") != fingerprint
+    assert schema.fingerprint(b"20UPGR92101041") != fingerprint
+    assert schema.fingerprint(b"20USBSL0000001") != fingerprint
+
+
+@pytest.mark.parametrize(
+    ("first", "second"),
+    [
+        # prefixes failing at the same field are parsed the same way
+        (b"20UPXFC1048575", b"20UPYR92101041"),
+        (b"20UPGXX1048575", b"20UPGYY1048575"),
+        (b"2", b"3"),
+    ],
+)
+def test_fingerprint_invalid_prefixes(first, second):
+    assert schema.fingerprint(first) == schema.fingerprint(second)
+
+
+def test_describe_is_json():
+    description = schema.describe(modules.fe_chip)
+    assert json.loads(json.dumps(description)) == description
+    # the table looked up by the batch field is part of the description
+    assert "ITkpix_v2" in json.dumps(description)
+
+
+@pytest.mark.parametrize(
+    ("first", "second"),
+    [
+        (EnumStr(Bytes(1), a=b"0"), EnumStr(Bytes(1), a=b"1")),
+        (EnumStr(Bytes(1), a=b"0"), EnumStr(Bytes(1), b=b"0")),
+        (Struct("a" / Bytes(1)), Struct("a" / Bytes(2))),
+        (Struct("a" / Bytes(1)), Struct("b" / Bytes(1))),
+        (Computed(this.a), Computed(this.b)),
+        (Computed(lambda ctx: ctx.a), Computed(lambda ctx: ctx.b)),
+    ],
+)
+def test_describe_changes(first, second):
+    assert schema.digest(schema.describe(first)) != schema.digest(
+        schema.describe(second)
+    )
+
+
+def test_describe_function_globals():
+    field = Computed(lambda ctx: TABLE[ctx.value])
+    before = schema.describe(field)
+    assert schema.describe(field) == before
+    TABLE[2] = "two"
+    try:
+        assert schema.describe(field) != before
+    finally:
+        del TABLE[2]
+
+
+def test_describe_function_without_source():
+    namespace = {}
+    exec("first = lambda ctx: ctx.a + 1\nsecond = lambda ctx: ctx.a + 2", namespace)
+    first = schema.describe(Computed(namespace["first"]))
+    # the bytecode is not part of the description, it depends on the Python version
+    assert first["func"]["function"] == {
+        "arguments": ["ctx"],
+        "names": ["a"],
+        "constants": ["1"],
+    }
+    assert schema.describe(Computed(namespace["second"])) != first
+
+
+def test_describe_ignores_identity():
+    assert schema.describe(Struct("a" / Bytes(1))) == schema.describe(
+        Struct("a" / Bytes(1))
+    )
+
+
+def test_component_fingerprints():
+    fingerprints = schema.component_fingerprints()
+    assert list(fingerprints) == list(pixels.yy_identifiers)
+    # same identifier layout, but different codes
+    assert fingerprints["FE_chip"] != fingerprints["FE_chip_wafer"]
+    assert not schema.diff(fingerprints)
+
+
+@pytest.mark.parametrize("seed", ["1", "2"])
+def test_component_fingerprints_are_stable(seed):
+    code = "import json; from itksn import schema; print(json.dumps(schema.component_fingerprints()))"
+    ret = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONHASHSEED": seed},
+    )
+    assert json.loads(ret.stdout) == schema.component_fingerprints()
+
+
+def test_diff():
+    new = {"FE_chip": "a", "Quad_PCB": "b", "Module_carrier": "c"}
+    old = {"FE_chip": "a", "Quad_PCB": "old", "Retired": "d"}
+    changes = schema.diff(old, new)
+    assert changes == schema.SchemaDiff(
+        added=("Module_carrier",), removed=("Retired",), changed=("Quad_PCB",)
+    )
+    assert changes
+    assert changes.affects("20UPGPQ0000001")
+    assert changes.affects(b"20UPGMC2291234")
+    assert not changes.affects("20UPGFC1048575")
+    # not a pixel serial number
+    assert changes.affects("20USBSL0000001")
+    assert not schema.diff(old, old).affects("20USBSL0000001")
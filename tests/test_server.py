@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import threading
+import urllib.request
+
+import pytest
+
+import itksn
+from itksn import server
+
+
+@pytest.fixture(scope="module")
+def servers(tmp_path_factory):
+    socket_path = tmp_path_factory.mktemp("server") / "itksn.sock"
+    running = [server.make_http_server(port=0), server.UnixServer(socket_path)]
+    for running_server in running:
+        threading.Thread(target=running_server.serve_forever, daemon=True).start()
+    host, port = running[0].server_address[:2]
+    yield {"http": f"http://{host}:{port}", "unix": f"unix:{socket_path}"}
+    for running_server in running:
+        running_server.shutdown()
+        running_server.server_close()
+    assert not socket_path.exists()
+
+
+@pytest.fixture(params=["http", "unix"])
+def client(request, servers):
+    with server.Client(servers[request.param]) as client:
+        yield client
+
+
+def test_parse(client):
+    result = client.parse("20UPGFC1048575")
+    assert result["ok"]
+    assert result["error"] is None
+    assert result["value"]["identifier.wafer"] == 255
+    assert result["value"]["component_code.bytevalue"] == "FC"
+
+
+def test_parse_error(client):
+    result = client.parse("20UPGR9X101041")
+    assert not result["ok"]
+    assert result["value"] is None
+    assert result["error"]["field"] == "identifier.FE_chip_version"
+    assert result["error"]["code"] == "unknown_value"
+    assert result["error"]["type"] == "MappingError"
+
+
+def test_batches(client):
+    serialnumbers = ["20UPGFC1048575", "20UPIFW2123456", "20USBSL0000001"]
+    results = client.parse_many(serialnumbers)
+    assert [result["serialnumber"] for result in results] == serialnumbers
+    assert [result["ok"] for result in results] == [True, False, True]
+    validations = client.validate_many(serialnumbers)
+    assert [result["ok"] for result in validations] == [True, False, True]
+    assert validations[1]["error"]["field"] == "component_code"
+
+
+def test_keep_alive(client):
+    # many requests over the same connection
+    for _ in range(20):
+        assert client.validate("20UPGR92101041")["ok"]
+
+
+def test_build(client):
+    obj = {
+        "atlas_project": "atlas_detector",
+        "system_code": "phaseII_upgrade",
+        "project_code": "pixel",
+        "subproject_code": "pixel_general",
+        "component_code": "Digital_quad_module",
+        "identifier": {
+            "FE_chip_version": "RD53A",
+            "PCB_manufacturer": "Dummy",
+            "number": "12345",
+        },
+    }
+    assert client.build(obj) == {
+        "ok": True,
+        "serialnumber": "20UPGR90012345",
+        "error": None,
+    }
+    failed = client.build({**obj, "component_code": "Nonexistent"})
+    assert not failed["ok"]
+    assert failed["error"]["type"] == "MappingError"
+
+
+def test_build_roundtrip(client):
+    value = client.parse("20USBSL0000001")["value"]
+    obj = {
+        name: value[name]
+        for name in ("atlas_project", "system_code", "project_code", "subproject_code")
+    }
+    obj["component_code"] = value["component_code"]
+    obj["identifier"] = value["identifier"]
+    assert client.build(obj)["serialnumber"] == "20USBSL0000001"
+
+
+def test_bad_requests(client):
+    with pytest.raises(ValueError, match="expects strings"):
+        client.request("parse", [1, 2])
+    with pytest.raises(ValueError, match="unknown"):
+        client.request("nonexistent", "20UPGFC1048575")
+
+
+def test_http_get(servers):
+    with urllib.request.urlopen(f"{servers['http']}/parse/20UPGFC1048575") as response:
+        result = json.load(response)
+    assert result["value"]["identifier.number"] == "1048575"
+    with urllib.request.urlopen(f"{servers['http']}/health") as response:
+        assert json.load(response) == {"version": itksn.__version__}
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        urllib.request.urlopen(f"{servers['http']}/nonexistent")
+    with excinfo.value as error:
+        assert error.code == 404
+        assert "error" in json.load(error)
+
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_http_invalid_length(servers, length):
+    host, port = servers["http"].removeprefix("http://").split(":")
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    try:
+        connection.putrequest("POST", "/parse")
+        connection.putheader("Content-Length", length)
+        connection.endheaders(b'"20UPGFC1048575"')
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "Content-Length" in json.load(response)["error"]
+    finally:
+        connection.close()
+
+
+def test_http_invalid_json(servers):
+    request = urllib.request.Request(f"{servers['http']}/parse", data=b"[20UPG")
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        urllib.request.urlopen(request)
+    with excinfo.value as error:
+        assert error.code == 400
+        assert "error" in json.load(error)
+
+
+def test_serve_command(tmp_path):
+    socket_path = tmp_path / "itksn.sock"
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            *("-m", "itksn.cli", "serve", "--no-http"),
+            *("--socket", str(socket_path)),
+        ],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert process.stderr.readline().strip() == f"serving on unix:{socket_path}"
+        with server.Client(f"unix:{socket_path}") as client:
+            assert client.validate("20UPGFC1048575")["ok"]
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        process.stderr.close()
+    # stopped cleanly by SIGTERM, without leaving the socket behind
+    assert process.returncode == 0
+    assert not socket_path.exists()
+
+
+def test_stale_socket(tmp_path):
+    socket_path = tmp_path / "itksn.sock"
+    # as left behind by a server that was killed
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(socket_path))
+    running = server.UnixServer(socket_path)
+    threading.Thread(target=running.serve_forever, daemon=True).start()
+    try:
+        with server.Client(f"unix:{socket_path}") as client:
+            assert client.validate("20UPGFC1048575")["ok"]
+        # but not while a server is listening on it
+        with pytest.raises(OSError, match="in use"):
+            server.UnixServer(socket_path)
+    finally:
+        running.shutdown()
+        running.server_close()
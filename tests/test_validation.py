@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import pytest
+from construct.core import (
+    MappingError,
+    StreamError,
+    TerminatedError,
+)
+
+import itksn
+from itksn import pixels
+from itksn.core import CompiledSerialNumberStruct
+
+
+def expected_value(serial_number):
+    try:
+        return CompiledSerialNumberStruct.parse(serial_number)
+    except Exception:  # pylint: disable=broad-exception-caught
+        return None
+
+
+def expected_error(serial_number):
+    try:
+        CompiledSerialNumberStruct.parse(serial_number)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        return type(exc)
+    return None
+
+
+def assert_agrees(serial_number):
+    result = itksn.validate(serial_number)
+    expected = expected_error(serial_number)
+    assert (result.error.exception_type if result.error else None) == expected
+    assert result.ok is (expected is None)
+    assert itksn.is_valid(serial_number) is (expected is None)
+    outcome = itksn.try_parse(serial_number)
+    assert outcome.error == result.error
+    assert outcome.value == expected_value(serial_number)
+
+
+def test_validate_agrees_with_parse(component_prefix, identifiers):
+    assert_agrees(component_prefix)
+    for identifier in identifiers:
+        assert_agrees(component_prefix + identifier.encode())
+
+
+@pytest.mark.parametrize(
+    "serial_number",
+    [b"", b"2", b"20UX", b"20UPGXX", b"20UPG", b"21UPG", b"20USG1234567"],
+)
+def test_validate_agrees_with_parse_prefix(serial_number):
+    assert_agrees(serial_number)
+
+
+def test_validate_valid(valid_sns):
+    results = itksn.validate_many(valid_sns)
+    assert all(result.ok for result in results)
+    assert results[0].serialnumber == valid_sns[0].encode("utf-8")
+    assert results[0].field is None
+    assert results[0].reason is None
+
+
+@pytest.mark.parametrize(
+    ("serial_number", "field", "offset", "error"),
+    [
+        (b"", "atlas_project", 0, StreamError),
+        (b"20UX", "project_code", 3, MappingError),
+        (b"20UPGXX0000000", "component_code", 5, MappingError),
+        (b"20UPGR9X101041", "identifier.FE_chip_version", 7, MappingError),
+        (b"20UPGR9210", "identifier.number", 8, StreamError),
+        (b"20UPGFC10485AB", "identifier.batch_number", 14, ValueError),
+        (b"20UPGR921010411", None, 14, TerminatedError),
+    ],
+)
+def test_validate_reports_field(serial_number, field, offset, error):
+    result = itksn.validate(serial_number)
+    assert not result.ok
+    assert result.field == field
+    assert result.offset == offset
+    assert result.error.exception_type is error
+    assert isinstance(result.error.exception(), error)
+    assert result.reason.startswith(f"{error.__name__}: ")
+    assert "\n" not in result.reason
+
+
+def test_validate_allowed_values():
+    result = itksn.validate(b"20UPGR9X101041")
+    assert result.error.code == itksn.ErrorCode.unknown_value
+    assert result.error.value == b"X"
+    assert result.error.allowed == tuple(
+        pixels.modules.fe_chip_version.decmapping.values()
+    )
+    assert "ITkpix_v1p1" in result.error.allowed
+
+    result = itksn.validate(b"20UPGXX0000000")
+    assert result.error.value == b"XX"
+    assert result.error.allowed == tuple(
+        pixels.subproject_codes["PG"].decmapping.values()
+    )
+
+
+@pytest.mark.parametrize(
+    ("serial_number", "code"),
+    [
+        (b"20UPGR9210", "too_short"),
+        (b"20UPGR921010411", "trailing_data"),
+        (b"20UPGFC10485AB", "invalid_value"),
+    ],
+)
+def test_validate_error_code(serial_number, code):
+    assert itksn.validate(serial_number).error.code == code
+
+
+def test_try_parse(valid_sns):
+    for serial_number in valid_sns:
+        outcome = itksn.try_parse(serial_number)
+        assert outcome.ok
+        assert outcome.error is None
+        assert outcome.value == itksn.parse(serial_number.encode("utf-8"))
+
+    outcome = itksn.try_parse("20UPGR9X101041")
+    assert not outcome.ok
+    assert outcome.value is None
+    assert outcome.error == itksn.validate("20UPGR9X101041").error
+
+
+def test_field_error_from_exception():
+    with pytest.raises(MappingError) as excinfo:
+        itksn.parse(b"20UPGR9X101041")
+    error = itksn.FieldError.from_exception(excinfo.value)
+    assert error.code == itksn.ErrorCode.unknown_value
+    assert error.exception_type is MappingError
+    assert "\n" not in error.message
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import pytest
+
+import itksn
+import itksn.flat
+from itksn.formats import flatten
+
+np = pytest.importorskip("numpy")
+vectorize = pytest.importorskip("itksn.vectorize")
+
+invalid_sns = [
+    "20UPGR9X101041",
+    "20UPGFC10485AB",
+    "20UPGR921010",
+    "20UPGR921010411",
+    "20UPGXX0000000",
+    "20UPBD10012345",
+    "",
+]
+
+
+def test_decode_agrees_with_parse(valid_sns):
+    serialnumbers = valid_sns + invalid_sns
+    columns = vectorize.decode(serialnumbers)
+    for index, serialnumber in enumerate(serialnumbers):
+        outcome = itksn.try_parse(serialnumber)
+        if itksn.flat.layouts().get(serialnumber.encode()[:7]) is None:
+            # not a pixel serial number
+            assert not columns["valid"][index]
+            continue
+        assert columns["valid"][index] == outcome.ok, serialnumber
+        if not outcome.ok:
+            continue
+        for name, value in flatten(outcome.value).items():
+            if name.endswith(".bytevalue") or value is None:
+                continue
+            got = columns[name][index]
+            if isinstance(got, bytes):
+                got = got.decode()
+            assert str(got) == str(value), (serialnumber, name)
+
+
+def test_decode_fe_chip():
+    columns = vectorize.decode(
+        [b"20UPGFC1048575", b"20UPGFC0000000", b"20UPGFC0123456"]
+    )
+    expected = [
+        itksn.parse(serialnumber).identifier
+        for serialnumber in (b"20UPGFC1048575", b"20UPGFC0000000", b"20UPGFC0123456")
+    ]
+    for name in ("batch_number", "batch", "wafer", "row", "column"):
+        assert columns[f"identifier.{name}"].tolist() == [
+            identifier[name] for identifier in expected
+        ]
+
+
+def test_decode_invalid_rows_are_missing():
+    columns = vectorize.decode([b"20UPGR9X101041", b"20UPGR92101041"])
+    assert columns["valid"].tolist() == [False, True]
+    assert columns["component_code"].tolist() == ["", "Digital_quad_module"]
+    assert columns["identifier.number"].tolist() == [b"", b"101041"]
+
+
+def test_decode_alphanumeric_number(valid_sns):
+    # valid serial numbers whose number is not all digits
+    serialnumbers = [b"20UPGBQ2001F00", b"20UPIRU22020N4"]
+    assert "20UPGBQ2001F00" in valid_sns
+    columns = vectorize.decode(serialnumbers)
+    assert columns["valid"].all()
+    assert columns["identifier.number"].tolist() == [
+        itksn.parse(serialnumber).identifier.number for serialnumber in serialnumbers
+    ]
+
+
+def test_decode_pieces():
+    array = vectorize.as_array([b"20UPGFC1048575", b"20UPGR92101041", b"20UPGFC12"])
+    valid, pieces = vectorize.decode_pieces(array)
+    assert valid.tolist() == [True, True, False]
+    # one piece per group of rows with the same prefix
+    (rows, values), *_ = pieces["identifier.wafer"]
+    assert rows.tolist() == [0]
+    assert values.tolist() == [255]
+    component_codes = {
+        row: value
+        for rows, values in pieces["component_code"]
+        for row, value in zip(rows.tolist(), np.broadcast_to(values, rows.shape))
+    }
+    assert component_codes == {0: "FE_chip", 1: "Digital_quad_module"}
+
+
+def test_decode_inputs():
+    serialnumbers = [b"20UPGFC1048575", b"20UPGMC2291234"]
+    as_bytes = np.array(serialnumbers, dtype="S14")
+    as_uint8 = as_bytes.view(np.uint8).reshape(-1, 14)
+    for data in (serialnumbers, [sn.decode() for sn in serialnumbers], as_uint8):
+        columns = vectorize.decode(data)
+        assert columns.keys() == vectorize.decode(as_bytes).keys()
+        for name, column in vectorize.decode(as_bytes).items():
+            assert columns[name].tolist() == column.tolist()
+    assert np.shares_memory(vectorize.as_array(as_bytes), as_bytes)
+
+
+def test_decode_padding():
+    # shorter rows of a wider array are padded with zeros
+    columns = vectorize.decode(
+        [b"20UPGFC1048575", b"20UPGFC104857", b"20UPGFC10485751"]
+    )
+    assert columns["valid"].tolist() == [True, False, False]
+
+
+def test_decode_empty():
+    assert vectorize.decode([])["valid"].tolist() == []
+    assert vectorize.decode([b"20U"])["valid"].tolist() == [False]
+
+
+def test_to_structured():
+    columns = vectorize.decode([b"20UPGFC1048575", b"20UPGR92101041"])
+    array = vectorize.to_structured(columns)
+    assert array.dtype.names == tuple(columns)
+    assert array["identifier.wafer"].tolist() == [255, -1]
+    assert array[1]["component_code"] == "Digital_quad_module"